@@ -2,25 +2,34 @@ import json
 import sys
 import os
 
+try:  # Optional: ~3x faster parse of large tokenizer.json files
+    import orjson
+except ImportError:
+    orjson = None
+
 tokenizer_path = r"C:\Learn\Code\fastembed\EmbeddingServer\models\multilingual-e5-small\tokenizer.json"
 vocab_path = r"C:\Learn\Code\fastembed\EmbeddingServer\models\multilingual-e5-small\vocab.txt"
 
 try:
-    with open(tokenizer_path, 'r', encoding='utf-8') as f:
-        tokenizer_data = json.load(f)
+    with open(tokenizer_path, 'rb') as f:
+        raw = f.read()
+    tokenizer_data = orjson.loads(raw) if orjson else json.loads(raw)
+    del raw
     
     # Extract vocabulary from tokenizer.json
     if 'model' in tokenizer_data and 'vocab' in tokenizer_data['model']:
         vocab_list = tokenizer_data['model']['vocab']
         
-        # Create vocab.txt with tokens in order (index = line number)
-        with open(vocab_path, 'w', encoding='utf-8') as f:
-            for i, (token, score) in enumerate(vocab_list):
-                f.write(token + '\n')
+        # Create vocab.txt with tokens in order (index = line number).
+        # One bulk write; newline='' keeps LF endings (no per-line translation).
+        tokens = [token for token, _ in vocab_list]
+        with open(vocab_path, 'w', encoding='utf-8', newline='', buffering=1024 * 1024) as f:
+            f.write('\n'.join(tokens))
+            f.write('\n')
         
         print(f"Successfully created vocab.txt with {len(vocab_list)} tokens")
-        print(f"First few tokens: {[token for token, _ in vocab_list[:10]]}")
-        print(f"Sample tokens: {[token for token, _ in vocab_list[1000:1010]]}")
+        print(f"First few tokens: {tokens[:10]}")
+        print(f"Sample tokens: {tokens[1000:1010]}")
         
     else:
         print("Error: tokenizer.json does not have expected 'model.vocab' structure")
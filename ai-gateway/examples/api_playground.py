@@ -15,40 +15,62 @@ import textwrap
 from typing import List, Dict, Any
 
 import requests
+from requests.adapters import HTTPAdapter
+
+try:  # Optional: faster indented dumps for large embedding payloads
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def make_session(pool_size: int = 4) -> requests.Session:
+    """Keep-alive session so every playground call reuses one connection."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+SESSION = make_session()
 
 
 def pretty(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(
+            obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        ).decode()
     return json.dumps(obj, indent=2, ensure_ascii=False)
 
 
 def get_health(host: str):
-    r = requests.get(f"{host}/health", timeout=10)
+    r = SESSION.get(f"{host}/health", timeout=10)
     print("# /health")
     print(pretty(r.json()))
 
 
 def list_models(host: str):
-    r = requests.get(f"{host}/v1/models", timeout=10)
+    r = SESSION.get(f"{host}/v1/models", timeout=10)
     print("# /v1/models")
     print(pretty(r.json()))
 
 
 def list_registry(host: str):
-    r = requests.get(f"{host}/v1/models/registry", timeout=10)
+    r = SESSION.get(f"{host}/v1/models/registry", timeout=10)
     print("# /v1/models/registry")
     print(pretty(r.json()))
 
 
 def embed(host: str, inputs: List[str]):
     payload = {"model": "bge-small-en-v1.5", "input": inputs if len(inputs) > 1 else inputs[0]}
-    r = requests.post(f"{host}/v1/embeddings", json=payload, timeout=30)
+    r = SESSION.post(f"{host}/v1/embeddings", json=payload, timeout=30)
     print("# /v1/embeddings")
     try:
         data = r.json()
     except Exception:
         print(r.text)
         return
-    # Truncate embedding vectors for readability
+    # Truncate embedding vectors before formatting (pretty only sees previews)
     for item in data.get("data", []):
         emb = item.get("embedding", [])
         if isinstance(emb, list) and len(emb) > 12:
@@ -67,7 +89,7 @@ def chat(host: str, prompt: str):
         "temperature": 0.7,
         "max_tokens": 64,
     }
-    r = requests.post(f"{host}/v1/chat/completions", json=payload, timeout=60)
+    r = SESSION.post(f"{host}/v1/chat/completions", json=payload, timeout=60)
     print("# /v1/chat/completions")
     try:
         print(pretty(r.json()))
@@ -106,6 +128,8 @@ def main():
     except requests.ConnectionError as ce:
         print(f"Connection failed: {ce}\nIs the server running?")
         sys.exit(1)
+    finally:
+        SESSION.close()
 
 
 if __name__ == "__main__":
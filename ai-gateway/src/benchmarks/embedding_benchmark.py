@@ -15,12 +15,14 @@ import platform
 import statistics
 import sys
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Sequence
 
 # Ensure the parent 'src' directory is on sys.path when executed directly via a relative path
 _THIS_FILE = pathlib.Path(__file__).resolve()
 _SRC_DIR = _THIS_FILE.parents[1]
+_REPO_ROOT = _THIS_FILE.parents[3]
 if str(_SRC_DIR) not in sys.path:
     sys.path.insert(0, str(_SRC_DIR))
 
@@ -35,6 +37,8 @@ if _missing:
     )
     raise SystemExit(2)
 
+import numpy as np  # noqa: E402
+
 from runtime.embedding_backends.base import (  # type: ignore  # noqa: E402
     EmbeddingResult,
 )
@@ -42,7 +46,15 @@ from runtime.embedding_backends.onnx_backend import (  # type: ignore  # noqa: E
     OnnxEmbeddingBackend,
 )
 from runtime.model_registry import get_model  # type: ignore  # noqa: E402
-from runtime.utils.digest import digest_vectors  # type: ignore  # noqa: E402
+from runtime.utils.digest import (  # type: ignore  # noqa: E402
+    digest_array,
+    digest_vectors,
+)
+
+try:  # pragma: no cover - optional fast serializer
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
 
 try:  # pragma: no cover - optional dep
     from runtime.embedding_backends.fastembed_backend import (
@@ -52,37 +64,102 @@ except Exception:  # pragma: no cover
     FastEmbedBackend = None  # type: ignore
 
 
-def percentile(data: List[float], p: float) -> float:
-    if not data:
-        return 0.0
-    s = sorted(data)
-    k = (len(s) - 1) * (p / 100.0)
-    f = int(k)
-    c = min(f + 1, len(s) - 1)
-    if f == c:
-        return s[f]
-    d0 = s[f] * (c - k)
-    d1 = s[c] * (k - f)
-    return d0 + d1
+def percentiles(data: Sequence[float], ps: Sequence[float]) -> List[float]:
+    """Return linear-interpolated percentiles for ``ps`` from a single sort."""
+    if not len(data):
+        return [0.0] * len(ps)
+    arr = np.asarray(data, dtype=np.float64)
+    return np.percentile(arr, ps, method="linear").tolist()
+
+
+def percentile(data: Sequence[float], p: float) -> float:
+    return percentiles(data, (p,))[0]
 
 
 def run_timed(fn, repeat: int, discard: int = 0) -> Dict[str, float]:
-    raw: List[float] = []
-    for i in range(repeat):
-        start = time.perf_counter()
+    raw_ns: List[int] = []
+    append = raw_ns.append
+    pc = time.perf_counter_ns
+    for _ in range(repeat):
+        start = pc()
         fn()
-        raw.append((time.perf_counter() - start) * 1000)
-    used = raw[discard:] if discard else raw
+        append(pc() - start)
+    # Convert to ms once, outside the timed window
+    used = [n * 1e-6 for n in raw_ns[discard:]]
+    p50, p95 = percentiles(used, (50, 95))
     return {
         "runs": repeat - discard,
         "mean_ms": statistics.mean(used) if used else 0.0,
         "stdev_ms": statistics.pstdev(used) if len(used) > 1 else 0.0,
-        "p50_ms": percentile(used, 50),
-        "p95_ms": percentile(used, 95),
+        "p50_ms": p50,
+        "p95_ms": p95,
         "samples": used,
     }
 
 
+def dump_artifact(artifact: Dict[str, object]) -> bytes:
+    """Serialize the artifact once (orjson when installed) as indented UTF-8."""
+    if orjson is not None:
+        return orjson.dumps(
+            artifact, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+        )
+    return json.dumps(artifact, indent=2).encode("utf-8")
+
+
+def embed_concurrent(be, texts: List[str], pool: ThreadPoolExecutor, k: int) -> None:
+    """Split ``texts`` into ``k`` sub-batches and embed them concurrently.
+
+    ORT does not split a batch across sessions itself; for small CPU-bound
+    models several single-threaded ``Run()`` calls in flight often beat one
+    wide call. Returns once every sub-batch has completed.
+    """
+    size = -(-len(texts) // k)  # ceil division
+    futures = [
+        pool.submit(be.embed, texts[i : i + size]) for i in range(0, len(texts), size)
+    ]
+    for f in futures:
+        f.result()
+
+
+def batch_sweep(
+    be,
+    inputs: List[str],
+    runs: int,
+    discard: int,
+    max_batch: int,
+    tolerance: float = 0.95,
+) -> Dict[str, object]:
+    """Double the batch size until throughput drops below ``tolerance`` x peak.
+
+    Throughput is rarely monotonic in batch size; the sweep records every
+    point plus the batch size that maximized texts/sec. Inputs are cycled
+    when a batch is larger than the input file.
+    """
+    points: List[Dict[str, float]] = []
+    best_batch, best_tp = 0, 0.0
+    b = 1
+    while b <= max_batch:
+        subset = [inputs[i % len(inputs)] for i in range(b)]
+        be.embed(subset)  # warmup
+        timings = run_timed(lambda: be.embed(subset), repeat=runs, discard=discard)
+        mean_ms = timings["mean_ms"]
+        tp = b / (mean_ms / 1000) if mean_ms else 0.0
+        points.append(
+            {"batch_size": b, "mean_ms": mean_ms, "throughput_texts_per_sec": tp}
+        )
+        if tp < best_tp * tolerance:
+            break
+        if tp > best_tp:
+            best_batch, best_tp = b, tp
+        b *= 2
+    return {
+        "sweep": points,
+        "best_batch_size": best_batch,
+        "best_throughput_texts_per_sec": best_tp,
+        "tolerance": tolerance,
+    }
+
+
 def resolve_model_path(spec_path: str | None) -> str:
     """Resolve a model path from a registry entry or user override.
 
@@ -94,18 +171,66 @@ def resolve_model_path(spec_path: str | None) -> str:
     if not spec_path:
         raise SystemExit("Model spec has no path; update registry or pass --model-path")
 
-    # Direct hit (absolute or relative from CWD)
+    # Direct hit (absolute or relative from CWD); the only stat on this path
     if os.path.isdir(spec_path):
         return spec_path
 
-    repo_root = Path(__file__).resolve().parents[3]
-
     # Avoid double models/models
     if spec_path.startswith("models/"):
-        candidate = repo_root / spec_path
-    else:
-        candidate = repo_root / "models" / spec_path
-    return str(candidate)
+        return str(_REPO_ROOT / spec_path)
+    return str(_REPO_ROOT / "models" / spec_path)
+
+
+def summarize_scenario(
+    batch: int,
+    k: int,
+    timings: Dict[str, object],
+    perf: Dict[str, object],
+    rows: List[np.ndarray],
+    keep_samples: bool = False,
+) -> Dict[str, object]:
+    """Build one scenario record (digests, zero/NaN check, derived rates)."""
+    arr = np.stack(rows)
+    digest = digest_vectors(arr, short=True, head_dims=8)
+    # Full-vector signature; BLAKE2b over raw float32 bytes keeps it cheap
+    vector_digest = digest_array(arr, short=True)
+    zero_or_nan = int(np.count_nonzero((arr == 0.0) | np.isnan(arr)))
+    result = {
+        "batch_size": batch,
+        "concurrency": k,
+        "runs": timings["runs"],
+        "mean_ms": timings["mean_ms"],
+        "stdev_ms": timings["stdev_ms"],
+        "p50_ms": timings["p50_ms"],
+        "p95_ms": timings["p95_ms"],
+        "per_text_mean_ms": timings["mean_ms"] / batch if batch else 0.0,
+        "throughput_texts_per_sec": (
+            (batch / (timings["mean_ms"] / 1000)) if timings["mean_ms"] else 0.0
+        ),
+        "dimension": arr.shape[1] if arr.ndim == 2 else 0,
+        "digest": digest,
+        "vector_digest": vector_digest,
+        "zero_or_nan_count": zero_or_nan,
+        "tokenize_time_ms": perf.get("tokenize_time_ms"),
+        "avg_tokens_per_text": perf.get("avg_tokens_per_text"),
+        "total_tokens": perf.get("total_tokens"),
+        "tokens_per_sec": (
+            ((perf.get("total_tokens") or 0) / (timings["mean_ms"] / 1000))
+            if timings["mean_ms"]
+            else 0.0
+        ),
+        "tokenizer": perf.get("tokenizer"),
+        "tokenizer_version": perf.get("tokenizer_version"),
+        "cache_hit_ratio": perf.get("cache_hit_ratio"),
+        "cache_hits": perf.get("cache_hits"),
+        "cache_misses": perf.get("cache_misses"),
+        # Token distribution percentiles if available
+        "p50_tokens_per_text": perf.get("p50_tokens_per_text"),
+        "p95_tokens_per_text": perf.get("p95_tokens_per_text"),
+    }
+    if keep_samples:
+        result["samples"] = timings["samples"]
+    return result
 
 
 def run(
@@ -118,10 +243,18 @@ def run(
     digest_inputs: List[str],
     out: Path | None,
     model_path_override: str | None = None,
+    intra_op_threads: int | None = None,
+    concurrency: int = 1,
+    keep_samples: bool = False,
+    cache_size: int = 256,
+    sweep_max_batch: int | None = None,
 ):
     spec = get_model(model_id)
     if not spec:
         raise SystemExit(f"Model not found: {model_id}")
+    if concurrency > 1 and intra_op_threads is None:
+        # Parallelism comes from concurrent Run() calls; keep each one narrow
+        intra_op_threads = 1
     if backend == "onnx-custom":
         resolved_path = model_path_override or resolve_model_path(spec.path)
         if not os.path.isdir(resolved_path):
@@ -131,7 +264,12 @@ def run(
                 f"Hint: expected file: {resolved_path}/model.onnx\n"
             )
         be = OnnxEmbeddingBackend(
-            model_id, resolved_path, spec.dimension, cache_size=256
+            model_id,
+            resolved_path,
+            spec.dimension,
+            cache_size=cache_size,
+            intra_op_threads=intra_op_threads,
+            inter_op_threads=1 if concurrency > 1 else None,
         )
     elif backend == "fastembed":  # pragma: no cover
         if FastEmbedBackend is None:
@@ -144,56 +282,65 @@ def run(
     be.load()
     load_ms = (time.perf_counter() - load_start) * 1000
 
-    results: List[Dict[str, object]] = []
+    pool = ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else None
+    post = ThreadPoolExecutor(max_workers=1)
+    pending: List[Future] = []
+    # Per-text vectors shared across scenarios: inputs[:batch] subsets overlap,
+    # so digest/validation only needs embeddings for texts not seen yet.
+    vector_memo: Dict[str, np.ndarray] = {}
     for batch in batch_sizes:
         subset = inputs[:batch]
         if not subset:
             continue
-        # Warmup single run (populate tokenizer caches etc.)
-        warm = be.embed(subset)  # warmup
-        timings = run_timed(
-            lambda: be.embed(subset), repeat=runs, discard=discard_warmup
+        k = concurrency if pool is not None and batch >= concurrency else 1
+        # One preallocated binding per batch size (not shareable across threads)
+        binding = (
+            be.create_io_binding(len(subset))
+            if k == 1 and hasattr(be, "create_io_binding")
+            else None
         )
-        result: EmbeddingResult = be.embed(subset)
-        vectors = result.vectors
-        perf = result.perf or {}
-        digest = digest_vectors(vectors, short=True, head_dims=8)
-        zero_or_nan = sum(
-            1 for v in vectors for x in v if (x == 0.0 or (x != x))
-        )  # NaN check via x!=x
-        results.append(
-            {
-                "batch_size": batch,
-                "runs": timings["runs"],
-                "mean_ms": timings["mean_ms"],
-                "stdev_ms": timings["stdev_ms"],
-                "p50_ms": timings["p50_ms"],
-                "p95_ms": timings["p95_ms"],
-                "per_text_mean_ms": timings["mean_ms"] / batch if batch else 0.0,
-                "throughput_texts_per_sec": (
-                    (batch / (timings["mean_ms"] / 1000)) if timings["mean_ms"] else 0.0
-                ),
-                "dimension": len(vectors[0]) if vectors else 0,
-                "digest": digest,
-                "zero_or_nan_count": zero_or_nan,
-                "tokenize_time_ms": perf.get("tokenize_time_ms"),
-                "avg_tokens_per_text": perf.get("avg_tokens_per_text"),
-                "total_tokens": perf.get("total_tokens"),
-                "tokens_per_sec": (
-                    ((perf.get("total_tokens") or 0) / (timings["mean_ms"] / 1000))
-                    if timings["mean_ms"]
-                    else 0.0
-                ),
-                "tokenizer": perf.get("tokenizer"),
-                "tokenizer_version": perf.get("tokenizer_version"),
-                "cache_hit_ratio": perf.get("cache_hit_ratio"),
-                "cache_hits": perf.get("cache_hits"),
-                "cache_misses": perf.get("cache_misses"),
-                # Token distribution percentiles if available
-                "p50_tokens_per_text": perf.get("p50_tokens_per_text"),
-                "p95_tokens_per_text": perf.get("p95_tokens_per_text"),
-            }
+
+        def timed_fn():
+            if k > 1:
+                embed_concurrent(be, subset, pool, k)
+                return None
+            if binding is not None:
+                return be.embed(subset, io_binding=binding)
+            return be.embed(subset)
+
+        # Warmup single run (populate tokenizer caches etc.); its vectors seed
+        # the memo so no extra post-timing embed is needed
+        warm = timed_fn()
+        if warm is not None:
+            vector_memo.update(zip(subset, warm.vectors))
+        timings = run_timed(timed_fn, repeat=runs, discard=discard_warmup)
+        perf = (be.last_perf() if hasattr(be, "last_perf") else None) or {}
+        missing = [t for t in dict.fromkeys(subset) if t not in vector_memo]
+        if missing:
+            result: EmbeddingResult = be.embed(missing)
+            vector_memo.update(zip(missing, result.vectors))
+            perf = perf or result.perf or {}
+        # Digest/validation runs on the post-processing worker, overlapping
+        # with the next scenario's warmup
+        pending.append(
+            post.submit(
+                summarize_scenario,
+                batch,
+                k,
+                timings,
+                perf,
+                [vector_memo[t] for t in subset],
+                keep_samples,
+            )
         )
+    if pool is not None:
+        pool.shutdown()
+    results = [f.result() for f in pending]
+    post.shutdown()
+
+    tuning = None
+    if sweep_max_batch:
+        tuning = batch_sweep(be, inputs, runs, discard_warmup, sweep_max_batch)
 
     artifact = {
         "model": model_id,
@@ -205,14 +352,19 @@ def run(
             "machine": platform.machine(),
         },
         "model_load_time_ms": load_ms,
+        "intra_op_threads": intra_op_threads,
         "scenarios": results,
         "tokenizer_version": results[0].get("tokenizer_version") if results else None,
     }
+    if tuning is not None:
+        artifact["tuning"] = tuning
 
-    print(json.dumps(artifact, indent=2))
+    payload = dump_artifact(artifact)
+    sys.stdout.buffer.write(payload + b"\n")
+    sys.stdout.flush()
     if out:
         out.parent.mkdir(parents=True, exist_ok=True)
-        out.write_text(json.dumps(artifact, indent=2), encoding="utf-8")
+        out.write_bytes(payload)
 
 
 if __name__ == "__main__":
@@ -243,6 +395,40 @@ if __name__ == "__main__":
         type=str,
         help="Override model directory (containing model.onnx)",
     )
+    parser.add_argument(
+        "--intra-op-threads",
+        type=int,
+        help="ONNX Runtime intra-op threads (default: physical core count)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Split each batch into K sub-batches run concurrently "
+        "(defaults intra-op threads to 1 when K > 1)",
+    )
+    parser.add_argument(
+        "--keep-samples",
+        action="store_true",
+        help="Include raw per-run latency samples in each scenario",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        help="Backend LRU cache entries (0 disables; timed repeats otherwise hit the cache)",
+    )
+    parser.add_argument(
+        "--batch-sweep",
+        action="store_true",
+        help="After fixed batches, double batch size until throughput regresses",
+    )
+    parser.add_argument(
+        "--sweep-max-batch",
+        type=int,
+        default=64,
+        help="Upper bound for --batch-sweep",
+    )
     args = parser.parse_args()
 
     inputs_path = Path(args.inputs)
@@ -278,4 +464,9 @@ if __name__ == "__main__":
         digest_inputs,
         out_path,
         model_path_override=args.model_path,
+        intra_op_threads=args.intra_op_threads,
+        concurrency=max(1, args.concurrency),
+        keep_samples=args.keep_samples,
+        cache_size=args.cache_size,
+        sweep_max_batch=args.sweep_max_batch if args.batch_sweep else None,
     )
@@ -29,12 +29,12 @@ from __future__ import annotations
 
 import argparse
 import json
-import os
 import statistics
-import sys
 import time
 from pathlib import Path
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
 
 try:  # Optional heavy imports guarded
     from transformers import AutoTokenizer  # type: ignore
@@ -42,7 +42,15 @@ except Exception:  # pragma: no cover
     AutoTokenizer = None  # type: ignore
 
 
-def load_hf_tokenizer(model_id: str) -> Optional[Callable[[str], List[int]]]:
+def load_hf_tokenizer(
+    model_id: str,
+) -> Optional[Callable[[Union[str, Sequence[str]]], List]]:
+    """Return an encode function backed by a HF fast tokenizer (or None).
+
+    The function accepts a single string (-> ``List[int]``) or a list of
+    strings (-> ``List[List[int]]``); the list form goes through the Rust
+    batch path, which parallelizes across texts.
+    """
     if AutoTokenizer is None:
         return None
     try:
@@ -51,8 +59,10 @@ def load_hf_tokenizer(model_id: str) -> Optional[Callable[[str], List[int]]]:
         if fast is None:
             return None
 
-        def encode(s: str) -> List[int]:  # noqa: D401
-            return fast.encode(s, add_special_tokens=True)
+        def encode(batch: Union[str, Sequence[str]]) -> List:  # noqa: D401
+            if not isinstance(batch, str):
+                batch = list(batch)
+            return fast(batch, add_special_tokens=True)["input_ids"]
 
         return encode
     except Exception:
@@ -63,57 +73,139 @@ def heuristic_tokenize(s: str) -> List[str]:
     return s.split()
 
 
-def percentile(data: List[float], p: float) -> float:
-    if not data:
-        return 0.0
-    s = sorted(data)
-    k = (len(s) - 1) * (p / 100.0)
-    f = int(k)
-    c = min(f + 1, len(s) - 1)
-    if f == c:
-        return s[f]
-    return s[f] * (c - k) + s[c] * (k - f)
+def percentiles(data: Sequence[float], ps: Sequence[float]) -> List[float]:
+    """Return linear-interpolated percentiles for ``ps`` from a single sort."""
+    if not len(data):
+        return [0.0] * len(ps)
+    arr = np.asarray(data, dtype=np.float64)
+    return np.percentile(arr, ps, method="linear").tolist()
+
+
+def percentile(data: Sequence[float], p: float) -> float:
+    return percentiles(data, (p,))[0]
 
 
 def time_mode(
-    name: str, texts: List[str], tokenize_fn: Callable[[str], List]
+    name: str,
+    texts: Sequence[str],
+    tokenize_fn: Callable,
+    timing: str = "per_text",
+    total_chars: Optional[int] = None,
+    runs: int = 1,
+    discard: int = 0,
 ) -> Dict[str, object]:
-    start_all = time.perf_counter()
-    token_counts: List[int] = []
-    per_text_times: List[float] = []
-    for t in texts:
-        t0 = time.perf_counter()
-        tokens = tokenize_fn(t)
-        per_text_times.append((time.perf_counter() - t0) * 1000)
-        token_counts.append(len(tokens))
-    total_time = time.perf_counter() - start_all
+    """Time ``tokenize_fn`` over ``texts``.
+
+    The full pass is repeated ``runs`` times; the first ``discard`` passes are
+    dropped as warmup and the remaining timings are pooled.
+
+    timing:
+        ``per_text``: one timing window per text (p50/p95 available).
+        ``bulk``: ``tokenize_fn`` mapped over all texts in one window; for
+            functions so cheap (e.g. ``str.split``) that a clock read per call
+            would dominate the measurement.
+        ``batch``: a single ``tokenize_fn(texts)`` call returning one token
+            list per text (batched fast tokenizers).
+    For ``bulk``/``batch`` the per-text mean is derived from the total and
+    p50/p95 are None.
+    """
+    if timing not in ("per_text", "bulk", "batch"):
+        raise ValueError(f"Unknown timing mode: {timing}")
+    runs = max(runs, discard + 1)
+    pc = time.perf_counter_ns
+    p50 = p95 = None
+    total_ns = 0
+    per_text_ns: List[int] = []
+    for i in range(runs):
+        keep = i >= discard
+        token_counts: List[int] = []
+        if timing == "per_text":
+            pass_ns: List[int] = []
+            # Bind hot-loop callables to locals (skips attribute/global lookups)
+            append_time = pass_ns.append
+            append_cnt = token_counts.append
+            start_all = pc()
+            for t in texts:
+                t0 = pc()
+                tokens = tokenize_fn(t)
+                append_time(pc() - t0)
+                append_cnt(len(tokens))
+            elapsed = pc() - start_all
+            if keep:
+                per_text_ns.extend(pass_ns)
+        else:
+            start_all = pc()
+            if timing == "batch":
+                tokenized = tokenize_fn(texts)
+            else:
+                tokenized = list(map(tokenize_fn, texts))
+            elapsed = pc() - start_all
+            token_counts = [len(tokens) for tokens in tokenized]
+        if keep:
+            total_ns += elapsed
+    kept = runs - discard
+    if timing == "per_text":
+        per_text_times = [n * 1e-6 for n in per_text_ns]
+        mean_ms = statistics.mean(per_text_times) if per_text_times else 0.0
+        p50, p95 = percentiles(per_text_times, (50, 95))
+    else:
+        mean_ms = total_ns * 1e-6 / (len(texts) * kept) if texts else 0.0
+    total_time = total_ns * 1e-9
     total_tokens = sum(token_counts)
     return {
         "mode": name,
         "total_texts": len(texts),
-        "total_chars": sum(len(t) for t in texts),
+        "total_chars": (
+            total_chars if total_chars is not None else sum(map(len, texts))
+        ),
         "total_tokens": total_tokens,
         "mean_tokens_per_text": statistics.mean(token_counts) if token_counts else 0.0,
-        "mean_ms_per_text": statistics.mean(per_text_times) if per_text_times else 0.0,
-        "p50_ms_per_text": percentile(per_text_times, 50),
-        "p95_ms_per_text": percentile(per_text_times, 95),
-        "throughput_texts_per_sec": len(texts) / total_time if total_time else 0.0,
+        "mean_ms_per_text": mean_ms,
+        "p50_ms_per_text": p50,
+        "p95_ms_per_text": p95,
+        "throughput_texts_per_sec": (
+            len(texts) * kept / total_time if total_time else 0.0
+        ),
+        "timing": timing,
+        "runs": kept,
     }
 
 
 def run(
-    runs: int, discard: int, texts: List[str], hf_model: Optional[str]
+    runs: int, discard: int, texts: Sequence[str], hf_model: Optional[str]
 ) -> Dict[str, object]:
     results: List[Dict[str, object]] = []
-
-    # Heuristic mode aggregated timing (single run, per-text internal timing)
-    results.append(time_mode("heuristic_whitespace", texts, heuristic_tokenize))
+    # Immutable snapshot shared by every mode; char count computed once
+    texts = tuple(texts)
+    total_chars = sum(map(len, texts))
+    repeat = {"runs": runs, "discard": discard, "total_chars": total_chars}
+
+    # Heuristic mode: bulk timing (a per-call clock read would cost more than split)
+    results.append(
+        time_mode(
+            "heuristic_whitespace",
+            texts,
+            heuristic_tokenize,
+            timing="bulk",
+            **repeat,
+        )
+    )
 
     # HF tokenizer (if available)
     if hf_model:
         encode = load_hf_tokenizer(hf_model)
         if encode:
-            results.append(time_mode("hf_fast", texts, encode))
+            results.append(time_mode("hf_fast", texts, encode, **repeat))
+            # Same tokenizer, one batched call (Rust parallelizes across texts)
+            results.append(
+                time_mode(
+                    "hf_fast_batch",
+                    texts,
+                    encode,
+                    timing="batch",
+                    **repeat,
+                )
+            )
         else:
             results.append({"mode": "hf_fast", "available": False})
 
@@ -134,10 +226,13 @@ def main():  # pragma: no cover
         "--hf-tokenizer", help="HF model id for tokenizer (e.g. BAAI/bge-small-en-v1.5)"
     )
     parser.add_argument(
-        "--runs", type=int, default=1, help="Reserved for future multi-run aggregation"
+        "--runs", type=int, default=1, help="Full passes per mode (including warmup)"
     )
     parser.add_argument(
-        "--discard-warmup", type=int, default=0, help="Reserved warmup discard"
+        "--discard-warmup",
+        type=int,
+        default=0,
+        help="Drop the first N passes of each mode before aggregating",
     )
     parser.add_argument("--out", help="Write JSON artifact path")
     args = parser.parse_args()
@@ -145,9 +240,9 @@ def main():  # pragma: no cover
     path = Path(args.inputs)
     if not path.exists():
         raise SystemExit(f"Inputs file not found: {path}")
-    texts = [
+    texts = tuple(
         l.strip() for l in path.read_text(encoding="utf-8").splitlines() if l.strip()
-    ]
+    )
     artifact = run(args.runs, args.discard_warmup, texts, args.hf_tokenizer)
     print(json.dumps(artifact, indent=2))
     if args.out:
@@ -2,19 +2,80 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
 import os
+import platform
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
 import onnxruntime as ort
 from tokenizers import Tokenizer
 
+try:  # tokenizers >= 0.21
+    from tokenizers.decoders import DecodeStream
+except ImportError:  # pragma: no cover - older tokenizers
+    DecodeStream = None
+
+try:  # optional: multi-pattern stop-sequence matching
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional dependency
+    ahocorasick = None
+
 from chat.base import BaseChatModel, ChatGeneration
 from core.router_types import UnifiedRequest
+from runtime.utils import ort_graph_cache
+from runtime.utils.ort_env import apply_thread_options, physical_cores
 
 logger = logging.getLogger(__name__)
 
+# ONNX tensor type strings -> NumPy dtypes for buffers bound via IOBinding
+_ORT_DTYPES: Dict[str, Any] = {
+    "tensor(float16)": np.float16,
+    "tensor(float)": np.float32,
+}
+
+# Prefix cache value for a system prompt seen once: its split is only
+# encoded and verified if the same prompt comes back
+_PREFIX_UNVERIFIED: Any = object()
+
+
+class _IncrementalDecoder:
+    """Decode generated tokens one at a time, returning only the new text.
+
+    Uses ``tokenizers``' ``DecodeStream`` when available; otherwise re-decodes
+    a short window between prefix/read offsets so multi-token characters and
+    word-piece merges still come out right.
+    """
+
+    def __init__(self, tokenizer: Tokenizer):
+        self.tokenizer = tokenizer
+        self.stream = (
+            DecodeStream(skip_special_tokens=True) if DecodeStream is not None else None
+        )
+        self.ids: List[int] = []
+        self.prefix_offset = 0
+        self.read_offset = 0
+
+    def step(self, token_id: int) -> str:
+        if self.stream is not None:
+            return self.stream.step(self.tokenizer, token_id) or ""
+        self.ids.append(token_id)
+        decode = self.tokenizer.decode
+        prefix_text = decode(
+            self.ids[self.prefix_offset : self.read_offset], skip_special_tokens=True
+        )
+        new_text = decode(self.ids[self.prefix_offset :], skip_special_tokens=True)
+        if len(new_text) > len(prefix_text) and not new_text.endswith("\ufffd"):
+            self.prefix_offset = self.read_offset
+            self.read_offset = len(self.ids)
+            return new_text[len(prefix_text) :]
+        return ""
+
 
 class GemmaChatModel(BaseChatModel):
     """ONNX-based text generation for Gemma 3n."""
@@ -24,6 +85,15 @@ class GemmaChatModel(BaseChatModel):
     VALUE_NAME_TEMPLATE = "past_key_values.{layer}.value"
     PRESENT_KEY_TEMPLATE = "present.{layer}.key"
     PRESENT_VALUE_TEMPLATE = "present.{layer}.value"
+    KV_HEADS = 2
+    HEAD_DIM = 256
+    TOP_P_CANDIDATES = 1024  # initial partial-sort width for nucleus sampling
+    PREFIX_CACHE_SIZE = 32  # distinct system prompts kept tokenized
+    KV_BLOCK_TOKENS = 512  # KV buffer capacity granularity
+    ENCODE_BATCH_WINDOW_S = 0.002  # how long to gather concurrent encodes
+    ENCODE_BATCH_MAX = 32
+    PROVIDER_CACHE_FILE = ".provider_cache.json"
+    STOP_AUTOMATON_MIN = 3  # fewer stops are cheaper to find() one by one
 
     def __init__(self, model_id: str, model_path: str):
         super().__init__(model_id=model_id, model_path=model_path)
@@ -38,6 +108,54 @@ class GemmaChatModel(BaseChatModel):
         self.max_context: int = 32768
         self.default_max_new_tokens: int = 256
         self.rng = np.random.default_rng()
+        # Binding names resolved once instead of formatting 4 x NUM_LAYERS
+        # strings per generated token
+        layers = range(self.NUM_LAYERS)
+        self._past_key_names = [self.KEY_NAME_TEMPLATE.format(layer=i) for i in layers]
+        self._past_value_names = [
+            self.VALUE_NAME_TEMPLATE.format(layer=i) for i in layers
+        ]
+        self._present_key_names = [
+            self.PRESENT_KEY_TEMPLATE.format(layer=i) for i in layers
+        ]
+        self._present_value_names = [
+            self.PRESENT_VALUE_TEMPLATE.format(layer=i) for i in layers
+        ]
+        # (past, present) name pairs in KV buffer order: every layer's key,
+        # then every layer's value
+        self._kv_names: List[Tuple[str, str]] = list(
+            zip(self._past_key_names, self._present_key_names)
+        ) + list(zip(self._past_value_names, self._present_value_names))
+        self._decoder_binding: Optional[ort.IOBinding] = None
+        # Runs the next decoder step while the host decodes/stop-checks the
+        # previous token (ORT releases the GIL during Run)
+        self._step_executor: Optional[ThreadPoolExecutor] = None
+        # Leading system-message text -> its token ids (None when the
+        # prefix/suffix split does not reproduce the full encoding,
+        # _PREFIX_UNVERIFIED when seen only once so far)
+        self._prefix_cache: "OrderedDict[str, Any]" = OrderedDict()
+        # Concurrent requests' prompt encodes are coalesced into encode_batch
+        # calls (Rust-parallel, GIL released) by a collector task
+        self._encode_queue: Optional[asyncio.Queue] = None
+        self._encode_task: Optional[asyncio.Task] = None
+        # Pre-allocated KV storage: [ping/pong, key/value, layer, flat tokens].
+        # Each step reads pasts from one half and ORT writes presents straight
+        # into the other, so no per-token allocation or dtype conversion.
+        self._kv_dtype: Any = np.float32
+        self._decoder_input_dtypes: Dict[str, Any] = {}
+        self._embeds_dtype: Any = np.float32
+        self._per_layer_dtype: Any = np.float32
+        # Embed outputs stay OrtValues and are bound to the decoder as-is when
+        # their dtypes already match; single-token ids reuse one OrtValue.
+        self._embeds_native: bool = False
+        self._step_ids_value: Optional[ort.OrtValue] = None
+        self._kv_buffers: Optional[np.ndarray] = None
+        self._kv_row_addresses: List[List[int]] = []
+        self._kv_capacity: int = 0
+        self._kv_slot: int = 0
+        self._kv_len: int = 0
+        self._logits_buffer: Optional[np.ndarray] = None
+        self._softmax_buffer: Optional[np.ndarray] = None
 
     async def load(self) -> bool:
         try:
@@ -58,7 +176,6 @@ class GemmaChatModel(BaseChatModel):
             if not providers:
                 providers = ["CPUExecutionProvider"]
 
-            # Load embedding projection model
             embed_model_file = os.path.join(
                 self.model_path, "onnx", "embed_tokens_quantized.onnx"
             )
@@ -66,19 +183,6 @@ class GemmaChatModel(BaseChatModel):
                 raise FileNotFoundError(
                     f"Gemma embed_tokens ONNX not found: {embed_model_file}"
                 )
-
-            self.embed_session = ort.InferenceSession(
-                embed_model_file, providers=providers
-            )
-            self.embed_output_names = [
-                out.name for out in self.embed_session.get_outputs()
-            ]
-            logger.info(
-                "Gemma embedding model loaded with providers: %s",
-                self.embed_session.get_providers(),
-            )
-
-            # Load decoder model
             decoder_model_file = os.path.join(
                 self.model_path, "onnx", "decoder_model_merged_q4.onnx"
             )
@@ -87,15 +191,58 @@ class GemmaChatModel(BaseChatModel):
                     f"Gemma decoder ONNX not found: {decoder_model_file}"
                 )
 
-            self.decoder_session = ort.InferenceSession(
-                decoder_model_file, providers=providers
+            # Load decoder model; the embedding projection follows its provider
+            self.decoder_session = self._create_decoder_session(
+                decoder_model_file, providers
             )
             self.providers = self.decoder_session.get_providers()
+
+            self.embed_session = self._create_session(embed_model_file, self.providers)
+            self.embed_output_names = [
+                out.name for out in self.embed_session.get_outputs()
+            ]
+            logger.info(
+                "Gemma embedding model loaded with providers: %s",
+                self.embed_session.get_providers(),
+            )
+
             self.decoder_output_names = [
                 out.name for out in self.decoder_session.get_outputs()
             ]
+            # Declared input dtypes: the q4 decoder keeps its KV cache in fp16,
+            # so buffers stay native and embeddings are cast only on mismatch
+            self._decoder_input_dtypes = {
+                inp.name: _ORT_DTYPES[inp.type]
+                for inp in self.decoder_session.get_inputs()
+                if inp.type in _ORT_DTYPES
+            }
+            self._kv_dtype = self._decoder_input_dtypes.get(
+                self._past_key_names[0], np.float32
+            )
+            self._embeds_dtype = self._decoder_input_dtypes.get(
+                "inputs_embeds", np.float32
+            )
+            self._per_layer_dtype = self._decoder_input_dtypes.get(
+                "per_layer_inputs", np.float32
+            )
+            embed_output_dtypes = [
+                _ORT_DTYPES.get(out.type) for out in self.embed_session.get_outputs()
+            ]
+            self._embeds_native = embed_output_dtypes == [
+                self._embeds_dtype,
+                self._per_layer_dtype,
+            ]
+            self._step_ids_value = ort.OrtValue.ortvalue_from_numpy(
+                np.zeros((1, 1), dtype=np.int64)
+            )
+            # Every step rebinds all names, so one binding is reused throughout
+            self._decoder_binding = self.decoder_session.io_binding()
+            self._step_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="gemma-decode"
+            )
             logger.info("Gemma decoder loaded with providers: %s", self.providers)
 
+            self._start_encode_batcher()
             self.is_loaded = True
             return True
 
@@ -107,10 +254,151 @@ class GemmaChatModel(BaseChatModel):
             self.tokenizer = None
             return False
 
+    def _create_decoder_session(
+        self, model_file: str, providers: List[str]
+    ) -> ort.InferenceSession:
+        """Create the decoder session on the fastest available provider.
+
+        Quantized graphs can run slower on an accelerator (which may fall back
+        to fp32 kernels) than on CPU's int kernels, so when there is a choice
+        each provider is timed on a one-token forward pass and the winner is
+        remembered in ``.provider_cache.json`` per model file and host.
+        ``GATEWAY_FORCE_EP`` selects a provider outright.
+        """
+        forced = os.getenv("GATEWAY_FORCE_EP")
+        if forced:
+            if forced in providers:
+                return self._create_session(model_file, self._with_cpu_fallback(forced))
+            logger.warning(
+                "GATEWAY_FORCE_EP=%s is not available (have %s); ignoring",
+                forced,
+                providers,
+            )
+        if len(providers) == 1:
+            return self._create_session(model_file, providers)
+
+        cache_file = os.path.join(self.model_path, self.PROVIDER_CACHE_FILE)
+        stat = os.stat(model_file)
+        cache_key = (
+            f"{os.path.basename(model_file)}:{stat.st_size}:{int(stat.st_mtime)}"
+            f"@{platform.node()}"
+        )
+        try:
+            with open(cache_file, "r", encoding="utf-8") as handle:
+                cache = json.load(handle)
+        except (OSError, ValueError):
+            cache = {}
+        cached = cache.get(cache_key)
+        if cached in providers:
+            logger.info("Using cached decoder provider choice: %s", cached)
+            return self._create_session(model_file, self._with_cpu_fallback(cached))
+
+        # Only the fastest session so far is kept alive while probing
+        best_session, best_provider = None, None
+        latencies: Dict[str, float] = {}
+        for provider in providers:
+            try:
+                session = self._create_session(
+                    model_file, self._with_cpu_fallback(provider)
+                )
+                latencies[provider] = self._time_one_token(session)
+            except Exception as exc:
+                logger.warning("Decoder probe failed on %s: %s", provider, exc)
+                continue
+            if best_provider is None or latencies[provider] < latencies[best_provider]:
+                best_session, best_provider = session, provider
+            del session
+
+        if best_session is None:
+            return self._create_session(model_file, providers)
+        logger.info(
+            "Gemma decoder one-token latency by provider (ms): %s",
+            {p: round(t * 1000, 2) for p, t in latencies.items()},
+        )
+        cache[cache_key] = best_provider
+        try:
+            with open(cache_file, "w", encoding="utf-8") as handle:
+                json.dump(cache, handle, indent=2)
+        except OSError as exc:
+            logger.warning("Could not write %s: %s", cache_file, exc)
+        return best_session
+
+    @staticmethod
+    def _with_cpu_fallback(provider: str) -> List[str]:
+        if provider == "CPUExecutionProvider":
+            return [provider]
+        return [provider, "CPUExecutionProvider"]
+
+    @staticmethod
+    def _time_one_token(session: ort.InferenceSession, runs: int = 3) -> float:
+        """Best wall time (seconds) of a zero-filled one-token, empty-cache pass."""
+        feed = {}
+        for inp in session.get_inputs():
+            is_past = inp.name.startswith("past_key_values.")
+            shape = [
+                dim if isinstance(dim, int) else (0 if is_past and axis == 2 else 1)
+                for axis, dim in enumerate(inp.shape)
+            ]
+            feed[inp.name] = np.zeros(shape, dtype=_ORT_DTYPES.get(inp.type, np.int64))
+        session.run(None, feed)  # warm-up
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            session.run(None, feed)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def _create_session(
+        self, model_file: str, providers: List[str]
+    ) -> ort.InferenceSession:
+        """Create an InferenceSession with full graph optimisation enabled.
+
+        On CPU-only hosts the optimised graph goes through the opt-in cache in
+        GATEWAY_ORT_GRAPH_CACHE_DIR (see runtime.utils.ort_graph_cache).
+        Accelerator providers rewrite the graph for their own kernels, so
+        nothing is cached for them.
+        """
+
+        def options() -> ort.SessionOptions:
+            opts = ort.SessionOptions()
+            opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            # Decoder steps are a strict chain; parallel mode only adds overhead
+            opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            # Own pool per physical core, or the shared GATEWAY_ORT_GLOBAL_THREADS one
+            apply_thread_options(opts, physical_cores())
+            opts.enable_mem_pattern = True
+            return opts
+
+        provider_list: List[Any] = [
+            (
+                (p, {"device_id": 0, "performance_preference": "high_performance"})
+                if p == "DmlExecutionProvider"
+                else p
+            )
+            for p in providers
+        ]
+        if providers != ["CPUExecutionProvider"]:
+            return ort.InferenceSession(
+                model_file, sess_options=options(), providers=provider_list
+            )
+        return ort_graph_cache.create_session(model_file, options, provider_list)
+
     async def unload(self) -> None:
+        self._stop_encode_batcher()
+        if self._step_executor is not None:
+            self._step_executor.shutdown()
+            self._step_executor = None
+        self._kv_buffers = None
+        self._kv_row_addresses = []
+        self._kv_capacity = 0
+        self._logits_buffer = None
+        self._softmax_buffer = None
+        self._decoder_binding = None
+        self._step_ids_value = None
         self.decoder_session = None
         self.embed_session = None
         self.tokenizer = None
+        self._prefix_cache.clear()
         self.is_loaded = False
 
     async def generate(self, request: UnifiedRequest) -> ChatGeneration:
@@ -127,10 +415,9 @@ class GemmaChatModel(BaseChatModel):
         temperature: float = float(request.content.get("temperature", 0.7) or 0.0)
         top_p: float = float(request.content.get("top_p", 1.0) or 1.0)
         stop_sequences = self._normalize_stop_sequences(request.content.get("stop"))
+        stop_matcher = self._build_stop_matcher(stop_sequences)
 
-        prompt_text = self._build_prompt_from_messages(messages)
-        encoding = self.tokenizer.encode(prompt_text)
-        input_ids = encoding.ids
+        input_ids = await self._encode_prompt(messages)
         prompt_token_count = len(input_ids)
 
         if prompt_token_count >= self.max_context:
@@ -151,18 +438,19 @@ class GemmaChatModel(BaseChatModel):
         )
 
         # Prime decoder with full prompt
-        past_key_values = self._init_past_key_values()
+        self._reset_kv_cache(min(prompt_token_count + max_new_tokens, self.max_context))
         total_length = prompt_token_count
 
-        logits, past_key_values = self._run_decoder_step(
+        logits = self._run_decoder_step(
             input_token_ids=np.array([input_ids], dtype=np.int64),
             position_offset=0,
-            past_key_values=past_key_values,
         )
 
         generated_ids: List[int] = []
         finish_reason = "stop"
         accumulated_text = ""
+        decoder = _IncrementalDecoder(self.tokenizer)
+        max_stop_len = max(map(len, stop_sequences), default=0)
 
         for step in range(max_new_tokens):
             next_token_id = self._select_next_token(logits, temperature, top_p)
@@ -173,39 +461,43 @@ class GemmaChatModel(BaseChatModel):
                 generated_ids.pop()  # Do not include EOS in final text
                 break
 
-            # Decode partial text to evaluate stop sequences
-            partial_text = self.tokenizer.decode(
-                generated_ids, skip_special_tokens=True
-            )
-            truncated_text, stopped = self._apply_stop_sequences(
-                partial_text, stop_sequences
-            )
-            accumulated_text = truncated_text
+            # Launch the forward pass for this token before the host-side
+            # text work so the two overlap. If a stop sequence then fires the
+            # result is discarded; the KV cache is reset per request.
+            total_length += 1
+            pending: Optional[Future] = None
+            if total_length < self.max_context and step + 1 < max_new_tokens:
+                pending = self._step_executor.submit(
+                    self._run_decoder_step,
+                    np.array([[next_token_id]], dtype=np.int64),
+                    prompt_token_count + len(generated_ids) - 1,
+                )
+
+            # Decode only the new token; stop sequences can only complete in
+            # the tail that overlaps the newly appended text
+            previous_len = len(accumulated_text)
+            accumulated_text += decoder.step(int(next_token_id))
+            stopped = False
+            if len(accumulated_text) > previous_len:
+                accumulated_text, stopped = self._apply_stop_sequences(
+                    accumulated_text,
+                    stop_sequences,
+                    start=max(0, previous_len - max_stop_len + 1),
+                    matcher=stop_matcher,
+                )
+
+            # Always join so no step is still writing the KV cache on exit
+            if pending is not None:
+                logits = pending.result()
             if stopped:
                 finish_reason = "stop"
                 break
-
-            total_length += 1
             if total_length >= self.max_context:
                 finish_reason = "length"
                 break
 
-            logits, past_key_values = self._run_decoder_step(
-                input_token_ids=np.array([[next_token_id]], dtype=np.int64),
-                position_offset=prompt_token_count + len(generated_ids) - 1,
-                past_key_values=past_key_values,
-            )
-
         else:
             finish_reason = "length"
-            accumulated_text = self.tokenizer.decode(
-                generated_ids, skip_special_tokens=True
-            )
-
-        if not accumulated_text:
-            accumulated_text = self.tokenizer.decode(
-                generated_ids, skip_special_tokens=True
-            )
 
         metadata: Dict[str, Any] = {
             "providers": self.providers,
@@ -226,92 +518,169 @@ class GemmaChatModel(BaseChatModel):
         self,
         input_token_ids: np.ndarray,
         position_offset: int,
-        past_key_values: Sequence[Tuple[np.ndarray, np.ndarray]],
-    ) -> Tuple[np.ndarray, Sequence[Tuple[np.ndarray, np.ndarray]]]:
-        """Run embedding + decoder for given token IDs and return logits and presents."""
+    ) -> np.ndarray:
+        """Run embedding + decoder for given token IDs and return last-position logits.
+
+        The KV cache lives in ``self._kv_buffers`` and is advanced in place.
+        """
 
         if not self.embed_session or not self.decoder_session:
             raise RuntimeError("Gemma sessions not initialised")
 
-        embed_outputs = self.embed_session.run(
+        seq_len = input_token_ids.shape[1]
+        if seq_len == 1:
+            ids_value = self._step_ids_value
+            ids_value.update_inplace(input_token_ids)
+        else:
+            ids_value = ort.OrtValue.ortvalue_from_numpy(input_token_ids)
+        inputs_embeds, per_layer_inputs = self.embed_session.run_with_ort_values(
             self.embed_output_names,
-            {"input_ids": input_token_ids},
+            {"input_ids": ids_value},
         )
 
-        inputs_embeds, per_layer_inputs = embed_outputs
-
-        seq_len = input_token_ids.shape[1]
         position_ids = np.arange(
             position_offset, position_offset + seq_len, dtype=np.int64
         ).reshape(1, seq_len)
 
-        decoder_inputs: Dict[str, np.ndarray] = {
-            "inputs_embeds": inputs_embeds.astype(np.float32),
-            "per_layer_inputs": per_layer_inputs.astype(np.float32),
-            "position_ids": position_ids,
-        }
+        if self._kv_len + seq_len > self._kv_capacity:
+            raise RuntimeError("Gemma KV cache capacity exceeded")
 
-        for layer_idx, (key_cache, value_cache) in enumerate(past_key_values):
-            decoder_inputs[self.KEY_NAME_TEMPLATE.format(layer=layer_idx)] = key_cache
-            decoder_inputs[self.VALUE_NAME_TEMPLATE.format(layer=layer_idx)] = (
-                value_cache
+        binding = self._decoder_binding
+        if self._embeds_native:
+            binding.bind_ortvalue_input("inputs_embeds", inputs_embeds)
+            binding.bind_ortvalue_input("per_layer_inputs", per_layer_inputs)
+        else:
+            binding.bind_cpu_input(
+                "inputs_embeds",
+                inputs_embeds.numpy().astype(self._embeds_dtype, copy=False),
             )
-
-        outputs = self.decoder_session.run(self.decoder_output_names, decoder_inputs)
-        output_map = dict(zip(self.decoder_output_names, outputs))
-
-        logits = output_map["logits"][:, -1, :]  # [batch, vocab]
-
-        next_past: List[Tuple[np.ndarray, np.ndarray]] = []
-        for layer_idx in range(self.NUM_LAYERS):
-            next_key = output_map[self.PRESENT_KEY_TEMPLATE.format(layer=layer_idx)]
-            next_value = output_map[self.PRESENT_VALUE_TEMPLATE.format(layer=layer_idx)]
-            next_past.append(
-                (next_key.astype(np.float32), next_value.astype(np.float32))
+            binding.bind_cpu_input(
+                "per_layer_inputs",
+                per_layer_inputs.numpy().astype(self._per_layer_dtype, copy=False),
+            )
+        binding.bind_cpu_input("position_ids", position_ids)
+
+        # Single-token steps write logits into a reusable buffer; the prompt
+        # pass lets ORT allocate since its length varies per request.
+        logits_buffer = self._logits_buffer if seq_len == 1 else None
+        if logits_buffer is not None:
+            binding.bind_output(
+                "logits",
+                "cpu",
+                0,
+                logits_buffer.dtype,
+                logits_buffer.shape,
+                logits_buffer.ctypes.data,
+            )
+        else:
+            binding.bind_output("logits", "cpu")
+
+        past_shape = (1, self.KV_HEADS, self._kv_len, self.HEAD_DIM)
+        present_shape = (1, self.KV_HEADS, self._kv_len + seq_len, self.HEAD_DIM)
+        kv_dtype = self._kv_dtype
+        for (past_name, present_name), past_address, present_address in zip(
+            self._kv_names,
+            self._kv_row_addresses[self._kv_slot],
+            self._kv_row_addresses[1 - self._kv_slot],
+        ):
+            binding.bind_input(past_name, "cpu", 0, kv_dtype, past_shape, past_address)
+            binding.bind_output(
+                present_name, "cpu", 0, kv_dtype, present_shape, present_address
             )
 
-        return logits, next_past
+        self.decoder_session.run_with_iobinding(binding)
+        self._kv_slot = 1 - self._kv_slot
+        self._kv_len += seq_len
 
-    def _init_past_key_values(self) -> List[Tuple[np.ndarray, np.ndarray]]:
-        empty = []
-        for _ in range(self.NUM_LAYERS):
-            zero_shape = (1, 2, 0, 256)
-            empty.append(
-                (
-                    np.zeros(zero_shape, dtype=np.float32),
-                    np.zeros(zero_shape, dtype=np.float32),
+        if logits_buffer is None:
+            logits_out = binding.get_outputs()[0].numpy()
+            if self._logits_buffer is None:
+                self._logits_buffer = np.empty(
+                    (1, 1, logits_out.shape[-1]), dtype=logits_out.dtype
                 )
+            return logits_out[:, -1, :]  # [batch, vocab]
+        return logits_buffer[:, -1, :]
+
+    def _reset_kv_cache(self, capacity: int) -> None:
+        """Empty the KV cache, (re)allocating storage for ``capacity`` tokens.
+
+        Storage is one block in the decoder's dtype with all keys and all
+        values in separate contiguous planes (structure of arrays),
+        sized per request rather than for ``max_context`` (which would be GBs),
+        rounded up so similar-length requests reuse it. Every slot is written
+        by ORT before it is read, so it is left uninitialised. The address of
+        each [key/value, layer] row is recorded per half so steps bind raw
+        pointers without building views.
+        """
+        if self._kv_buffers is None or self._kv_capacity < capacity:
+            block = self.KV_BLOCK_TOKENS
+            capacity = min(self.max_context, -(-capacity // block) * block)
+            self._kv_buffers = np.empty(
+                (
+                    2,
+                    2,
+                    self.NUM_LAYERS,
+                    capacity * self.KV_HEADS * self.HEAD_DIM,
+                ),
+                dtype=self._kv_dtype,
             )
-        return empty
+            self._kv_capacity = capacity
+            buffers = self._kv_buffers
+            row_bytes = buffers.strides[2]  # one layer's key or value
+            self._kv_row_addresses = [
+                [
+                    half.ctypes.data + slot * row_bytes
+                    for slot in range(len(self._kv_names))
+                ]
+                for half in buffers
+            ]
+        self._kv_slot = 0
+        self._kv_len = 0
 
     def _select_next_token(
         self, logits: np.ndarray, temperature: float, top_p: float
     ) -> int:
-        logits = logits[0].astype(np.float32)
+        logits = logits[0]
 
         if temperature is None or temperature <= 0.0:
             return int(np.argmax(logits))
 
-        adjusted_logits = logits / max(temperature, 1e-5)
-        adjusted_logits -= np.max(adjusted_logits)
-        probs = np.exp(adjusted_logits)
-        probs /= np.sum(probs)
+        # Softmax in place in a vocab-sized buffer reused across tokens, so no
+        # full-vocabulary temporaries are allocated per step
+        probs = self._softmax_buffer
+        if probs is None or probs.shape != logits.shape:
+            probs = self._softmax_buffer = np.empty(logits.shape, dtype=np.float32)
+        np.multiply(logits, 1.0 / max(temperature, 1e-5), out=probs)
+        probs -= probs.max()
+        np.exp(probs, out=probs)
+        probs /= probs.sum()
 
         if top_p is not None and 0 < top_p < 1.0:
-            sorted_indices = np.argsort(probs)[::-1]
-            sorted_probs = probs[sorted_indices]
-            cumulative = np.cumsum(sorted_probs)
-            cutoff = cumulative <= top_p
-            if not np.any(cutoff):
-                cutoff[0] = True
-            filtered_indices = sorted_indices[cutoff]
-            filtered_probs = sorted_probs[cutoff]
-            filtered_probs /= np.sum(filtered_probs)
-            choice = self.rng.choice(filtered_indices, p=filtered_probs)
-            return int(choice)
-
-        choice = self.rng.choice(len(probs), p=probs)
-        return int(choice)
+            # Only the head of the distribution can be in the nucleus: partition
+            # out the top-k and sort those, widening k if they don't cover top_p
+            vocab_size = probs.shape[0]
+            k = min(self.TOP_P_CANDIDATES, vocab_size)
+            while True:
+                if k < vocab_size:
+                    candidates = np.argpartition(probs, -k)[-k:]
+                else:
+                    candidates = np.arange(vocab_size)
+                sorted_indices = candidates[np.argsort(probs[candidates])[::-1]]
+                cumulative = np.cumsum(probs[sorted_indices])
+                if cumulative[-1] > top_p or k == vocab_size:
+                    break
+                k = min(k * 2, vocab_size)
+            keep = max(1, int(np.searchsorted(cumulative, top_p, side="right")))
+            cumulative = cumulative[:keep]
+            # Inverse-CDF sample over the (unnormalised) nucleus
+            r = self.rng.random() * cumulative[-1]
+            idx = min(int(np.searchsorted(cumulative, r, side="right")), keep - 1)
+            return int(sorted_indices[idx])
+
+        # Inverse-CDF sample; the cumulative sum overwrites the scratch buffer
+        cdf = np.cumsum(probs, out=probs)
+        r = self.rng.random() * cdf[-1]
+        return min(int(np.searchsorted(cdf, r, side="right")), cdf.shape[0] - 1)
 
     def _normalize_stop_sequences(self, stop: Any) -> List[str]:
         if not stop:
@@ -322,22 +691,207 @@ class GemmaChatModel(BaseChatModel):
             return [s for s in stop if isinstance(s, str)]
         return []
 
+    def _build_stop_matcher(self, stop_sequences: Sequence[str]) -> Optional[Any]:
+        """Aho-Corasick automaton over the stops, when there are enough to pay off.
+
+        One pass over the text then finds every stop at once instead of one
+        ``find`` per stop. Returns None without ``pyahocorasick`` installed.
+        """
+        stops = [seq for seq in stop_sequences if seq]
+        if ahocorasick is None or len(stops) < self.STOP_AUTOMATON_MIN:
+            return None
+        automaton = ahocorasick.Automaton()
+        for seq in stops:
+            automaton.add_word(seq, len(seq))
+        automaton.make_automaton()
+        return automaton
+
     def _apply_stop_sequences(
-        self, text: str, stop_sequences: Sequence[str]
+        self,
+        text: str,
+        stop_sequences: Sequence[str],
+        start: int = 0,
+        matcher: Optional[Any] = None,
     ) -> Tuple[str, bool]:
+        """Truncate ``text`` at the earliest stop sequence at or after ``start``."""
         if not stop_sequences:
             return text, False
-        for seq in stop_sequences:
-            if seq and seq in text:
-                return text.split(seq)[0], True
+        if matcher is not None:
+            starts = [end - length + 1 for end, length in matcher.iter(text, start)]
+        else:
+            starts = [text.find(seq, start) for seq in stop_sequences if seq]
+            starts = [idx for idx in starts if idx != -1]
+        if starts:
+            return text[: min(starts)], True
         return text, False
 
-    def _build_prompt_from_messages(self, messages: List[Dict[str, Any]]) -> str:
-        parts: List[str] = []
-        for message in messages:
-            role = message.get("role", "user")
-            content = message.get("content", "")
-            parts.append(f"<|{role}|>\n{content}<|end|>")
+    def _start_encode_batcher(self) -> None:
+        if self._encode_batcher_running():
+            return
+        self._stop_encode_batcher()
+        self._encode_queue = asyncio.Queue()
+        self._encode_task = asyncio.get_running_loop().create_task(
+            self._encode_batcher()
+        )
+
+    def _stop_encode_batcher(self) -> None:
+        """Cancel the collector and fail encodes still waiting in its queue."""
+        task, queue = self._encode_task, self._encode_queue
+        self._encode_task = None
+        self._encode_queue = None
+        if task is not None and not task.done():
+            task.cancel()
+        if queue is not None:
+            self._fail_encodes(self._drain(queue))
+
+    def _encode_batcher_running(self) -> bool:
+        """Whether the collector task is alive on the current event loop.
+
+        load() and generate() may run under different event loops (e.g.
+        separate asyncio.run() calls); a task from another loop would never
+        resolve this loop's futures.
+        """
+        task = self._encode_task
+        return (
+            task is not None
+            and not task.done()
+            and task.get_loop() is asyncio.get_running_loop()
+        )
+
+    @staticmethod
+    def _drain(queue: asyncio.Queue, limit: Optional[int] = None) -> List[Any]:
+        items = []
+        while not queue.empty() and (limit is None or len(items) < limit):
+            items.append(queue.get_nowait())
+        return items
+
+    @staticmethod
+    def _fail_encodes(items: Sequence[Any]) -> None:
+        for _, _, future in items:
+            if not future.done():
+                future.set_exception(RuntimeError("Gemma encode batcher stopped"))
+
+    async def _encode(self, text: str, add_special_tokens: bool = True) -> List[int]:
+        """Token ids for ``text``, batched with other in-flight encodes."""
+        if not self._encode_batcher_running():
+            return self.tokenizer.encode(
+                text, add_special_tokens=add_special_tokens
+            ).ids
+        future = asyncio.get_running_loop().create_future()
+        self._encode_queue.put_nowait((text, add_special_tokens, future))
+        return await future
+
+    async def _encode_batcher(self) -> None:
+        """Tokenize queued encode requests together.
+
+        Encodes queued in the same loop iteration are batched immediately; a
+        short window for stragglers is only opened when there is concurrency,
+        so a lone prompt never waits.
+        """
+        queue = self._encode_queue
+        loop = asyncio.get_running_loop()
+        batch: List[Any] = []
+        try:
+            while True:
+                batch = [await queue.get()]
+                await asyncio.sleep(0)  # let concurrently scheduled encodes enqueue
+                batch += self._drain(queue, self.ENCODE_BATCH_MAX - 1)
+                deadline = loop.time() + self.ENCODE_BATCH_WINDOW_S
+                while 1 < len(batch) < self.ENCODE_BATCH_MAX:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                self._encode_batch(batch)
+                batch = []
+        except asyncio.CancelledError:
+            self._fail_encodes(batch + self._drain(queue))
+            raise
+
+    def _encode_batch(self, batch: Sequence[Any]) -> None:
+        for add_special_tokens in (True, False):
+            group = [item for item in batch if item[1] is add_special_tokens]
+            if not group:
+                continue
+            try:
+                encodings = self.tokenizer.encode_batch(
+                    [text for text, _, _ in group],
+                    add_special_tokens=add_special_tokens,
+                )
+            except Exception as exc:
+                for _, _, future in group:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, _, future), encoding in zip(group, encodings):
+                if not future.done():
+                    future.set_result(encoding.ids)
+
+    async def _encode_prompt(self, messages: Sequence[Dict[str, Any]]) -> List[int]:
+        """Tokenize the chat prompt, reusing cached ids for a repeated system prompt.
+
+        The leading system message(s) are the part repeated verbatim across
+        requests and across the turns of one conversation; the rest (history
+        and the new message) changes every turn. On a cache hit only that rest
+        and the assistant header are encoded. A system prompt seen for the
+        first time costs a single full encode; the split is verified when it
+        comes back.
+        """
+        system_count = 0
+        while (
+            system_count < len(messages) - 1
+            and messages[system_count].get("role") == "system"
+        ):
+            system_count += 1
+        if not system_count:
+            return await self._encode(self._build_prompt_from_messages(messages))
+
+        prefix_text = (
+            "\n".join(self._format_message(m) for m in messages[:system_count]) + "\n"
+        )
+        suffix_text = (
+            "\n".join(self._format_message(m) for m in messages[system_count:])
+            + "\n<|assistant|>\n"
+        )
+        cache = self._prefix_cache
+        if prefix_text not in cache:
+            cache[prefix_text] = _PREFIX_UNVERIFIED
+            if len(cache) > self.PREFIX_CACHE_SIZE:
+                cache.popitem(last=False)
+            return await self._encode(prefix_text + suffix_text)
+        cache.move_to_end(prefix_text)
+        prefix_ids = cache[prefix_text]
+        if prefix_ids is None:  # the split does not round-trip for this prompt
+            return await self._encode(prefix_text + suffix_text)
+        if prefix_ids is not _PREFIX_UNVERIFIED:
+            return prefix_ids + await self._encode(
+                suffix_text, add_special_tokens=False
+            )
+
+        # Second sight: encode in full, and only cache the prefix if splitting
+        # at the message boundary reproduces the same ids (no cross-boundary
+        # merges)
+        input_ids, prefix_ids, suffix_ids = await asyncio.gather(
+            self._encode(prefix_text + suffix_text),
+            self._encode(prefix_text),
+            self._encode(suffix_text, add_special_tokens=False),
+        )
+        cache[prefix_text] = (
+            prefix_ids if prefix_ids + suffix_ids == input_ids else None
+        )
+        return input_ids
+
+    @staticmethod
+    def _format_message(message: Dict[str, Any]) -> str:
+        role = message.get("role", "user")
+        content = message.get("content", "")
+        return f"<|{role}|>\n{content}<|end|>"
+
+    def _build_prompt_from_messages(self, messages: Sequence[Dict[str, Any]]) -> str:
+        parts: List[str] = [self._format_message(m) for m in messages]
         parts.append("<|assistant|>\n")
         return "\n".join(parts)
 
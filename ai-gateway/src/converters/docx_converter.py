@@ -3,22 +3,89 @@ DOCX Document Converter
 Converts Microsoft Word documents to structured text using python-docx and Polars
 """
 
+import io
 import logging
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import polars as pl
 from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
 from docx.shared import Inches
+from lxml import etree
 
 logger = logging.getLogger(__name__)
 
+# Compiled XPath over the WordprocessingML tree python-docx has already parsed;
+# avoids building Paragraph/Run/Table proxy objects per element
+_W_NS = {"w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main"}
+_W = "{%s}" % _W_NS["w"]
+_BODY_PARAGRAPHS = etree.XPath("./w:body/w:p", namespaces=_W_NS)
+_BODY_TABLES = etree.XPath("./w:body/w:tbl", namespaces=_W_NS)
+_PARA_STYLE_ID = etree.XPath("string(./w:pPr/w:pStyle/@w:val)", namespaces=_W_NS)
+# Union results come back in document order, i.e. b, i, u per run (schema order)
+_RUN_FLAGS = etree.XPath(
+    "./w:r/w:rPr/w:b | ./w:r/w:rPr/w:i | ./w:r/w:rPr/w:u", namespaces=_W_NS
+)
+_TABLE_ROWS = etree.XPath("./w:tr", namespaces=_W_NS)
+_TABLE_GRID_COLS = etree.XPath("count(./w:tblGrid/w:gridCol)", namespaces=_W_NS)
+_ROW_GRID_BEFORE = etree.XPath("string(./w:trPr/w:gridBefore/@w:val)", namespaces=_W_NS)
+_ROW_CELLS = etree.XPath("./w:tc", namespaces=_W_NS)
+_CELL_PARAGRAPHS = etree.XPath("./w:p", namespaces=_W_NS)
+_CELL_GRID_SPAN = etree.XPath("string(./w:tcPr/w:gridSpan/@w:val)", namespaces=_W_NS)
+_CELL_VMERGE = etree.XPath("./w:tcPr/w:vMerge", namespaces=_W_NS)
+# Run content that has a text equivalent, in document order, for runs directly
+# in the paragraph or inside hyperlinks (python-docx >= 1.0 Paragraph.text)
+_RUN_TEXT_TAGS = ("t", "tab", "ptab", "br", "cr", "noBreakHyphen")
+_PARA_TEXT_NODES = etree.XPath(
+    " | ".join(f"./w:r/w:{tag} | ./w:hyperlink/w:r/w:{tag}" for tag in _RUN_TEXT_TAGS),
+    namespaces=_W_NS,
+)
+
+_FLAG_NAMES = {_W + "b": "bold", _W + "i": "italic", _W + "u": "underline"}
+_OFF_VALUES = {"0", "false", "off"}
+_TEXT_EQUIVALENTS = {
+    _W + "tab": "\t",
+    _W + "ptab": "\t",
+    _W + "cr": "\n",
+    _W + "noBreakHyphen": "-",
+}
+
+
+def _paragraph_text(p) -> str:
+    """Paragraph text from the raw w:p element.
+
+    Works on any python-docx version (CT_P.text only exists from 1.0 on);
+    breaks other than line breaks (page, column) contribute nothing.
+    """
+    parts = []
+    for node in _PARA_TEXT_NODES(p):
+        tag = node.tag
+        if tag == _W + "t":
+            parts.append(node.text or "")
+        elif tag == _W + "br":
+            if node.get(_W + "type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        else:
+            parts.append(_TEXT_EQUIVALENTS[tag])
+    return "".join(parts)
+
+
+def _run_flag_enabled(element) -> bool:
+    """Mirror python-docx: on/off flags default to on, underline needs a val."""
+    val = element.get(_W + "val")
+    if element.tag == _W + "u":
+        return val is not None and val != "none"
+    return val is None or val not in _OFF_VALUES
+
 
 class DOCXConverter:
     """Converts DOCX documents to structured text with advanced analysis"""
 
-    def __init__(self):
+    def __init__(self, use_xpath: bool = True):
         self.supported_formats = [".docx"]
+        # False falls back to python-docx object traversal (reference path)
+        self.use_xpath = use_xpath
 
     def is_supported(self, file_path: Path) -> bool:
         """Check if file format is supported"""
@@ -45,64 +112,28 @@ class DOCXConverter:
             if include_metadata:
                 metadata = self._extract_metadata(doc, file_path)
 
-            # Extract text from paragraphs
-            paragraphs_data = []
-            tables_data = []
-            total_chars = 0
-
-            # Process paragraphs
-            for i, paragraph in enumerate(doc.paragraphs):
-                text = paragraph.text.strip()
-                char_count = len(text)
-                total_chars += char_count
-
-                para_data = {
-                    "element_type": "paragraph",
-                    "element_number": i + 1,
-                    "text": text,
-                    "char_count": char_count,
-                    "has_text": char_count > 0,
-                    "style": paragraph.style.name if paragraph.style else "Normal",
-                }
-
-                # Check for special formatting
-                if paragraph.runs:
-                    formatting = []
-                    for run in paragraph.runs:
-                        if run.bold:
-                            formatting.append("bold")
-                        if run.italic:
-                            formatting.append("italic")
-                        if run.underline:
-                            formatting.append("underline")
-                    para_data["formatting"] = formatting
-
-                paragraphs_data.append(para_data)
-
-            # Process tables
-            for i, table in enumerate(doc.tables):
-                table_text = self._extract_table_text(table)
-                table_data = {
-                    "element_type": "table",
-                    "element_number": i + 1,
-                    "text": table_text,
-                    "char_count": len(table_text),
-                    "has_text": len(table_text) > 0,
-                    "rows": len(table.rows),
-                    "columns": len(table.columns) if table.rows else 0,
-                }
-                tables_data.append(table_data)
-                total_chars += len(table_text)
+            if self.use_xpath:
+                paragraphs_data, tables_data = self._extract_elements_xpath(doc)
+            else:
+                paragraphs_data, tables_data = self._extract_elements_python_docx(doc)
 
             # Combine all elements
             all_elements = paragraphs_data + tables_data
 
-            # Create structured output using Polars
-            try:
-                elements_df = pl.DataFrame(all_elements)
-            except Exception as e:
-                logger.warning(f"Failed to create Polars DataFrame: {e}")
-                elements_df = None
+            # Single pass: counts, characters and the combined text buffer
+            total_chars = 0
+            non_empty = 0
+            text_buffer = io.StringIO()
+            for element in all_elements:
+                total_chars += element["char_count"]
+                if element["has_text"]:
+                    if non_empty:
+                        text_buffer.write("\n")
+                    non_empty += 1
+                    text_buffer.write(
+                        f"--- {element['element_type'].title()} "
+                        f"{element['element_number']} ---\n{element['text']}\n"
+                    )
 
             # Calculate statistics
             statistics = {
@@ -110,9 +141,13 @@ class DOCXConverter:
                 "total_tables": len(tables_data),
                 "total_elements": len(all_elements),
                 "total_characters": total_chars,
-                "non_empty_elements": len([e for e in all_elements if e["has_text"]]),
-                "empty_elements": len([e for e in all_elements if not e["has_text"]]),
-                "extraction_method": "python_docx_with_polars",
+                "non_empty_elements": non_empty,
+                "empty_elements": len(all_elements) - non_empty,
+                "extraction_method": (
+                    "lxml_xpath_with_polars"
+                    if self.use_xpath
+                    else "python_docx_with_polars"
+                ),
             }
 
             return {
@@ -120,9 +155,10 @@ class DOCXConverter:
                 "paragraphs": paragraphs_data,
                 "tables": tables_data,
                 "all_elements": all_elements,
-                "elements_dataframe": elements_df,
+                # Built on demand by analyze_structure()
+                "elements_dataframe": None,
                 "statistics": statistics,
-                "full_text": self._combine_element_text(all_elements),
+                "full_text": text_buffer.getvalue(),
                 "status": "success",
             }
 
@@ -144,6 +180,131 @@ class DOCXConverter:
                 "status": "error",
             }
 
+    def _extract_elements_xpath(self, doc: Document) -> Tuple[List[Dict], List[Dict]]:
+        """Extract paragraph and table records with compiled XPath queries"""
+        body = doc.element
+        style_names = {
+            style.style_id: style.name
+            for style in doc.styles
+            if style.type == WD_STYLE_TYPE.PARAGRAPH
+        }
+        default_style = doc.styles.default(WD_STYLE_TYPE.PARAGRAPH)
+        default_name = default_style.name if default_style is not None else "Normal"
+
+        paragraphs_data = []
+        for i, p in enumerate(_BODY_PARAGRAPHS(body)):
+            text = _paragraph_text(p).strip()
+            char_count = len(text)
+            para_data = {
+                "element_type": "paragraph",
+                "element_number": i + 1,
+                "text": text,
+                "char_count": char_count,
+                "has_text": char_count > 0,
+                "style": style_names.get(_PARA_STYLE_ID(p), default_name),
+            }
+            if char_count:
+                flags = {
+                    _FLAG_NAMES[flag.tag]
+                    for flag in _RUN_FLAGS(p)
+                    if _run_flag_enabled(flag)
+                }
+                if flags:
+                    para_data["formatting"] = [
+                        name for name in _FLAG_NAMES.values() if name in flags
+                    ]
+            paragraphs_data.append(para_data)
+
+        tables_data = []
+        for i, tbl in enumerate(_BODY_TABLES(body)):
+            rows = _TABLE_ROWS(tbl)
+            table_text = self._extract_table_text_xpath(rows)
+            tables_data.append(
+                {
+                    "element_type": "table",
+                    "element_number": i + 1,
+                    "text": table_text,
+                    "char_count": len(table_text),
+                    "has_text": len(table_text) > 0,
+                    "rows": len(rows),
+                    "columns": int(_TABLE_GRID_COLS(tbl)) if rows else 0,
+                }
+            )
+        return paragraphs_data, tables_data
+
+    def _extract_table_text_xpath(self, rows: List[Any]) -> str:
+        """Table text with python-docx cell semantics (spans repeat, merges inherit)"""
+        above: Dict[int, str] = {}
+        table_texts = []
+        for tr in rows:
+            col = int(_ROW_GRID_BEFORE(tr) or 0)
+            row_texts = []
+            for tc in _ROW_CELLS(tr):
+                span = int(_CELL_GRID_SPAN(tc) or 1)
+                vmerge = _CELL_VMERGE(tc)
+                if vmerge and vmerge[0].get(_W + "val", "continue") == "continue":
+                    cell_text = above.get(col, "")
+                else:
+                    cell_text = "\n".join(
+                        _paragraph_text(cp) for cp in _CELL_PARAGRAPHS(tc)
+                    ).strip()
+                for offset in range(col, col + span):
+                    above[offset] = cell_text
+                row_texts.extend([cell_text] * span)
+                col += span
+            if any(row_texts):  # Only add non-empty rows
+                table_texts.append(" | ".join(row_texts))
+        return "\n".join(table_texts)
+
+    def _extract_elements_python_docx(
+        self, doc: Document
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """Extract paragraph and table records through python-docx objects"""
+        paragraphs_data = []
+        tables_data = []
+
+        # Process paragraphs
+        for i, paragraph in enumerate(doc.paragraphs):
+            text = paragraph.text.strip()
+            char_count = len(text)
+            para_data = {
+                "element_type": "paragraph",
+                "element_number": i + 1,
+                "text": text,
+                "char_count": char_count,
+                "has_text": char_count > 0,
+                "style": paragraph.style.name if paragraph.style else "Normal",
+            }
+
+            # Check for special formatting (each flag once, text paragraphs only)
+            if char_count:
+                runs = paragraph.runs
+                formatting = [
+                    flag
+                    for flag in ("bold", "italic", "underline")
+                    if any(getattr(run, flag) for run in runs)
+                ]
+                if formatting:
+                    para_data["formatting"] = formatting
+
+            paragraphs_data.append(para_data)
+
+        # Process tables
+        for i, table in enumerate(doc.tables):
+            table_text = self._extract_table_text(table)
+            table_data = {
+                "element_type": "table",
+                "element_number": i + 1,
+                "text": table_text,
+                "char_count": len(table_text),
+                "has_text": len(table_text) > 0,
+                "rows": len(table.rows),
+                "columns": len(table.columns) if table.rows else 0,
+            }
+            tables_data.append(table_data)
+
+        return paragraphs_data, tables_data
+
     def _extract_metadata(self, doc: Document, file_path: Path) -> Dict[str, Any]:
         """Extract DOCX metadata"""
         metadata = {
@@ -185,27 +346,37 @@ class DOCXConverter:
                 table_texts.append(" | ".join(row_texts))
         return "\n".join(table_texts)
 
-    def _combine_element_text(self, elements_data: List[Dict]) -> str:
-        """Combine text from all elements into a single string"""
-        texts = []
-        for element in elements_data:
-            if element.get("text") and element["has_text"]:
-                element_type = element.get("element_type", "element")
-                element_num = element.get("element_number", "")
-                texts.append(
-                    f"--- {element_type.title()} {element_num} ---\n{element['text']}\n"
-                )
-        return "\n".join(texts)
+    def _build_elements_dataframe(self, elements: List[Dict]) -> pl.DataFrame:
+        """Columnar frame of the fields analysis needs, with an explicit schema"""
+        return pl.DataFrame(
+            {
+                "element_type": [e["element_type"] for e in elements],
+                "char_count": [e["char_count"] for e in elements],
+                "has_text": [e["has_text"] for e in elements],
+                "style": [e.get("style") for e in elements],
+            },
+            schema={
+                "element_type": pl.Utf8,
+                "char_count": pl.Int64,
+                "has_text": pl.Boolean,
+                "style": pl.Utf8,
+            },
+        )
 
     def analyze_structure(self, file_path: Path) -> Dict[str, Any]:
         """
         Analyze document structure and return insights using Polars
         """
         result = self.extract_text(file_path)
-        if result["status"] != "success" or result["elements_dataframe"] is None:
+        if result["status"] != "success":
             return result
 
-        df = result["elements_dataframe"]
+        try:
+            df = self._build_elements_dataframe(result["all_elements"])
+        except Exception as e:
+            logger.warning(f"Failed to create Polars DataFrame: {e}")
+            return result
+        result["elements_dataframe"] = df
 
         # Analyze document structure
         analysis = {
@@ -3,20 +3,195 @@ Image Document Converter
 Converts images to text using OCR (pytesseract) with Polars analysis
 """
 
+import io
+import json
 import logging
+import os
+import shlex
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import cached_property
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 import polars as pl
 import pytesseract
-from PIL import Image
+from PIL import ExifTags, Image
+
+try:  # optional: in-process Tesseract API (no process spawn per call)
+    import tesserocr
+except ImportError:  # pragma: no cover - optional dependency
+    tesserocr = None
+
+try:  # optional: faster JSON serializer for table export
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Default Windows install location, used when tesseract is not on PATH
+_WINDOWS_TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+if os.name == "nt" and os.path.exists(_WINDOWS_TESSERACT_PATH):
+    pytesseract.pytesseract.tesseract_cmd = _WINDOWS_TESSERACT_PATH
+
+# image_to_data columns kept per word box, in output order
+_OCR_COLUMNS = (
+    "text",
+    "conf",
+    "left",
+    "top",
+    "width",
+    "height",
+    "level",
+    "page_num",
+    "block_num",
+    "par_num",
+    "line_num",
+    "word_num",
+)
+
+# Words hinting that a row belongs to a table (case-insensitive substring
+# match), and digits; both run as Polars regexes over the word column
+_TABLE_KEYWORDS = ("units", "inventory", "backlog", "level", "amount", "total", "sum")
+_TABLE_KEYWORD_PATTERN = "(?i)" + "|".join(_TABLE_KEYWORDS)
+_DIGIT_PATTERN = r"\d"
+
+# Single-pass cell escaping for the CSV and HTML table exports
+_CSV_TRANSLATION = str.maketrans({",": ";", '"': ""})
+_HTML_TRANSLATION = str.maketrans({"<": "&lt;", ">": "&gt;", "&": "&amp;"})
+
+
+# JPEGs larger than this (both sides) are decoded at a reduced DCT scale
+_JPEG_DRAFT_SIZE = (2000, 2000)
+
+
+def _dumps_json(data: Any) -> str:
+    """Indented JSON text, via orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(
+            data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+        ).decode()
+    return json.dumps(data, indent=2)
+
+
+def _read_ocr_tsv(tsv: bytes) -> pl.DataFrame:
+    """Parse image_to_data's TSV output straight into a DataFrame"""
+    return pl.read_csv(
+        io.BytesIO(tsv),
+        separator="\t",
+        quote_char=None,  # OCR text may contain stray quotes
+        schema_overrides={"text": pl.Utf8, "conf": pl.Float64},
+        truncate_ragged_lines=True,
+    ).with_columns(pl.col("text").fill_null(""))
+
+
+def _ocr_frame(ocr_data: Union[Dict[str, List[Any]], pl.DataFrame]) -> pl.DataFrame:
+    """Confident word boxes from image_to_data output (TSV frame or column dict)"""
+    if isinstance(ocr_data, pl.DataFrame):
+        df = ocr_data.select(_OCR_COLUMNS)
+    else:
+        df = pl.DataFrame(
+            {column: ocr_data[column] for column in _OCR_COLUMNS},
+            schema_overrides={"text": pl.Utf8},
+        )
+    return (
+        df.with_columns(pl.col("conf").cast(pl.Int64))
+        .filter(pl.col("conf") > 0)  # Only include confident detections
+        .rename({"conf": "confidence"})
+    )
+
+
+def _load_for_ocr(image: Image.Image) -> Image.Image:
+    """Decode an opened image, letting large JPEGs decode straight to grayscale.
+
+    ``draft`` picks the smallest DCT scale that keeps both sides at or above
+    ``_JPEG_DRAFT_SIZE``, so oversized scans land near OCR resolution without
+    a separate resize. Loading also releases the file handle.
+    """
+    if image.format == "JPEG":
+        image.draft("L", _JPEG_DRAFT_SIZE)
+    image.load()
+    return image
+
+
+def _preprocess_for_ocr(image: Image.Image, target_dpi: int = 300) -> Image.Image:
+    """Grayscale, upscale to ``target_dpi`` when the image declares less, and
+    binarize at the Otsu threshold.
+
+    Only Pillow C operations touch pixels (the threshold comes from the
+    256-bin histogram), so installing ``pillow-simd`` speeds this up as a
+    drop-in replacement.
+    """
+    gray = image.convert("L")
+
+    dpi = image.info.get("dpi")
+    if dpi and 0 < dpi[0] < target_dpi:
+        scale = target_dpi / float(dpi[0])
+        gray = gray.resize(
+            (round(gray.width * scale), round(gray.height * scale)),
+            Image.Resampling.BICUBIC,
+        )
+
+    hist = np.asarray(gray.histogram(), dtype=np.float64)
+    weight = np.cumsum(hist)
+    mass = np.cumsum(hist * np.arange(256))
+    total, total_mass = weight[-1], mass[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (total_mass * weight - total * mass) ** 2 / (
+            weight * (total - weight)
+        )
+    threshold = int(np.argmax(np.nan_to_num(between)))
+    return gray.point([0] * (threshold + 1) + [255] * (255 - threshold))
+
+
+def _api_page_seg_mode(config: str) -> Optional[int]:
+    """Page segmentation mode for the tesserocr path, or -1 if ``config`` needs
+    the tesseract CLI (anything besides ``--psm N``); None means the default"""
+    tokens = shlex.split(config)
+    if not tokens:
+        return None
+    if len(tokens) == 2 and tokens[0] == "--psm" and tokens[1].isdigit():
+        return int(tokens[1])
+    return -1
+
+
+class _LazyOCRRows(Sequence):
+    """Per-word dicts over the OCR DataFrame, built only when first read"""
+
+    def __init__(self, df: pl.DataFrame):
+        self.df = df
+
+    @cached_property
+    def _rows(self) -> List[Dict[str, Any]]:
+        return self.df.to_dicts()
+
+    def __len__(self) -> int:
+        return self.df.height
+
+    def __getitem__(self, index):
+        return self._rows[index]
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence):
+            return self._rows == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(self._rows)
+
 
 class ImageConverter:
     """Converts images to text using OCR with advanced analysis"""
 
+    # Result of the tesseract CLI probe, shared by every instance
+    _tesseract_available: Optional[bool] = None
+
     def __init__(self):
         self.supported_formats = [
             ".png",
@@ -27,31 +202,52 @@ class ImageConverter:
             ".bmp",
             ".webp",
         ]
-        self.ocr_enabled = self._check_tesseract()
-
-    def _check_tesseract(self) -> bool:
-        """Check if Tesseract OCR is available"""
+        # One long-lived API handle keeps traineddata loaded between images
+        self._api = self._create_tesseract_api()
+        self._api_lock = threading.Lock()
+        self.ocr_enabled = self._api is not None or self._check_tesseract()
+
+    def __del__(self):
+        api = getattr(self, "_api", None)
+        if api is not None:
+            api.End()
+
+    def _create_tesseract_api(self) -> Optional[Any]:
+        """Create a tesserocr API handle when tesserocr and eng data are present"""
+        if tesserocr is None:
+            return None
+        try:
+            api = tesserocr.PyTessBaseAPI(lang="eng", oem=tesserocr.OEM.LSTM_ONLY)
+            logger.info("Tesseract API initialized (tesserocr %s)", api.Version())
+            return api
+        except Exception as e:
+            logger.warning(f"tesserocr unavailable, using pytesseract: {e}")
+            return None
+
+    @classmethod
+    def _check_tesseract(cls) -> bool:
+        """Check if Tesseract OCR is available (probed once per process)"""
+        if cls._tesseract_available is not None:
+            return cls._tesseract_available
         try:
-            # Set Tesseract path for Windows
-            import os
-
-            tesseract_path = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-            if os.path.exists(tesseract_path):
-                pytesseract.pytesseract.tesseract_cmd = tesseract_path
-
             pytesseract.get_tesseract_version()
             logger.info(f"Tesseract OCR initialized successfully")
-            return True
+            cls._tesseract_available = True
         except Exception as e:
             logger.error(f"Tesseract OCR not available: {e}")
-            return False
+            cls._tesseract_available = False
+        return cls._tesseract_available
 
     def is_supported(self, file_path: Path) -> bool:
         """Check if file format is supported"""
         return file_path.suffix.lower() in self.supported_formats
 
     def extract_text(
-        self, file_path, include_metadata: bool = True, ocr_config: str = ""
+        self,
+        file_path,
+        include_metadata: bool = True,
+        ocr_config: str = "",
+        preprocess: bool = False,
     ) -> Dict[str, Any]:
         """
         Extract text from image using OCR
@@ -60,6 +256,8 @@ class ImageConverter:
             file_path: Path to image file (str or Path object)
             include_metadata: Whether to include image metadata
             ocr_config: Custom OCR configuration string for tesseract
+            preprocess: Grayscale, upscale to 300 DPI and binarize before OCR
+                (helps noisy scans; metadata still describes the original)
 
         Returns:
             Dictionary containing extracted text, metadata, and analysis
@@ -75,46 +273,40 @@ class ImageConverter:
             # Open and analyze image
             image = Image.open(file_path)
 
-            # Extract metadata if requested
+            # Extract metadata if requested (header only, before decoding)
             metadata = {}
             if include_metadata:
                 metadata = self._extract_metadata(image, file_path)
+            _load_for_ocr(image)
 
             # Perform OCR
-            ocr_data = self._perform_ocr(image, ocr_config)
+            ocr_image = _preprocess_for_ocr(image) if preprocess else image
+            ocr_data = self._perform_ocr(ocr_image, ocr_config)
 
-            # Create structured output using Polars if we have detailed OCR data
-            ocr_df = None
-            if ocr_data.get("detailed_data"):
-                try:
-                    ocr_df = pl.DataFrame(ocr_data["detailed_data"])
-                except Exception as e:
-                    logger.warning(
-                        f"Failed to create Polars DataFrame for OCR data: {e}"
-                    )
+            # Word boxes are already a Polars DataFrame
+            detailed_df = ocr_data["detailed_df"]
+            ocr_df = detailed_df if detailed_df.height else None
 
             # Calculate statistics
+            text = ocr_data["text"]
             statistics = {
-                "total_characters": len(ocr_data["text"]),
+                "total_characters": len(text),
                 "confidence_score": ocr_data.get("confidence", 0),
-                "word_count": len(ocr_data["text"].split()) if ocr_data["text"] else 0,
-                "line_count": (
-                    len(ocr_data["text"].split("\\n")) if ocr_data["text"] else 0
-                ),
+                "word_count": len(text.split()),
+                "line_count": text.count("\n") + 1 if text else 0,
                 "extraction_method": "tesseract_ocr",
                 "ocr_config": ocr_config or "default",
+                "preprocessed": preprocess,
             }
 
             # Detect and format tables using coordinate data
-            table_analysis = self.detect_and_format_tables(
-                ocr_data.get("detailed_data", [])
-            )
+            table_analysis = self.detect_and_format_tables(detailed_df)
 
             return {
                 "metadata": metadata,
                 "ocr_text": ocr_data["text"],
                 "ocr_confidence": ocr_data.get("confidence", 0),
-                "ocr_detailed": ocr_data.get("detailed_data", []),
+                "ocr_detailed": _LazyOCRRows(detailed_df),
                 "ocr_dataframe": ocr_df,
                 "statistics": statistics,
                 "table_analysis": table_analysis,
@@ -146,6 +338,53 @@ class ImageConverter:
                 "status": "error",
             }
 
+    def extract_text_batch(
+        self,
+        paths: Iterable[Union[str, Path]],
+        include_metadata: bool = True,
+        ocr_config: str = "",
+        max_workers: Optional[int] = None,
+        preprocess: bool = False,
+    ) -> Iterator[Tuple[Path, Dict[str, Any]]]:
+        """
+        OCR many images in parallel worker processes
+
+        Tesseract is CPU-bound, so images are spread over a process pool
+        (one single-threaded Tesseract per worker) and yielded as they finish.
+
+        Args:
+            paths: Image files to process
+            include_metadata: Whether to include image metadata
+            ocr_config: Custom OCR configuration string for tesseract
+            max_workers: Pool size (default: CPU count - 1)
+            preprocess: Preprocess images before OCR (see extract_text)
+
+        Yields:
+            (path, extract_text result) tuples in completion order
+        """
+        paths = [Path(path) for path in paths]
+        if not self.ocr_enabled:
+            for path in paths:
+                yield path, {
+                    "error": "Tesseract OCR not available",
+                    "status": "ocr_unavailable",
+                }
+            return
+
+        workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(paths)) or 1,
+            initializer=_init_batch_worker,
+        ) as pool:
+            futures = {
+                pool.submit(
+                    _batch_worker, path, include_metadata, ocr_config, preprocess
+                ): path
+                for path in paths
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
     def _extract_metadata(self, image: Image.Image, file_path: Path) -> Dict[str, Any]:
         """Extract image metadata"""
         metadata = {
@@ -158,11 +397,16 @@ class ImageConverter:
             "height": image.height,
         }
 
-        # Try to extract EXIF data
+        # Try to extract EXIF data. Only the header segment is parsed; the
+        # Exif sub-IFD is merged in and GPS nested, as _getexif() laid it out
         try:
-            exif = image._getexif()
+            exif = image.getexif()
             if exif:
-                metadata["exif_data"] = dict(exif)
+                exif_data = dict(exif)
+                exif_data.update(exif.get_ifd(ExifTags.IFD.Exif))
+                if ExifTags.IFD.GPSInfo in exif:
+                    exif_data[ExifTags.IFD.GPSInfo] = exif.get_ifd(ExifTags.IFD.GPSInfo)
+                metadata["exif_data"] = exif_data
         except Exception:
             metadata["exif_data"] = {}
 
@@ -170,46 +414,33 @@ class ImageConverter:
 
     def _perform_ocr(self, image: Image.Image, config: str) -> Dict[str, Any]:
         """Perform OCR on image and return detailed results"""
+        if self._api is not None:
+            page_seg_mode = _api_page_seg_mode(config)
+            if page_seg_mode != -1:
+                try:
+                    return self._perform_ocr_api(image, page_seg_mode)
+                except Exception as e:
+                    logger.error(f"OCR failed: {e}")
+                    return {"text": "", "confidence": 0, "detailed_df": pl.DataFrame()}
+
         try:
             # Extract plain text
             text = pytesseract.image_to_string(image, config=config).strip()
 
+            # Blank pages have no words either; skip the second OCR pass
+            if not text:
+                return {"text": "", "confidence": 0, "detailed_df": pl.DataFrame()}
+
             # Try to get detailed OCR data with bounding boxes and confidence
-            detailed_data = []
+            detailed_df = pl.DataFrame()
             try:
-                ocr_data = pytesseract.image_to_data(
-                    image, config=config, output_type=pytesseract.Output.DICT
+                tsv = pytesseract.image_to_data(
+                    image, config=config, output_type=pytesseract.Output.BYTES
                 )
-
-                # Process detailed OCR results
-                for i in range(len(ocr_data["text"])):
-                    if (
-                        int(ocr_data["conf"][i]) > 0
-                    ):  # Only include confident detections
-                        detailed_data.append(
-                            {
-                                "text": ocr_data["text"][i],
-                                "confidence": int(ocr_data["conf"][i]),
-                                "left": ocr_data["left"][i],
-                                "top": ocr_data["top"][i],
-                                "width": ocr_data["width"][i],
-                                "height": ocr_data["height"][i],
-                                "level": ocr_data["level"][i],
-                                "page_num": ocr_data["page_num"][i],
-                                "block_num": ocr_data["block_num"][i],
-                                "par_num": ocr_data["par_num"][i],
-                                "line_num": ocr_data["line_num"][i],
-                                "word_num": ocr_data["word_num"][i],
-                            }
-                        )
+                detailed_df = _ocr_frame(_read_ocr_tsv(tsv))
 
                 # Calculate average confidence
-                confidences = [
-                    d["confidence"] for d in detailed_data if d["confidence"] > 0
-                ]
-                avg_confidence = (
-                    sum(confidences) / len(confidences) if confidences else 0
-                )
+                avg_confidence = detailed_df.get_column("confidence").mean() or 0
 
             except Exception as e:
                 logger.warning(f"Failed to get detailed OCR data: {e}")
@@ -218,32 +449,100 @@ class ImageConverter:
             return {
                 "text": text,
                 "confidence": avg_confidence,
-                "detailed_data": detailed_data,
+                "detailed_df": detailed_df,
             }
 
         except Exception as e:
             logger.error(f"OCR failed: {e}")
-            return {"text": "", "confidence": 0, "detailed_data": []}
+            return {"text": "", "confidence": 0, "detailed_df": pl.DataFrame()}
+
+    def _perform_ocr_api(
+        self, image: Image.Image, page_seg_mode: Optional[int]
+    ) -> Dict[str, Any]:
+        """One Recognize() pass yielding both the text and word-level boxes"""
+        RIL = tesserocr.RIL
+        ocr_data: Dict[str, List[Any]] = {column: [] for column in _OCR_COLUMNS}
+        with self._api_lock:
+            api = self._api
+            api.SetPageSegMode(
+                tesserocr.PSM.AUTO if page_seg_mode is None else page_seg_mode
+            )
+            api.SetImage(image)
+            try:
+                api.Recognize()
+                text = (api.GetUTF8Text() or "").strip()
+
+                # Number blocks/paragraphs/lines/words the way the TSV does
+                block_num = par_num = line_num = word_num = 0
+                iterator = api.GetIterator()
+                words = tesserocr.iterate_level(iterator, RIL.WORD) if iterator else ()
+                for word in words:
+                    if word.IsAtBeginningOf(RIL.BLOCK):
+                        block_num, par_num, line_num = block_num + 1, 0, 0
+                    if word.IsAtBeginningOf(RIL.PARA):
+                        par_num, line_num = par_num + 1, 0
+                    if word.IsAtBeginningOf(RIL.TEXTLINE):
+                        line_num, word_num = line_num + 1, 0
+                    word_num += 1
+                    box = word.BoundingBox(RIL.WORD)
+                    if box is None:
+                        continue
+                    left, top, right, bottom = box
+                    for column, value in zip(
+                        _OCR_COLUMNS,
+                        (
+                            word.GetUTF8Text(RIL.WORD) or "",
+                            word.Confidence(RIL.WORD),
+                            left,
+                            top,
+                            right - left,
+                            bottom - top,
+                            5,  # word level
+                            1,
+                            block_num,
+                            par_num,
+                            line_num,
+                            word_num,
+                        ),
+                    ):
+                        ocr_data[column].append(value)
+            finally:
+                api.Clear()
+
+        detailed_df = _ocr_frame(ocr_data)
+        return {
+            "text": text,
+            "confidence": detailed_df.get_column("confidence").mean() or 0,
+            "detailed_df": detailed_df,
+        }
 
     def detect_and_format_tables(
-        self, detailed_data: List[Dict], confidence_threshold: int = 50
+        self,
+        detailed_data: Union[pl.DataFrame, List[Dict]],
+        confidence_threshold: int = 50,
     ) -> Dict[str, Any]:
         """
         Detect table structures using coordinate data and format them properly
 
         Args:
-            detailed_data: List of OCR elements with coordinates
+            detailed_data: OCR word boxes with coordinates (DataFrame, dicts or
+                an extract_text result's ocr_detailed)
             confidence_threshold: Minimum confidence to include words
 
         Returns:
             Dictionary with detected tables and formatted structures
         """
-        if not detailed_data:
+        if detailed_data is None or len(detailed_data) == 0:
             return {"tables": [], "structured_text": "", "table_count": 0}
 
         try:
-            # Create DataFrame for spatial analysis
-            df = pl.DataFrame(detailed_data)
+            # DataFrame for spatial analysis (shared with extract_text's)
+            if isinstance(detailed_data, _LazyOCRRows):
+                df = detailed_data.df
+            elif isinstance(detailed_data, pl.DataFrame):
+                df = detailed_data
+            else:
+                df = pl.DataFrame(detailed_data)
 
             # Filter high-confidence words
             confident_df = df.filter(pl.col("confidence") > confidence_threshold)
@@ -251,28 +550,80 @@ class ImageConverter:
             if len(confident_df) == 0:
                 return {"tables": [], "structured_text": "", "table_count": 0}
 
-            # Group by approximate rows (Y-coordinate clustering)
+            # Group by approximate rows (Y-coordinate clustering), words
+            # left to right within each row
             row_tolerance = 15  # pixels
-            confident_df = confident_df.with_columns(
+            words_df = confident_df.with_columns(
                 [
                     (pl.col("top") / row_tolerance)
                     .round()
                     .cast(pl.Int64)
                     .alias("row_group")
                 ]
+            ).sort(["row_group", "left"], maintain_order=True)
+
+            # Spacing from the gap to the previous word's estimated end
+            # (8 px per character); a large gap suggests a new column
+            gap = pl.col("left") - (
+                pl.col("left") + pl.col("text").str.len_chars() * 8
+            ).shift(1).over("row_group")
+            words_df = words_df.with_columns(
+                [
+                    pl.when(gap.is_null())
+                    .then(pl.lit(""))
+                    .when(gap > 100)
+                    .then(pl.lit(" | "))
+                    .when(gap > 30)
+                    .then(pl.lit("  "))
+                    .otherwise(pl.lit(" "))
+                    .alias("separator"),
+                    (gap.is_null() | (gap > 100)).alias("starts_cell"),
+                    pl.col("text").str.contains(_DIGIT_PATTERN).alias("has_digit"),
+                    pl.col("text")
+                    .str.contains(_TABLE_KEYWORD_PATTERN)
+                    .alias("has_keyword"),
+                    # Left-edge spacing in 20 px buckets, for columnar layout
+                    (
+                        (pl.col("left") - pl.col("left").shift(1).over("row_group"))
+                        // 20
+                    ).alias("gap_bucket"),
+                ]
             )
 
             # Create structured rows
             rows_data = (
-                confident_df.group_by("row_group")
+                words_df.group_by("row_group")
                 .agg(
                     [
-                        pl.col("text").sort_by("left"),
-                        pl.col("left").sort(),
-                        pl.col("confidence").sort_by("left"),
+                        pl.col("left"),
+                        pl.col("confidence"),
                         pl.col("top").min().alias("row_y"),
+                        pl.col("text").filter(pl.col("starts_cell")).alias("cells"),
+                        (pl.col("separator") + pl.col("text"))
+                        .str.join("")
+                        .str.strip_chars()
+                        .alias("formatted"),
+                        pl.len().alias("word_count"),
+                        pl.col("has_digit").any(),
+                        pl.col("has_keyword").any(),
+                        pl.col("gap_bucket").drop_nulls().n_unique(),
                     ]
                 )
+                .with_columns(
+                    # Table row if: has numbers OR table keywords OR consistent
+                    # spacing (few distinct gap sizes over 3+ words)
+                    (
+                        (pl.col("word_count") >= 2)
+                        & (
+                            pl.col("has_digit")
+                            | pl.col("has_keyword")
+                            | (
+                                (pl.col("word_count") >= 3)
+                                & (pl.col("gap_bucket") <= 3)
+                            )
+                        )
+                    ).alias("is_table")
+                )
                 .sort("row_y")
             )
 
@@ -281,38 +632,13 @@ class ImageConverter:
             current_table = None
 
             for row_data in rows_data.iter_rows(named=True):
-                texts = row_data["text"]
                 positions = row_data["left"]
                 confidences = row_data["confidence"]
                 row_y = row_data["row_y"]
+                row_cells = row_data["cells"]
+                formatted_row = row_data["formatted"]
 
-                # Create formatted row with proper spacing
-                row_cells = []
-                formatted_row = ""
-                last_pos = 0
-
-                for i, (text, pos, conf) in enumerate(
-                    zip(texts, positions, confidences)
-                ):
-                    # Calculate spacing based on position
-                    if i > 0:
-                        gap = pos - last_pos
-                        if gap > 100:  # Large gap suggests new column
-                            formatted_row += " | "
-                            row_cells.append(text)
-                        elif gap > 30:  # Medium gap
-                            formatted_row += "  "
-                        else:  # Small gap
-                            formatted_row += " "
-
-                    formatted_row += text
-                    if i == 0:  # First cell
-                        row_cells.append(text)
-
-                    last_pos = pos + len(text) * 8
-
-                # Detect table patterns
-                is_table_row = self._is_table_row(texts, positions)
+                is_table_row = row_data["is_table"]
 
                 if is_table_row:
                     if current_table is None:
@@ -326,7 +652,7 @@ class ImageConverter:
                     current_table["rows"].append(
                         {
                             "cells": row_cells,
-                            "formatted": formatted_row.strip(),
+                            "formatted": formatted_row,
                             "y_position": row_y,
                             "confidence": (
                                 sum(confidences) / len(confidences)
@@ -344,7 +670,7 @@ class ImageConverter:
 
                 structured_rows.append(
                     {
-                        "text": formatted_row.strip(),
+                        "text": formatted_row,
                         "y_position": row_y,
                         "is_table": is_table_row,
                         "cell_count": len(row_cells),
@@ -381,60 +707,27 @@ class ImageConverter:
                 "error": str(e),
             }
 
-    def _is_table_row(self, texts: List[str], positions: List[int]) -> bool:
-        """Detect if a row likely belongs to a table structure"""
-        if len(texts) < 2:
-            return False
-
-        # Check for table indicators
-        table_keywords = [
-            "units",
-            "inventory",
-            "backlog",
-            "level",
-            "amount",
-            "total",
-            "sum",
-        ]
-        numeric_pattern = any(any(c.isdigit() for c in text) for text in texts)
-
-        # Check for consistent spacing (columnar layout)
-        if len(positions) >= 3:
-            gaps = [positions[i + 1] - positions[i] for i in range(len(positions) - 1)]
-            consistent_spacing = (
-                len(set(gap // 20 for gap in gaps)) <= 3
-            )  # Allow some variation
-        else:
-            consistent_spacing = False
-
-        # Table row if: has numbers OR table keywords OR consistent spacing
-        return (
-            numeric_pattern
-            or any(kw in " ".join(texts).lower() for kw in table_keywords)
-            or consistent_spacing
-        )
-
     def _detect_columns(self, positions: List[int]) -> List[Dict]:
         """Detect column boundaries from X positions"""
         if not positions:
             return []
 
-        # Group similar positions into columns
+        # Group similar positions into columns in one left-to-right pass:
+        # centres only grow, so just the newest column can be within reach
         column_tolerance = 30  # pixels
         columns = []
+        column = None
+        total = 0
 
         for pos in sorted(set(positions)):
-            # Find if this position belongs to existing column
-            found_column = False
-            for col in columns:
-                if abs(pos - col["center"]) <= column_tolerance:
-                    col["positions"].append(pos)
-                    col["center"] = sum(col["positions"]) // len(col["positions"])
-                    found_column = True
-                    break
-
-            if not found_column:
-                columns.append({"center": pos, "positions": [pos], "width": 0})
+            if column is not None and pos - column["center"] <= column_tolerance:
+                column["positions"].append(pos)
+                total += pos
+                column["center"] = total // len(column["positions"])
+            else:
+                column = {"center": pos, "positions": [pos], "width": 0}
+                columns.append(column)
+                total = pos
 
         # Calculate column widths
         for i, col in enumerate(columns):
@@ -449,40 +742,46 @@ class ImageConverter:
         self, structured_rows: List[Dict], tables: List[Dict]
     ) -> str:
         """Format the structured output with tables properly aligned"""
-        output_lines = []
-
-        for row in structured_rows:
-            if row["is_table"] and row["cell_count"] > 1:
-                # Format as table row with proper alignment
-                output_lines.append(f"║ {row['text']} ║")
-            else:
-                # Regular text
-                output_lines.append(row["text"])
+        # Table rows are framed for alignment; regular text passes through
+        output_lines = [
+            (
+                f"║ {row['text']} ║"
+                if row["is_table"] and row["cell_count"] > 1
+                else row["text"]
+            )
+            for row in structured_rows
+        ]
 
         # Add table summaries
         if tables:
-            output_lines.append("")
-            output_lines.append("📊 DETECTED TABLES:")
-            output_lines.append("=" * 50)
+            output_lines += ["", "📊 DETECTED TABLES:", "=" * 50]
 
             for i, table in enumerate(tables):
                 output_lines.append(
                     f"Table {i+1}: {len(table['rows'])} rows, {len(table['columns'])} columns"
                 )
-
                 # Show formatted table
-                for row in table["rows"]:
-                    output_lines.append(f"  {row['formatted']}")
-
+                output_lines.extend(f"  {row['formatted']}" for row in table["rows"])
                 output_lines.append("")
 
         return "\n".join(output_lines)
 
-    def analyze_ocr_quality(self, file_path: Path) -> Dict[str, Any]:
+    def analyze_ocr_quality(
+        self,
+        file_path: Optional[Path] = None,
+        result: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         """
         Analyze OCR quality and provide insights
+
+        Args:
+            file_path: Image to OCR when no result is given
+            result: An earlier extract_text() result; pass it to skip re-OCR
         """
-        result = self.extract_text(file_path)
+        if result is None:
+            if file_path is None:
+                raise ValueError("analyze_ocr_quality needs a file_path or result")
+            result = self.extract_text(file_path)
         if result["status"] != "success" or result["ocr_dataframe"] is None:
             return result
 
@@ -498,19 +797,32 @@ class ImageConverter:
                 ],
             }
 
-        # Analyze OCR quality
+        # Analyze OCR quality; every statistic comes from one select()
+        confidence = pl.col("confidence")
+        stats = df.select(
+            confidence.mean().alias("average_confidence"),
+            confidence.min().alias("min_confidence"),
+            confidence.max().alias("max_confidence"),
+            (confidence < 50).sum().alias("low_confidence_words"),
+            (confidence >= 80).sum().alias("high_confidence_words"),
+            confidence.len().alias("total_words"),
+            pl.col("text").n_unique().alias("unique_words"),
+            (pl.col("text") == "").sum().alias("empty_detections"),
+        ).row(0, named=True)
         analysis = {
             "confidence_statistics": {
-                "average_confidence": df.select(pl.col("confidence").mean()).item(),
-                "min_confidence": df.select(pl.col("confidence").min()).item(),
-                "max_confidence": df.select(pl.col("confidence").max()).item(),
-                "low_confidence_words": df.filter(pl.col("confidence") < 50).height,
-                "high_confidence_words": df.filter(pl.col("confidence") >= 80).height,
+                key: stats[key]
+                for key in (
+                    "average_confidence",
+                    "min_confidence",
+                    "max_confidence",
+                    "low_confidence_words",
+                    "high_confidence_words",
+                )
             },
             "text_distribution": {
-                "total_words": df.height,
-                "unique_words": df.select(pl.col("text").n_unique()).item(),
-                "empty_detections": df.filter(pl.col("text") == "").height,
+                key: stats[key]
+                for key in ("total_words", "unique_words", "empty_detections")
             },
         }
 
@@ -573,25 +885,25 @@ class ImageConverter:
                     output.append("| " + " | ".join(headers) + " |")
                     output.append("|" + "|".join([" --- "] * max_cells) + "|")
 
-                    # Table data
-                    for row in rows:
-                        cells = row.get("cells", [])
-                        # Pad with empty cells if needed
-                        while len(cells) < max_cells:
-                            cells.append("")
-                        output.append("| " + " | ".join(cells) + " |")
+                    # Table data, padded with empty cells (the rows are not modified)
+                    output.extend(
+                        "| "
+                        + " | ".join(cells + [""] * (max_cells - len(cells)))
+                        + " |"
+                        for cells in (row.get("cells", []) for row in rows)
+                    )
 
                 output.append("")
 
             elif format_type.lower() == "csv":
                 output.append(f"# Table {i+1}")
-                for row in rows:
-                    cells = row.get("cells", [])
-                    # Clean cells for CSV
-                    clean_cells = [
-                        cell.replace(",", ";").replace('"', "") for cell in cells
-                    ]
-                    output.append(",".join(f'"{cell}"' for cell in clean_cells))
+                output.extend(
+                    ",".join(
+                        f'"{cell.translate(_CSV_TRANSLATION)}"'
+                        for cell in row.get("cells", [])
+                    )
+                    for row in rows
+                )
                 output.append("")
 
             elif format_type.lower() == "html":
@@ -600,18 +912,16 @@ class ImageConverter:
 
                 for row in rows:
                     output.append("  <tr>")
-                    cells = row.get("cells", [])
-                    for cell in cells:
-                        clean_cell = cell.replace("<", "&lt;").replace(">", "&gt;")
-                        output.append(f"    <td>{clean_cell}</td>")
+                    output.extend(
+                        f"    <td>{cell.translate(_HTML_TRANSLATION)}</td>"
+                        for cell in row.get("cells", [])
+                    )
                     output.append("  </tr>")
 
                 output.append("</table>")
                 output.append("")
 
             elif format_type.lower() == "json":
-                import json
-
                 table_data = {
                     "table_id": i + 1,
                     "rows": len(rows),
@@ -630,7 +940,29 @@ class ImageConverter:
                         for j, row in enumerate(rows)
                     ],
                 }
-                output.append(json.dumps(table_data, indent=2))
+                output.append(_dumps_json(table_data))
                 output.append("")
 
         return "\n".join(output)
+
+
+# Per-process converter for extract_text_batch workers
+_worker_converter: Optional[ImageConverter] = None
+
+
+def _init_batch_worker() -> None:
+    # Workers already run one image per core; Tesseract's OpenMP threads on
+    # top would oversubscribe. Set before the worker's converter loads
+    # Tesseract, and only here, so the gateway process keeps its threads.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def _batch_worker(
+    path: Path, include_metadata: bool, ocr_config: str, preprocess: bool
+) -> Dict[str, Any]:
+    global _worker_converter
+    if _worker_converter is None:
+        _worker_converter = ImageConverter()
+    return _worker_converter.extract_text(
+        path, include_metadata, ocr_config, preprocess
+    )
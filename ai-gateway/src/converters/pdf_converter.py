@@ -1,26 +1,157 @@
 """
 PDF Document Converter
-Converts PDF files to structured text using pypdf
+Converts PDF files to structured text using PyMuPDF (when installed) or pypdf
 """
 
+import io
 import logging
+import mmap
+import os
+import sys
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from itertools import islice, repeat
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import polars as pl
 import pytesseract
 from PIL import Image
 from pypdf import PdfReader
 
+try:  # optional: C-backed MuPDF parser, much faster than pure-Python pypdf
+    import pymupdf
+except ImportError:  # pragma: no cover - optional dependency
+    pymupdf = None
+
 logger = logging.getLogger(__name__)
 
 
+@contextmanager
+def _mapped_reader(file_path: Path) -> Iterator[PdfReader]:
+    """
+    PdfReader over a read-only memory map of the file
+
+    Given a path, pypdf first copies the whole file into a BytesIO; the map
+    instead lets the OS page data in as the parser seeks, and worker
+    processes share the same page cache. The reader is only valid inside
+    the block.
+    """
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield PdfReader(mapped)
+
+
+def _page_columns(pages_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-page numbers for statistics and analysis, gathered column-wise"""
+    page_numbers = array("q")
+    char_counts = array("q")
+    has_text = []
+    for page in pages_data:
+        page_numbers.append(page["page_number"])
+        char_counts.append(page["char_count"])
+        has_text.append(page["has_text"])
+    return {
+        "page_number": page_numbers,
+        "char_count": char_counts,
+        "has_text": has_text,
+    }
+
+
+def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of an extract_text() result whose containers can be edited freely"""
+    pages = []
+    for page in result["pages"]:
+        page = dict(page)
+        if "dimensions" in page:
+            page["dimensions"] = dict(page["dimensions"])
+        pages.append(page)
+    df = result["pages_dataframe"]
+    return {
+        **result,
+        "metadata": dict(result["metadata"]),
+        "pages": pages,
+        "pages_dataframe": df.clone() if df is not None else None,
+        "statistics": dict(result["statistics"]),
+    }
+
+
+def _result_text_bytes(result: Dict[str, Any]) -> int:
+    """Approximate memory held by a result's page and combined text"""
+    return sys.getsizeof(result["full_text"]) + sum(
+        sys.getsizeof(page.get("text", "")) for page in result["pages"]
+    )
+
+
+def _iter_page_data(
+    pages: Any, include_text: bool, start: int = 0
+) -> Iterator[Dict[str, Any]]:
+    for i, page in islice(enumerate(pages), start, None):
+        page_data = _page_data(page, i)
+        if not include_text:
+            del page_data["text"]
+        yield page_data
+
+
+def _page_data(page: Any, index: int) -> Dict[str, Any]:
+    """Extract one page's text and dimensions (pypdf or PyMuPDF page)"""
+    try:
+        if hasattr(page, "get_text"):  # PyMuPDF
+            text = page.get_text("text").strip()
+        else:
+            text = page.extract_text().strip()
+        char_count = len(text)
+
+        page_data = {
+            "page_number": index + 1,
+            "text": text,
+            "char_count": char_count,
+            "has_text": char_count > 0,
+        }
+
+        # Try to extract additional page info
+        if hasattr(page, "mediabox"):
+            page_data["dimensions"] = {
+                "width": float(page.mediabox.width),
+                "height": float(page.mediabox.height),
+            }
+
+        return page_data
+
+    except Exception as e:
+        logger.warning(f"Failed to extract text from page {index + 1}: {e}")
+        return {
+            "page_number": index + 1,
+            "text": "",
+            "char_count": 0,
+            "has_text": False,
+            "error": str(e),
+        }
+
+
 class PDFConverter:
     """Converts PDF documents to structured text using multiple methods"""
 
-    def __init__(self):
+    # Below this many pages, process start-up costs more than it saves
+    PARALLEL_MIN_PAGES = 8
+    RESULT_CACHE_SIZE = 32  # extraction results kept for analyze_structure
+    RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # text those results may hold
+
+    def __init__(self, use_pymupdf: bool = True):
         self.supported_formats = [".pdf"]
+        # False (or PyMuPDF missing) uses pypdf, which is also the fallback
+        # when PyMuPDF fails on a document
+        self.use_pymupdf = use_pymupdf and pymupdf is not None
         self.ocr_enabled = self._check_tesseract()
+        # (path, mtime_ns, size) -> (extract_text() result, its text bytes);
+        # a changed file gets a new key, so stale entries simply age out
+        self._result_cache: (
+            "OrderedDict[Tuple[str, int, int], Tuple[Dict[str, Any], int]]"
+        ) = OrderedDict()
+        self._result_cache_bytes = 0
 
     def _check_tesseract(self) -> bool:
         """Check if Tesseract OCR is available"""
@@ -38,87 +169,59 @@ class PDFConverter:
         return file_path.suffix.lower() in self.supported_formats
 
     def extract_text(
-        self, file_path: Path, include_metadata: bool = True
+        self,
+        file_path: Path,
+        include_metadata: bool = True,
+        parallel: bool = True,
+        max_workers: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
-        Extract text from PDF file using pypdf with Polars for data analysis
+        Extract text from PDF file using PyMuPDF or pypdf with Polars for data analysis
 
         Args:
             file_path: Path to PDF file
             include_metadata: Whether to include document metadata
+            parallel: Spread pages over worker processes for long documents
+                (pypdf only; PyMuPDF is fast enough to run inline)
+            max_workers: Pool size for parallel extraction (default: CPU count)
 
         Returns:
             Dictionary containing extracted text, metadata, and structured data
         """
         try:
-            reader = PdfReader(file_path)
-
-            # Extract metadata if requested
-            metadata = {}
-            if include_metadata:
-                metadata = self._extract_metadata(reader, file_path)
-
-            # Extract text from each page
-            pages_data = []
-            total_chars = 0
-
-            for i, page in enumerate(reader.pages):
+            extracted = None
+            if self.use_pymupdf:
                 try:
-                    text = page.extract_text().strip()
-                    char_count = len(text)
-                    total_chars += char_count
-
-                    page_data = {
-                        "page_number": i + 1,
-                        "text": text,
-                        "char_count": char_count,
-                        "has_text": char_count > 0,
-                    }
-
-                    # Try to extract additional page info
-                    if hasattr(page, "mediabox"):
-                        page_data["dimensions"] = {
-                            "width": float(page.mediabox.width),
-                            "height": float(page.mediabox.height),
-                        }
-
-                    pages_data.append(page_data)
-
+                    extracted = self._extract_with_pymupdf(file_path, include_metadata)
                 except Exception as e:
-                    logger.warning(f"Failed to extract text from page {i + 1}: {e}")
-                    pages_data.append(
-                        {
-                            "page_number": i + 1,
-                            "text": "",
-                            "char_count": 0,
-                            "has_text": False,
-                            "error": str(e),
-                        }
-                    )
-
-            # Create structured output using Polars for data analysis
-            try:
-                pages_df = pl.DataFrame(pages_data)
-            except Exception as e:
-                logger.warning(f"Failed to create Polars DataFrame: {e}")
-                pages_df = None
+                    logger.warning(f"PyMuPDF failed on {file_path}, using pypdf: {e}")
+            if extracted is None:
+                extracted = self._extract_with_pypdf(
+                    file_path, include_metadata, parallel, max_workers
+                )
+            metadata, pages_data, extraction_method = extracted
+
+            columns = _page_columns(pages_data)
+            total_chars = sum(columns["char_count"])
+            non_empty_pages = sum(columns["has_text"])
 
             # Calculate statistics
             statistics = {
                 "total_pages": len(pages_data),
                 "total_characters": total_chars,
-                "non_empty_pages": len([p for p in pages_data if p["has_text"]]),
-                "empty_pages": len([p for p in pages_data if not p["has_text"]]),
+                "non_empty_pages": non_empty_pages,
+                "empty_pages": len(pages_data) - non_empty_pages,
                 "average_chars_per_page": (
                     total_chars / len(pages_data) if pages_data else 0
                 ),
-                "extraction_method": "pypdf_with_polars",
+                "extraction_method": extraction_method,
             }
 
             return {
                 "metadata": metadata,
                 "pages": pages_data,
-                "pages_dataframe": pages_df,
+                # Built on demand by analyze_structure()
+                "pages_dataframe": None,
                 "statistics": statistics,
                 "full_text": self._combine_page_text(pages_data),
                 "status": "success",
@@ -140,6 +243,110 @@ class PDFConverter:
                 "status": "error",
             }
 
+    def iter_pages(
+        self, file_path: Path, include_text: bool = True
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield page dicts one at a time instead of collecting the whole document
+
+        Only the current page's text is held, so memory stays flat for very
+        long PDFs. Pages have the same fields as extract_text()["pages"].
+        Like extract_text(), a document PyMuPDF cannot open or read is
+        continued with pypdf (from the first page not yet yielded).
+
+        Args:
+            file_path: Path to PDF file
+            include_text: Whether to keep each page's text (counts are always set)
+        """
+        done = 0
+        if self.use_pymupdf:
+            try:
+                doc = pymupdf.open(file_path)
+            except Exception as e:
+                logger.warning(f"PyMuPDF failed on {file_path}, using pypdf: {e}")
+                doc = None
+            if doc is not None:
+                with doc:
+                    pages = _iter_page_data(doc, include_text)
+                    while True:
+                        # Only PyMuPDF's own failures fall back; the consumer's
+                        # exceptions at the yield are not caught here
+                        try:
+                            page_data = next(pages)
+                        except StopIteration:
+                            return
+                        except Exception as e:
+                            logger.warning(
+                                f"PyMuPDF failed on {file_path} after {done} pages,"
+                                f" using pypdf: {e}"
+                            )
+                            break
+                        yield page_data
+                        done += 1
+        with _mapped_reader(file_path) as reader:
+            yield from _iter_page_data(reader.pages, include_text, done)
+
+    def _extract_with_pymupdf(
+        self, file_path: Path, include_metadata: bool
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]], str]:
+        """Extract metadata and per-page data with PyMuPDF"""
+        with pymupdf.open(file_path) as doc:
+            metadata = {}
+            if include_metadata:
+                metadata = self._extract_pymupdf_metadata(doc, file_path)
+            pages_data = [_page_data(page, i) for i, page in enumerate(doc)]
+        return metadata, pages_data, "pymupdf_with_polars"
+
+    def _extract_with_pypdf(
+        self,
+        file_path: Path,
+        include_metadata: bool,
+        parallel: bool,
+        max_workers: Optional[int],
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]], str]:
+        """Extract metadata and per-page data with pypdf"""
+        with _mapped_reader(file_path) as reader:
+            # Extract metadata if requested
+            metadata = {}
+            if include_metadata:
+                metadata = self._extract_metadata(reader, file_path)
+
+            # Extract text from each page
+            page_count = len(reader.pages)
+            if parallel and page_count >= self.PARALLEL_MIN_PAGES:
+                pages_data = self._extract_pages_parallel(
+                    file_path, page_count, max_workers
+                )
+            else:
+                pages_data = [
+                    _page_data(page, i) for i, page in enumerate(reader.pages)
+                ]
+        return metadata, pages_data, "pypdf_with_polars"
+
+    def _extract_pages_parallel(
+        self, file_path: Path, page_count: int, max_workers: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        """
+        Extract pages in worker processes, keeping page order
+
+        pypdf parses in pure Python under the GIL, so pages are split into a
+        few contiguous ranges per worker; each range opens its own reader,
+        which only parses the pages it touches.
+        """
+        workers = min(max_workers or os.cpu_count() or 1, page_count)
+        if workers == 1:
+            return _extract_page_range(file_path, 0, page_count)
+        chunk = -(-page_count // (workers * 4))
+        starts = range(0, page_count, chunk)
+        stops = [min(start + chunk, page_count) for start in starts]
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                ranges = pool.map(_extract_page_range, repeat(file_path), starts, stops)
+                return [page for pages in ranges for page in pages]
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(f"Parallel PDF extraction unavailable, running inline: {e}")
+            return _extract_page_range(file_path, 0, page_count)
+
     def _extract_metadata(self, reader: PdfReader, file_path: Path) -> Dict[str, Any]:
         """Extract PDF metadata"""
         metadata = {
@@ -163,41 +370,137 @@ class PDFConverter:
 
         return metadata
 
+    def _extract_pymupdf_metadata(self, doc: Any, file_path: Path) -> Dict[str, Any]:
+        """Extract PDF metadata from a PyMuPDF document (same keys as pypdf)"""
+        metadata = {
+            "filename": file_path.name,
+            "file_size": file_path.stat().st_size,
+            "pages": doc.page_count,
+        }
+
+        # Like pypdf, only report document info when the trailer has /Info
+        info = doc.metadata
+        if info and doc.xref_get_key(-1, "Info")[0] != "null":
+            metadata.update(
+                {
+                    "title": (info.get("title") or "").strip(),
+                    "author": (info.get("author") or "").strip(),
+                    "subject": (info.get("subject") or "").strip(),
+                    "creator": (info.get("creator") or "").strip(),
+                    "producer": (info.get("producer") or "").strip(),
+                    "creation_date": info.get("creationDate") or "",
+                    "modification_date": info.get("modDate") or "",
+                }
+            )
+
+        return metadata
+
     def _combine_page_text(self, pages_data: List[Dict]) -> str:
         """Combine text from all pages into a single string"""
-        texts = []
+        buffer = io.StringIO()
         for page in pages_data:
-            if page.get("text"):
-                texts.append(f"--- Page {page['page_number']} ---\n{page['text']}\n")
-        return "\n".join(texts)
+            text = page.get("text")
+            if text:
+                if buffer.tell():
+                    buffer.write("\n")
+                buffer.write(f"--- Page {page['page_number']} ---\n")
+                buffer.write(text)
+                buffer.write("\n")
+        return buffer.getvalue()
+
+    def _build_pages_dataframe(self, columns: Dict[str, Any]) -> pl.DataFrame:
+        """Frame over the page columns analysis needs, with an explicit schema"""
+        return pl.DataFrame(
+            columns,
+            schema={
+                "page_number": pl.Int64,
+                "char_count": pl.Int64,
+                "has_text": pl.Boolean,
+            },
+        )
 
-    def analyze_structure(self, file_path: Path) -> Dict[str, Any]:
+    def _extract_cached(self, file_path: Path) -> Dict[str, Any]:
         """
-        Analyze document structure and return insights using Polars
+        extract_text() with successful results memoized per file version
+
+        Cached entries are never handed out: every call returns a copy, so
+        callers may edit pages and metadata without affecting later calls.
         """
+        stat = os.stat(file_path)
+        key = (str(file_path), stat.st_mtime_ns, stat.st_size)
+        cache = self._result_cache
+        if key in cache:
+            cache.move_to_end(key)
+            return _copy_result(cache[key][0])
+
         result = self.extract_text(file_path)
-        if result["status"] != "success" or result["pages_dataframe"] is None:
+        size = _result_text_bytes(result)
+        if result["status"] != "success" or size > self.RESULT_CACHE_MAX_BYTES:
             return result
+        try:
+            result["pages_dataframe"] = self._build_pages_dataframe(
+                _page_columns(result["pages"])
+            )
+        except Exception as e:
+            logger.warning(f"Failed to create Polars DataFrame: {e}")
+        cache[key] = (result, size)
+        self._result_cache_bytes += size
+        while (
+            len(cache) > self.RESULT_CACHE_SIZE
+            or self._result_cache_bytes > self.RESULT_CACHE_MAX_BYTES
+        ):
+            self._result_cache_bytes -= cache.popitem(last=False)[1][1]
+        return _copy_result(result)
+
+    def analyze_structure(
+        self,
+        file_path: Optional[Path] = None,
+        result: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Analyze document structure and return insights using Polars
 
-        df = result["pages_dataframe"]
+        Args:
+            file_path: PDF to extract when no result is given; repeat calls
+                for an unchanged file reuse the earlier extraction
+            result: An earlier extract_text() result; pass it to skip re-parsing
+        """
+        if result is None:
+            if file_path is None:
+                raise ValueError("analyze_structure needs a file_path or result")
+            result = self._extract_cached(file_path)
+        if result["status"] != "success":
+            return result
 
-        # Analyze page content patterns
+        # The caller's result is left as it is; the frame goes on the copy
+        # returned below
+        df = result["pages_dataframe"]
+        if df is None:
+            try:
+                df = self._build_pages_dataframe(_page_columns(result["pages"]))
+            except Exception as e:
+                logger.warning(f"Failed to create Polars DataFrame: {e}")
+                return result
+
+        # Analyze page content patterns; all aggregates come from one select()
+        char_count = pl.col("char_count")
+        stats = df.select(
+            pl.col("has_text").sum().alias("pages_with_content"),
+            char_count.sum().alias("total_characters"),
+            char_count.mean().alias("average_chars_per_page"),
+            char_count.max().alias("max_chars_per_page"),
+            char_count.min().alias("min_chars_per_page"),
+        ).row(0, named=True)
+        pages_with_content = stats.pop("pages_with_content")
         analysis = {
             "content_distribution": {
-                "pages_with_content": df.filter(pl.col("has_text")).height,
-                "pages_without_content": df.filter(~pl.col("has_text")).height,
+                "pages_with_content": pages_with_content,
+                "pages_without_content": df.height - pages_with_content,
                 "content_percentage": (
-                    (df.filter(pl.col("has_text")).height / df.height * 100)
-                    if df.height > 0
-                    else 0
+                    (pages_with_content / df.height * 100) if df.height > 0 else 0
                 ),
             },
-            "text_statistics": {
-                "total_characters": df.select(pl.col("char_count").sum()).item(),
-                "average_chars_per_page": df.select(pl.col("char_count").mean()).item(),
-                "max_chars_per_page": df.select(pl.col("char_count").max()).item(),
-                "min_chars_per_page": df.select(pl.col("char_count").min()).item(),
-            },
+            "text_statistics": stats,
         }
 
         # Detect potential issues
@@ -210,7 +513,12 @@ class PDFConverter:
         if analysis["text_statistics"]["average_chars_per_page"] < 100:
             issues.append("Very low text density - may need OCR processing")
 
-        return {**result, "structure_analysis": analysis, "potential_issues": issues}
+        return {
+            **result,
+            "pages_dataframe": df,
+            "structure_analysis": analysis,
+            "potential_issues": issues,
+        }
 
     def extract_with_ocr(self, file_path: Path) -> Dict[str, Any]:
         """
@@ -225,3 +533,9 @@ class PDFConverter:
             "error": "OCR extraction not yet fully implemented",
             "status": "not_implemented",
         }
+
+
+# Worker for PDFConverter's parallel page extraction
+def _extract_page_range(file_path: Path, start: int, stop: int) -> List[Dict[str, Any]]:
+    with _mapped_reader(file_path) as reader:
+        return [_page_data(reader.pages[i], i) for i in range(start, stop)]
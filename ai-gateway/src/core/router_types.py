@@ -2,11 +2,13 @@
 
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass, field
-from enum import Enum
-from typing import Any, Dict, Optional
+from enum import Enum, unique
+from typing import Any, Dict, Optional, Union
 
 
+@unique
 class ModelType(str, Enum):
     """High level categories of models managed by the gateway."""
 
@@ -15,6 +17,7 @@ class ModelType(str, Enum):
     MULTIMODAL = "multimodal"
 
 
+@unique
 class RequestType(str, Enum):
     """Supported inference request types."""
 
@@ -23,7 +26,16 @@ class RequestType(str, Enum):
     DOCUMENT = "document"
 
 
-@dataclass
+def type_key(value: Union[str, Enum]) -> str:
+    """Plain interned string for a type given as an Enum member or its value.
+
+    Enums stay the validated external API; internal dict keys and
+    comparisons use the raw string so lookups take the exact-str fast path.
+    """
+    return sys.intern(value.value if isinstance(value, Enum) else value)
+
+
+@dataclass(slots=True)
 class UnifiedRequest:
     """Standardised request payload handed to loaded models."""
 
@@ -35,7 +47,7 @@ class UnifiedRequest:
     timestamp: Optional[float] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class UnifiedResponse:
     """Standardised response returned from loaded models."""
 
@@ -55,4 +67,5 @@ __all__ = [
     "RequestType",
     "UnifiedRequest",
     "UnifiedResponse",
+    "type_key",
 ]
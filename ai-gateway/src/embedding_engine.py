@@ -3,15 +3,24 @@
 Production-ready Embedding Engine with automatic NPU/CPU selection
 Based on empirical benchmarking results for optimal performance
 """
+
 import json
 import logging
 import os
+import threading
 import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import repeat
 from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import onnxruntime as ort
 
+from runtime.utils import ort_graph_cache
+from runtime.utils.ort_env import apply_thread_options, global_thread_pool_sizes
+from runtime.utils.ort_env import init_environment as _init_ort_environment
+
 try:  # Optional dependency for accurate tokenization
     from transformers import AutoTokenizer  # type: ignore
     from transformers import __version__ as _transformers_version  # type: ignore
@@ -19,9 +28,80 @@ except Exception:  # pragma: no cover
     AutoTokenizer = None  # type: ignore
     _transformers_version = None  # type: ignore
 
+try:  # Rust WordPiece over vocab.txt when transformers is unavailable
+    from tokenizers import BertWordPieceTokenizer  # type: ignore
+except Exception:  # pragma: no cover
+    BertWordPieceTokenizer = None  # type: ignore
+
+try:  # optional: faster JSON parser for model configs
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
+def _load_json(path: str) -> Any:
+    """Parse a JSON file, via orjson when installed"""
+    with open(path, "rb") as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+_env_arena_lock = threading.Lock()
+_env_arena_registered: Optional[bool] = None
+
+
+def _register_env_arena() -> bool:
+    """Register one process-wide CPU arena that grows by exactly what is requested.
+
+    The default per-session arena extends in powers of two and never gives
+    memory back; sessions opt into this shared one via use_env_allocators.
+    """
+    global _env_arena_registered
+    # Registering the allocator creates ORT's environment; thread pools first
+    _init_ort_environment()
+    with _env_arena_lock:
+        if _env_arena_registered is None:
+            try:
+                mem_info = ort.OrtMemoryInfo(
+                    "Cpu",
+                    ort.OrtAllocatorType.ORT_ARENA_ALLOCATOR,
+                    0,
+                    ort.OrtMemType.DEFAULT,
+                )
+                # max_mem=0 (no cap), extend strategy 1 = kSameAsRequested,
+                # ORT defaults for the remaining knobs
+                ort.create_and_register_allocator(
+                    mem_info, ort.OrtArenaCfg(0, 1, -1, -1)
+                )
+                _env_arena_registered = True
+            except Exception as e:
+                logger.warning(
+                    f"Shared CPU arena unavailable, using session arenas: {e}"
+                )
+                _env_arena_registered = False
+        return _env_arena_registered
+
+
+@dataclass
+class EmbeddingIOBinding:
+    """Reusable ORT IOBinding with a preallocated output buffer.
+
+    Built once per batch size via ``create_io_binding`` and passed back into
+    ``encode`` so repeated runs write into the same array instead of
+    allocating fresh output tensors each call. ``output`` is sized for
+    max_length; each run binds a contiguous (batch, seq_len, hidden) prefix
+    of it, so batches keep their padded bucket length.
+    """
+
+    session: ort.InferenceSession
+    provider: str
+    binding: ort.IOBinding
+    output_name: str
+    output: np.ndarray
+
+
 class OptimizedEmbeddingEngine:
     """
     Production embedding engine with automatic NPU/CPU provider selection
@@ -31,22 +111,95 @@ class OptimizedEmbeddingEngine:
     - CPU: 4+ texts (more efficient for larger batches)
     """
 
+    _physical_cores: Optional[int] = None  # psutil probe, shared by instances
+
     def __init__(
-        self, model_path: str, model_id: Optional[str] = None, max_length: int = 512
+        self,
+        model_path: str,
+        model_id: Optional[str] = None,
+        max_length: int = 512,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
+        quantized: bool = True,
+        pooling: Optional[str] = None,
+        cpu_mem_arena: bool = True,
+        shrink_arena: bool = False,
     ):
+        if pooling not in (None, "cls", "mean"):
+            raise ValueError(f"Unsupported pooling: {pooling!r}")
         self.model_path = model_path
         self.model_id = model_id
         self.max_length = max_length
+        # None => one thread per physical core (see _initialize_sessions)
+        self.intra_op_threads = intra_op_threads
+        # None => sequential execution (no inter-op pool)
+        self.inter_op_threads = inter_op_threads
+        # Prefer model.int8.onnx for the CPU session when it exists
+        # (scripts/export_bge_model.py --quantize); set from the file found
+        self.quantized = quantized
+        # "cls" (BGE) or "mean" (MiniLM-style); None => read from a
+        # sentence-transformers 1_Pooling/config.json, else "cls"
+        self.pooling = pooling
+        # False disables ORT's CPU arena entirely (memory-constrained hosts);
+        # shrink_arena returns unused arena chunks after every run
+        self.cpu_mem_arena = cpu_mem_arena
+        self._run_options = None
+        if cpu_mem_arena and shrink_arena:
+            self._run_options = ort.RunOptions()
+            self._run_options.add_run_config_entry(
+                "memory.enable_memory_arena_shrinkage", "cpu:0"
+            )
         self.session_cpu = None
+        # Loaded on the first batch routed to it (see _select_optimal_provider)
         self.session_npu = None
+        self._npu_checked = False
+        self._npu_lock = threading.Lock()
         self.vocab = None
+        self._vocab_get = None  # bound self.vocab.get for the heuristic tokenizer
+        self._special_ids: Tuple[int, int, int] = (0, 0, 0)  # [CLS], [SEP], [UNK]
         self.config = None
         self._tokenizer = None
         self._tokenizer_name = None
+        self._wordpiece = None  # tokenizers.BertWordPieceTokenizer fallback
+        self._pad_id = 0
+        # Shared read-only zeros for models without segment ids (see
+        # _zero_token_types); grown to the largest batch seen
+        self._zero_types: Optional[np.ndarray] = None
         self._last_perf: Dict[str, Any] | None = None
+        self._hidden_output: Optional[str] = None
+        # int32 when the graph declares int32 token inputs (half the bytes)
+        self._token_dtype = np.int64
+        # Graph input names, in order; token_type_ids is only built and fed
+        # when the graph declares it
+        self._input_names: Tuple[str, ...] = (
+            "input_ids",
+            "attention_mask",
+            "token_type_ids",
+        )
+        self._uses_token_types = True
 
-        # Performance thresholds (based on benchmarking)
+        # Performance thresholds (based on benchmarking); the static rule until
+        # the accelerator session exists, then the default while calibrating
         self.NPU_OPTIMAL_BATCH_SIZE = 3
+        # Timed runs per provider before a routing bucket settles on a winner
+        self.CALIBRATION_RUNS = 3
+        self.CALIBRATION_EMA_ALPHA = 0.5
+        # (batch bucket, length bucket) -> provider -> [latency EMA ms, runs]
+        self._provider_stats: Dict[Tuple[int, int], Dict[str, List[float]]] = {}
+        # Recently tokenized texts, kept as (ids, type ids) trimmed to their
+        # unpadded length; keyed by (max_length, text)
+        self.TOKEN_CACHE_SIZE = 4096
+        # Batches are padded up to the first of these lengths that fits (capped
+        # at max_length), so sessions only ever see a handful of shapes
+        self.SEQ_LEN_BUCKETS = (32, 64, 128, 256, 512)
+        self._token_cache: "OrderedDict[Tuple[int, str], tuple]" = OrderedDict()
+        # Hidden states of encode() runs are written into one reused
+        # (batch, seq, hidden) buffer, grown to the largest batch up to this
+        # size (at any seq_len); a concurrent call that finds it busy lets
+        # ORT allocate
+        self.OUTPUT_BUFFER_MAX_BATCH = 64
+        self._out_buf: Optional[np.ndarray] = None
+        self._out_lock = threading.Lock()
 
         self._load_model_assets()
         self._init_tokenizer()
@@ -57,11 +210,18 @@ class OptimizedEmbeddingEngine:
         # Load configuration
         config_path = os.path.join(self.model_path, "config.json")
         if os.path.exists(config_path):
-            with open(config_path, "r") as f:
-                self.config = json.load(f)
-                logger.info(
-                    f"Loaded model config: {self.config.get('model_type', 'unknown')}"
-                )
+            self.config = _load_json(config_path)
+            logger.info(
+                f"Loaded model config: {self.config.get('model_type', 'unknown')}"
+            )
+
+        # sentence-transformers exports record the pooling they were trained with
+        pooling_path = os.path.join(self.model_path, "1_Pooling", "config.json")
+        if self.pooling is None and os.path.exists(pooling_path):
+            pooling_config = _load_json(pooling_path)
+            if pooling_config.get("pooling_mode_mean_tokens"):
+                self.pooling = "mean"
+        self.pooling = self.pooling or "cls"
 
         # Load vocabulary for tokenization
         vocab_path = os.path.join(self.model_path, "vocab.txt")
@@ -69,59 +229,112 @@ class OptimizedEmbeddingEngine:
             with open(vocab_path, "r", encoding="utf-8") as f:
                 self.vocab = {line.strip(): idx for idx, line in enumerate(f)}
                 logger.info(f"Loaded vocabulary: {len(self.vocab)} tokens")
-
-    def _initialize_sessions(self):
-        """Initialize ONNX Runtime sessions with WSL ARM64 optimizations"""
-        model_file = os.path.join(self.model_path, "model.onnx")
-
-        if not os.path.exists(model_file):
-            raise FileNotFoundError(f"Model file not found: {model_file}")
-
-        # Create ARM64 optimized session options
-        def create_optimized_options(provider_specific: bool = False):
-            session_opts = ort.SessionOptions()
-            session_opts.graph_optimization_level = (
-                ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self._vocab_get = self.vocab.get
+            unk = self.vocab.get("[UNK]", 0)
+            self._special_ids = (
+                self.vocab.get("[CLS]", unk),
+                self.vocab.get("[SEP]", unk),
+                unk,
             )
+
+    def _session_options(self, provider_specific: bool = False) -> ort.SessionOptions:
+        """Create ARM64 optimized session options"""
+        session_opts = ort.SessionOptions()
+        session_opts.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        # The encoder is a strict chain of ops, so parallel mode only adds
+        # scheduling overhead unless inter-op threads are asked for
+        if self.inter_op_threads:
             session_opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+            session_opts.inter_op_num_threads = self.inter_op_threads
+        else:
+            session_opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+
+        # ARM64 threading optimization (or the process-wide pools when
+        # GATEWAY_ORT_GLOBAL_THREADS is set, see runtime.utils.ort_env)
+        apply_thread_options(session_opts, self.intra_op_threads or self._cpu_cores())
+
+        # Memory optimizations
+        session_opts.enable_cpu_mem_arena = self.cpu_mem_arena
+        # Input shapes vary per batch (size and length bucket); a memory
+        # pattern is planned per shape, so it would only add planning cost
+        session_opts.enable_mem_pattern = False
+        if self.cpu_mem_arena and _register_env_arena():
+            session_opts.add_session_config_entry("session.use_env_allocators", "1")
+
+        if provider_specific:
+            session_opts.add_session_config_entry(
+                "session.intra_op.allow_spinning", "1"
+            )
+            session_opts.add_session_config_entry("session.force_spinning_stop", "1")
 
-            # ARM64 threading optimization
+        return session_opts
+
+    @classmethod
+    def _cpu_cores(cls) -> int:
+        """Physical core count, probed once per process."""
+        if cls._physical_cores is None:
             import psutil
 
-            cpu_cores = psutil.cpu_count(logical=False) or 4
-            session_opts.intra_op_num_threads = cpu_cores
-            session_opts.inter_op_num_threads = 2
+            cls._physical_cores = psutil.cpu_count(logical=False) or 4
+        return cls._physical_cores
 
-            # Memory optimizations
-            session_opts.enable_cpu_mem_arena = True
-            session_opts.enable_mem_pattern = True
+    def _initialize_sessions(self):
+        """Initialize ONNX Runtime sessions with WSL ARM64 optimizations"""
+        model_file = os.path.join(self.model_path, "model.onnx")
 
-            if provider_specific:
-                session_opts.add_session_config_entry(
-                    "session.intra_op.allow_spinning", "1"
-                )
-                session_opts.add_session_config_entry(
-                    "session.force_spinning_stop", "1"
-                )
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(f"Model file not found: {model_file}")
 
-            return session_opts
+        # The CPU session uses the INT8 variant when present; the accelerator
+        # session below keeps FP32 weights
+        int8_file = os.path.join(self.model_path, "model.int8.onnx")
+        self.quantized = self.quantized and os.path.exists(int8_file)
+        cpu_model_file = int8_file if self.quantized else model_file
 
-        # CPU session (ARM64 optimized)
+        # CPU session (ARM64 optimized). With GATEWAY_ORT_GRAPH_CACHE_DIR set,
+        # the fused graph is cached there and reused on later starts
         try:
-            cpu_opts = create_optimized_options()
-            self.session_cpu = ort.InferenceSession(
-                model_file, providers=["CPUExecutionProvider"], sess_options=cpu_opts
+            self.session_cpu = ort_graph_cache.create_session(
+                cpu_model_file, self._session_options, ["CPUExecutionProvider"]
+            )
+            logger.info(
+                f"✅ ARM64 optimized CPU session initialized"
+                f" ({'INT8' if self.quantized else 'FP32'} weights)"
             )
-            logger.info("✅ ARM64 optimized CPU session initialized")
+            # Only the hidden states are pooled; skip fetching any other output
+            self._hidden_output = self.session_cpu.get_outputs()[0].name
+            inputs = self.session_cpu.get_inputs()
+            self._input_names = tuple(i.name for i in inputs)
+            self._uses_token_types = "token_type_ids" in self._input_names
+            input_types = {i.type for i in inputs}
+            if input_types == {"tensor(int32)"}:
+                self._token_dtype = np.int32
         except Exception as e:
             logger.error(f"❌ Failed to initialize CPU session: {e}")
             raise
 
+        self._model_file = model_file
+
+    def _load_npu_session(self) -> None:
+        """Create the accelerator session once, on first use.
+
+        Small batches never need it, so deferring it keeps a second copy of
+        the weights out of memory until a large batch actually arrives.
+        """
+        with self._npu_lock:
+            if self._npu_checked:
+                return
+            self._init_npu_session()
+            self._npu_checked = True
+
+    def _init_npu_session(self) -> None:
         # Try Azure provider for additional optimization
         try:
-            azure_opts = create_optimized_options(provider_specific=True)
+            azure_opts = self._session_options(provider_specific=True)
             azure_session = ort.InferenceSession(
-                model_file,
+                self._model_file,
                 providers=["AzureExecutionProvider", "CPUExecutionProvider"],
                 sess_options=azure_opts,
             )
@@ -145,12 +358,12 @@ class OptimizedEmbeddingEngine:
         Preference order:
         1. Local tokenizer files in model directory (tokenizer.json / tokenizer.model)
         2. AutoTokenizer.from_pretrained(model_id)
-        3. Legacy whitespace heuristic (only for emergency fallback)
+        3. tokenizers.BertWordPieceTokenizer over the model's vocab.txt
+        4. Legacy whitespace heuristic (only for emergency fallback)
         """
         if AutoTokenizer is None:
-            logger.warning(
-                "HF transformers not installed; using legacy whitespace heuristic tokenizer"
-            )
+            logger.warning("HF transformers not installed; using vocab.txt WordPiece")
+            self._init_wordpiece()
             return
         # Try local directory first
         local_dir = self.model_path
@@ -175,84 +388,310 @@ class OptimizedEmbeddingEngine:
                     "Loaded tokenizer is not a fast tokenizer; performance may degrade"
                 )
             if self._tokenizer:
+                self._pad_id = self._tokenizer.pad_token_id or 0
                 self._tokenizer_name = use_source
                 logger.info(f"Initialized tokenizer from {use_source}")
         except Exception as e:  # pragma: no cover
             logger.warning(
-                f"Failed to initialize HF tokenizer ({e}); falling back to whitespace heuristic"
+                f"Failed to initialize HF tokenizer ({e}); falling back to vocab.txt WordPiece"
             )
             self._tokenizer = None
+        if self._tokenizer is None:
+            self._init_wordpiece()
+
+    def _init_wordpiece(self):
+        """Rust WordPiece tokenizer built from vocab.txt (lowercased, BERT-style)."""
+        vocab_path = os.path.join(self.model_path, "vocab.txt")
+        if BertWordPieceTokenizer is None or not self.vocab:
+            logger.warning("Using legacy whitespace heuristic tokenizer")
+            return
+        try:
+            tokenizer = BertWordPieceTokenizer(vocab_path, lowercase=True)
+            tokenizer.enable_truncation(max_length=self.max_length)
+        except Exception as e:
+            logger.warning(
+                f"WordPiece tokenizer unavailable ({e}); using whitespace heuristic"
+            )
+            return
+        self._wordpiece = tokenizer
+        self._pad_id = self.vocab.get("[PAD]", 0)
+        self._tokenizer_name = f"wordpiece:{vocab_path}"
+        logger.info(f"Initialized WordPiece tokenizer from {vocab_path}")
 
     def _tokenize_batch(self, texts: List[str]) -> Dict[str, np.ndarray]:
-        """Tokenize a batch of texts returning numpy arrays shaped (batch, seq_len)."""
+        """Tokenize a batch of texts returning numpy arrays shaped (batch, seq_len).
+
+        seq_len is the smallest SEQ_LEN_BUCKETS entry that fits the batch's
+        longest row (capped at max_length), so short texts are not run at
+        full length. Texts seen recently reuse their cached rows;
+        only the rest go through the tokenizer.
+        """
+        rows = self._token_rows(texts)
+        longest = max(len(ids) for ids, _ in rows)
+        seq_len = min(
+            next((b for b in self.SEQ_LEN_BUCKETS if b >= longest), self.max_length),
+            self.max_length,
+        )
+        shape = (len(texts), seq_len)
+        input_ids = np.full(shape, self._pad_id, dtype=self._token_dtype)
+        attention_mask = np.zeros(shape, dtype=self._token_dtype)
+        uses_types = self._uses_token_types and any(t is not None for _, t in rows)
+        if uses_types:
+            token_type_ids = np.zeros(shape, dtype=self._token_dtype)
+        else:
+            token_type_ids = self._zero_token_types(shape)
+        for row, (ids, types) in enumerate(rows):
+            input_ids[row, : len(ids)] = ids
+            attention_mask[row, : len(ids)] = 1
+            if uses_types and types is not None:
+                token_type_ids[row, : len(ids)] = types
+        return {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": token_type_ids,
+        }
+
+    def _token_rows(self, texts: List[str]) -> List[Tuple[np.ndarray, Any]]:
+        """Unpadded (ids, type ids or None) per text, via the LRU where possible."""
         max_length = self.max_length
+        cache = self._token_cache
+        found = {}
+        for text in texts:
+            key = (max_length, text)
+            if key in cache and text not in found:
+                cache.move_to_end(key)
+                found[text] = cache[key]
+        misses = [t for t in dict.fromkeys(texts) if t not in found]
+        if misses:
+            for text, row in zip(misses, self._encode_rows(misses)):
+                found[text] = row
+                if self.TOKEN_CACHE_SIZE:
+                    cache[(max_length, text)] = row
+            while len(cache) > self.TOKEN_CACHE_SIZE:
+                cache.popitem(last=False)
+        return [found[text] for text in texts]
+
+    def _encode_rows(self, texts: List[str]) -> List[Tuple[np.ndarray, Any]]:
+        """Run the tokenizer over ``texts`` (truncated, unpadded, no caching)."""
+        max_length = self.max_length
+        dtype = self._token_dtype
         if self._tokenizer:
             encoded = self._tokenizer(
                 texts,
-                padding="max_length",
+                padding=False,
                 truncation=True,
                 max_length=max_length,
-                return_attention_mask=True,
+                return_attention_mask=False,
                 return_tensors=None,
             )
-            input_ids = np.array(encoded["input_ids"], dtype=np.int64)
-            attention_mask = np.array(encoded["attention_mask"], dtype=np.int64)
-            if "token_type_ids" in encoded:
-                token_type_ids = np.array(encoded["token_type_ids"], dtype=np.int64)
-            else:
-                token_type_ids = np.zeros_like(input_ids)
+            id_rows = encoded["input_ids"]
+            type_rows = encoded.get("token_type_ids") or repeat(None)
+        elif self._wordpiece is not None:
+            # Truncated to max_length by the tokenizer; batch runs in Rust
+            encodings = self._wordpiece.encode_batch(texts)
+            id_rows = [e.ids for e in encodings]
+            type_rows = [e.type_ids for e in encodings]
         else:
-            # Legacy heuristic per text
-            batch_ids = []
-            batch_mask = []
-            batch_type = []
+            # Legacy heuristic: whitespace words looked up in vocab.txt
+            vocab_get = self._vocab_get if self.vocab else None
+            cls_id, sep_id, unk_id = self._special_ids
+            id_rows = []
             for text in texts:
-                tokens = ["[CLS]"] + text.lower().split()[: max_length - 2] + ["[SEP]"]
-                if self.vocab:
-                    token_ids = [
-                        self.vocab.get(t, self.vocab.get("[UNK]", 0)) for t in tokens
-                    ]
+                words = text.lower().split()[: max_length - 2]
+                if vocab_get is not None:
+                    token_ids = [cls_id, *map(vocab_get, words, repeat(unk_id)), sep_id]
                 else:
-                    token_ids = [hash(t) % 30000 for t in tokens]
-                seq_len = len(token_ids)
-                pad = max_length - seq_len
-                token_ids = token_ids + [0] * pad
-                attention_mask = [1] * seq_len + [0] * pad
-                batch_ids.append(token_ids)
-                batch_mask.append(attention_mask)
-                batch_type.append([0] * max_length)
-            input_ids = np.array(batch_ids, dtype=np.int64)
-            attention_mask = np.array(batch_mask, dtype=np.int64)
-            token_type_ids = np.array(batch_type, dtype=np.int64)
-        return {
-            "input_ids": input_ids,
-            "attention_mask": attention_mask,
-            "token_type_ids": token_type_ids,
-        }
+                    token_ids = [hash(t) % 30000 for t in ["[CLS]", *words, "[SEP]"]]
+                id_rows.append(token_ids)
+            type_rows = repeat(None)
+        rows = []
+        for ids, types in zip(id_rows, type_rows):
+            if types is not None and self._uses_token_types and any(types):
+                types = np.array(types, dtype=dtype)
+            else:
+                types = None  # all zeros (or unused): rebuilt from shared zeros
+            rows.append((np.array(ids, dtype=dtype), types))
+        return rows
+
+    def _zero_token_types(self, shape: Tuple[int, int]) -> np.ndarray:
+        """All-zero segment ids of ``shape``, viewed from one shared buffer."""
+        size = shape[0] * shape[1]
+        zeros = self._zero_types
+        if zeros is None or zeros.size < size or zeros.dtype != self._token_dtype:
+            zeros = np.zeros(size, dtype=self._token_dtype)
+            zeros.flags.writeable = False
+            self._zero_types = zeros
+        return zeros[:size].reshape(shape)
+
+    def _route_bucket(
+        self, batch_size: int, seq_len: Optional[int] = None
+    ) -> Tuple[int, int]:
+        """Routing bucket: batch size by power of two, padded length by 64."""
+        return batch_size.bit_length(), (seq_len or self.max_length) // 64
 
     def _select_optimal_provider(
-        self, batch_size: int
+        self,
+        batch_size: int,
+        force_provider: Optional[str] = None,
+        seq_len: Optional[int] = None,
     ) -> Tuple[ort.InferenceSession, str]:
         """
         Automatically select optimal provider based on batch size
 
-        Rules optimized for WSL ARM64:
+        Rules optimized for WSL ARM64, used as-is until the accelerator
+        session has been loaded:
         - Batch 1-3: CPU-ARM64 (optimized single/small batch performance)
         - Batch 4+:  Azure Provider (if available, otherwise CPU)
+
+        With both sessions available, each routing bucket alternates providers
+        for CALIBRATION_RUNS timed runs apiece (static choice first), then
+        keeps the one with the lower latency average.
         """
-        if batch_size <= self.NPU_OPTIMAL_BATCH_SIZE:
+        if force_provider is not None:
+            if force_provider == "Azure" and not self._npu_checked:
+                self._load_npu_session()
+            sessions = {"CPU-ARM64": self.session_cpu, "Azure": self.session_npu}
+            if sessions.get(force_provider) is None:
+                raise ValueError(f"Provider not available: {force_provider!r}")
+            return sessions[force_provider], force_provider
+
+        static = "CPU-ARM64" if batch_size <= self.NPU_OPTIMAL_BATCH_SIZE else "Azure"
+        if static == "Azure" and not self._npu_checked:
+            self._load_npu_session()
+        if not self.session_npu:
             return self.session_cpu, "CPU-ARM64"
-        elif self.session_npu:
+
+        stats = self._provider_stats.get(self._route_bucket(batch_size, seq_len), {})
+        order = (static, "Azure" if static == "CPU-ARM64" else "CPU-ARM64")
+        runs = {p: stats[p][1] if p in stats else 0 for p in order}
+        if min(runs.values()) < self.CALIBRATION_RUNS:
+            provider = min(order, key=runs.__getitem__)
+        else:
+            provider = min(order, key=lambda p: stats[p][0])
+        if provider == "Azure":
             return self.session_npu, "Azure"
+        return self.session_cpu, "CPU-ARM64"
+
+    def _record_latency(
+        self, batch_size: int, seq_len: int, provider: str, elapsed_ms: float
+    ):
+        """Fold one run's inference time into its bucket's provider average."""
+        if not self.session_npu:
+            return  # nothing to choose between
+        bucket = self._route_bucket(batch_size, seq_len)
+        stats = self._provider_stats.setdefault(bucket, {})
+        entry = stats.get(provider)
+        if entry is None:
+            stats[provider] = [elapsed_ms, 1]
         else:
-            return self.session_cpu, "CPU-ARM64"
+            alpha = self.CALIBRATION_EMA_ALPHA
+            entry[0] += alpha * (elapsed_ms - entry[0])
+            entry[1] += 1
+
+    def _hidden_size(self, session: ort.InferenceSession) -> Optional[int]:
+        """Hidden size of a float32 (batch, seq, hidden) output, if knowable."""
+        output_meta = session.get_outputs()[0]
+        if output_meta.type != "tensor(float)" or len(output_meta.shape or ()) != 3:
+            return None
+        hidden = output_meta.shape[-1]
+        if not isinstance(hidden, int):
+            hidden = (self.config or {}).get("hidden_size")
+        return hidden or None
+
+    def _run_pooled(
+        self,
+        session: ort.InferenceSession,
+        run_inputs: Dict[str, np.ndarray],
+        attention_mask: np.ndarray,
+    ) -> np.ndarray:
+        """Run one batch and pool it, reusing the shared output buffer when free."""
+        batch_size, seq_len = attention_mask.shape
+        if batch_size <= self.OUTPUT_BUFFER_MAX_BATCH and self._out_lock.acquire(
+            blocking=False
+        ):
+            try:
+                hidden = self._hidden_size(session)
+                if hidden:
+                    # Flat storage, so every (batch, seq_len) gets a
+                    # contiguous view without reallocating
+                    shape = (batch_size, seq_len, hidden)
+                    size = batch_size * seq_len * hidden
+                    buffer = self._out_buf
+                    if buffer is None or buffer.size < size:
+                        buffer = np.empty(size, dtype=np.float32)
+                        self._out_buf = buffer
+                    output = buffer[:size].reshape(shape)
+                    binding = session.io_binding()
+                    for name, value in run_inputs.items():
+                        binding.bind_cpu_input(name, value)
+                    binding.bind_output(
+                        self._hidden_output,
+                        "cpu",
+                        0,
+                        np.float32,
+                        list(shape),
+                        output.ctypes.data,
+                    )
+                    session.run_with_iobinding(binding, self._run_options)
+                    # Pooling copies out of the buffer before it is released
+                    return self._pool_and_normalize(output, attention_mask)
+            finally:
+                self._out_lock.release()
+        (last_hidden_state,) = session.run(
+            [self._hidden_output], run_inputs, self._run_options
+        )
+        return self._pool_and_normalize(last_hidden_state, attention_mask)
+
+    def create_io_binding(self, batch_size: int) -> Optional[EmbeddingIOBinding]:
+        """Preallocate an output buffer bound to the session used for ``batch_size``.
 
-    def encode(self, texts: List[str]) -> Tuple[np.ndarray, Dict[str, any]]:
+        Returns None when the hidden size cannot be determined up front.
+        """
+        session, provider = self._select_optimal_provider(batch_size)
+        output_meta = session.get_outputs()[0]
+        hidden = self._hidden_size(session)
+        if not hidden:
+            return None
+        output = np.empty((batch_size, self.max_length, hidden), dtype=np.float32)
+        binding = session.io_binding()
+        return EmbeddingIOBinding(session, provider, binding, output_meta.name, output)
+
+    def _pool_and_normalize(
+        self, hidden: np.ndarray, attention_mask: np.ndarray
+    ) -> np.ndarray:
+        """Pool (batch, seq, hidden) states into L2-normalized (batch, hidden) rows."""
+        if self.pooling == "mean":
+            # Masked sum as one batched matmul: (batch, 1, seq) @ (batch, seq, hidden)
+            mask = attention_mask.astype(hidden.dtype)
+            pooled = (mask[:, None, :] @ hidden)[:, 0, :]
+            pooled /= np.maximum(mask.sum(axis=1, keepdims=True), 1.0)
+            pooled = pooled.astype(np.float32, copy=False)
+        else:
+            # CLS token: one contiguous float32 copy (hidden may be a bound
+            # output buffer, so it is never normalized in place)
+            pooled = np.array(hidden[:, 0, :], dtype=np.float32)
+        # Row-wise dot products in one einsum pass, then scale rows in place
+        norms = np.einsum("ij,ij->i", pooled, pooled)
+        np.sqrt(norms, out=norms)
+        norms[norms == 0] = 1.0
+        pooled /= norms[:, None]
+        return pooled
+
+    def encode(
+        self,
+        texts: List[str],
+        io_binding: Optional[EmbeddingIOBinding] = None,
+        force_provider: Optional[str] = None,
+    ) -> Tuple[np.ndarray, Dict[str, any]]:
         """
         Generate embeddings with automatic provider selection
 
         Args:
             texts: List of input texts
+            io_binding: Optional binding from ``create_io_binding``; used only
+                when its batch size matches ``len(texts)``
+            force_provider: "CPU-ARM64" or "Azure" to bypass automatic
+                selection (benchmarks/tests); raises ValueError if unavailable
 
         Returns:
             Tuple of (embeddings, performance_info)
@@ -262,48 +701,79 @@ class OptimizedEmbeddingEngine:
 
         start_time = time.time()
 
-        # Automatic provider selection based on batch size
-        session, provider = self._select_optimal_provider(len(texts))
+        if io_binding is not None and (
+            io_binding.output.shape[0] != len(texts)
+            or force_provider not in (None, io_binding.provider)
+        ):
+            io_binding = None
 
         # Tokenize batch (vectorized where possible)
         tokenize_start = time.time()
         batch_inputs = self._tokenize_batch(texts)
         tokenize_time = time.time() - tokenize_start
+        seq_len = batch_inputs["input_ids"].shape[1]
+
+        # Automatic provider selection based on batch size and padded length
+        if io_binding is not None:
+            session, provider = io_binding.session, io_binding.provider
+        else:
+            session, provider = self._select_optimal_provider(
+                len(texts), force_provider, seq_len
+            )
 
         # Prepare single run inputs
-        run_inputs = {
-            "input_ids": batch_inputs["input_ids"],
-            "attention_mask": batch_inputs["attention_mask"],
-            "token_type_ids": batch_inputs["token_type_ids"],
-        }
+        run_inputs = {name: batch_inputs[name] for name in self._input_names}
 
         inference_start = time.time()
-        embeddings = []
         try:
-            outputs = session.run(None, run_inputs)
-            # Assume outputs[0] shape: (batch, seq_len, hidden_size)
-            last_hidden_state = outputs[0]
-            cls_embeddings = last_hidden_state[:, 0, :]  # (batch, hidden)
-            # L2 normalize each row
-            norms = np.linalg.norm(cls_embeddings, axis=1, keepdims=True)
-            norms[norms == 0] = 1.0
-            embeddings = (cls_embeddings / norms).astype(np.float32)
+            if io_binding is not None:
+                binding = io_binding.binding
+                for name, value in run_inputs.items():
+                    binding.bind_cpu_input(name, value)
+                # Bind the (batch, seq_len, hidden) prefix of the caller's
+                # max_length-sized buffer
+                shape = (len(texts), seq_len, io_binding.output.shape[2])
+                output = io_binding.output.reshape(-1)[: np.prod(shape)].reshape(shape)
+                binding.bind_output(
+                    io_binding.output_name,
+                    "cpu",
+                    0,
+                    np.float32,
+                    list(shape),
+                    output.ctypes.data,
+                )
+                session.run_with_iobinding(binding, self._run_options)
+                embeddings = self._pool_and_normalize(
+                    output, batch_inputs["attention_mask"]
+                )
+            else:
+                # One run for the whole batch; output shape (batch, seq_len, hidden)
+                embeddings = self._run_pooled(
+                    session, run_inputs, batch_inputs["attention_mask"]
+                )
         except Exception as e:
             logger.error(f"Batch inference failed ({e}); falling back to per-text loop")
-            # Fallback to legacy per-text loop (rare path)
+            # Fallback to legacy per-text loop (rare path); rows are stacked
+            # here, the batch path already returns one (batch, hidden) array
+            embeddings = []
             for i in range(len(texts)):
                 single_inputs = {k: v[i : i + 1] for k, v in run_inputs.items()}
                 try:
-                    out = session.run(None, single_inputs)
-                    cls = out[0][0, 0, :]
-                    cls = cls / np.linalg.norm(cls)
-                    embeddings.append(cls.astype(np.float32))
+                    out = session.run(
+                        [self._hidden_output], single_inputs, self._run_options
+                    )
+                    embeddings.append(
+                        self._pool_and_normalize(
+                            out[0], batch_inputs["attention_mask"][i : i + 1]
+                        )[0]
+                    )
                 except Exception:
                     fallback = np.random.normal(0, 0.1, 384).astype(np.float32)
                     embeddings.append(fallback / np.linalg.norm(fallback))
             embeddings = np.vstack(embeddings)
 
         inference_time = time.time() - inference_start
+        self._record_latency(len(texts), seq_len, provider, inference_time * 1000)
         total_time = time.time() - start_time
 
         # Token statistics
@@ -324,6 +794,7 @@ class OptimizedEmbeddingEngine:
         performance_info = {
             "provider": provider,
             "batch_size": len(texts),
+            "seq_len": seq_len,
             "total_time_ms": total_time * 1000,
             "inference_time_ms": inference_time * 1000,
             "tokenize_time_ms": tokenize_time * 1000,
@@ -342,13 +813,14 @@ class OptimizedEmbeddingEngine:
             "tokenizer_version": _transformers_version,
         }
 
-        logger.debug(
-            f"Generated {len(embeddings)} embeddings using {provider} "
-            f"in {total_time*1000:.1f}ms"
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Generated {len(embeddings)} embeddings using {provider} "
+                f"in {total_time*1000:.1f}ms"
+            )
 
         self._last_perf = performance_info
-        return np.array(embeddings), performance_info
+        return embeddings, performance_info
 
     def last_performance(self) -> Optional[Dict[str, Any]]:
         return self._last_perf
@@ -374,6 +846,16 @@ class OptimizedEmbeddingEngine:
                 "arm64_simd": True,
                 "multi_threading": True,
                 "graph_optimization": "enabled",
+                "pooling": self.pooling,
+                "cpu_weights": "int8" if self.quantized else "fp32",
+                "cpu_mem_arena": (
+                    ("shared" if _env_arena_registered else "session")
+                    if self.cpu_mem_arena
+                    else "disabled"
+                ),
+                "thread_pool": (
+                    "global" if global_thread_pool_sizes() is not None else "session"
+                ),
                 "wsl_optimized": True,
             },
             "performance_rules": {
@@ -381,7 +863,11 @@ class OptimizedEmbeddingEngine:
                 "large_batch_provider": (
                     f"Azure (4+ texts)" if self.session_npu else "CPU-ARM64"
                 ),
-                "selection_logic": "automatic based on batch size and WSL optimization",
+                "selection_logic": (
+                    "batch-size rule, then per-bucket latency calibration"
+                    if self.session_npu
+                    else "automatic based on batch size and WSL optimization"
+                ),
             },
         }
 
@@ -390,7 +876,11 @@ class OptimizedEmbeddingEngine:
         return {
             "status": "healthy",
             "cpu_session": "available" if self.session_cpu else "unavailable",
-            "npu_session": "available" if self.session_npu else "unavailable",
+            "npu_session": (
+                "available"
+                if self.session_npu
+                else "unavailable" if self._npu_checked else "not_loaded"
+            ),
             "vocab_loaded": bool(self.vocab),
             "config_loaded": bool(self.config),
         }
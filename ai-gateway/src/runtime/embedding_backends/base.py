@@ -9,7 +9,7 @@ adoption without large refactors while enabling test doubles.
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, List, Protocol, Sequence
+from typing import Any, Dict, Protocol, Sequence
 
 
 @dataclass
@@ -17,11 +17,12 @@ class EmbeddingResult:
     """Result of an embedding batch.
 
     Attributes:
-        vectors: 2D list (batch, dim) of float embeddings (L2 normalized recommended).
+        vectors: 2D (batch, dim) float embeddings (L2 normalized recommended); a
+                 list of lists or a contiguous float32 ``np.ndarray`` (ONNX backend).
         perf:   Performance / diagnostic metrics (timings, tokens, provider, cache stats).
     """
 
-    vectors: List[List[float]]
+    vectors: Any
     perf: Dict[str, Any]
 
 
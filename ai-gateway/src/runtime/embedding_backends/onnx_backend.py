@@ -10,7 +10,9 @@ import time
 from collections import OrderedDict
 from typing import Dict, List, Sequence, Tuple
 
-from embedding_engine import OptimizedEmbeddingEngine
+import numpy as np
+
+from embedding_engine import EmbeddingIOBinding, OptimizedEmbeddingEngine
 from runtime.embedding_backends.base import EmbeddingResult
 
 
@@ -23,20 +25,29 @@ class OnnxEmbeddingBackend:
         model_path: str,
         dimension: int | None = None,
         cache_size: int | None = 0,
+        intra_op_threads: int | None = None,
+        inter_op_threads: int | None = None,
     ):
         self.id = model_id
         self.model_path = model_path
         self.dimension = dimension or 384
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
         self._engine: OptimizedEmbeddingEngine | None = None
         self._cache_size = cache_size or 0
-        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
         self._last_perf: Dict[str, any] | None = None
 
     def load(self) -> None:
         if not self._engine:
-            self._engine = OptimizedEmbeddingEngine(self.model_path, model_id=self.id)
-
-    def _cache_get(self, key: str) -> List[float] | None:
+            self._engine = OptimizedEmbeddingEngine(
+                self.model_path,
+                model_id=self.id,
+                intra_op_threads=self.intra_op_threads,
+                inter_op_threads=self.inter_op_threads,
+            )
+
+    def _cache_get(self, key: str) -> np.ndarray | None:
         if self._cache_size <= 0:
             return None
         vec = self._cache.get(key)
@@ -45,7 +56,7 @@ class OnnxEmbeddingBackend:
             self._cache.move_to_end(key)
         return vec
 
-    def _cache_put(self, key: str, vec: List[float]):
+    def _cache_put(self, key: str, vec: np.ndarray):
         if self._cache_size <= 0:
             return
         self._cache[key] = vec
@@ -53,11 +64,19 @@ class OnnxEmbeddingBackend:
         if len(self._cache) > self._cache_size:
             self._cache.popitem(last=False)
 
-    def embed(self, texts: Sequence[str]) -> EmbeddingResult:
+    def create_io_binding(self, batch_size: int) -> EmbeddingIOBinding | None:
+        """Preallocate engine buffers for repeated calls at ``batch_size``."""
+        if not self._engine:
+            raise RuntimeError("Backend not loaded")
+        return self._engine.create_io_binding(batch_size)
+
+    def embed(
+        self, texts: Sequence[str], io_binding: EmbeddingIOBinding | None = None
+    ) -> EmbeddingResult:
         if not self._engine:
             raise RuntimeError("Backend not loaded")
         texts_list = list(texts)
-        cache_hits: List[Tuple[int, List[float]]] = []
+        cache_hits: List[Tuple[int, np.ndarray]] = []
         misses: List[Tuple[int, str]] = []
         for idx, t in enumerate(texts_list):
             c = self._cache_get(t)
@@ -66,29 +85,32 @@ class OnnxEmbeddingBackend:
             else:
                 misses.append((idx, t))
 
-        miss_vectors: Dict[int, List[float]] = {}
         encode_time_ms = 0.0
+        miss_embs: np.ndarray | None = None
         if misses:
             miss_texts = [m[1] for m in misses]
             start = time.perf_counter()
-            embs, perf = self._engine.encode(miss_texts)
+            miss_embs, perf = self._engine.encode(miss_texts, io_binding=io_binding)
             encode_time_ms = (time.perf_counter() - start) * 1000
-            for i, (orig_index, _t) in enumerate(misses):
-                vec_list = embs[i].tolist()
-                miss_vectors[orig_index] = vec_list
-                self._cache_put(_t, vec_list)
+            for i, (_orig_index, _t) in enumerate(misses):
+                # copy so cached rows don't pin the whole batch array
+                self._cache_put(_t, miss_embs[i].copy())
         else:
             perf = self._engine.last_performance() or {}
 
-        ordered: List[List[float]] = []
-        for i in range(len(texts_list)):
-            # prefer miss vector then hit
-            if i in miss_vectors:
-                ordered.append(miss_vectors[i])
+        # Contiguous (batch, dim) float32 result; no per-element Python floats
+        if not cache_hits and miss_embs is not None:
+            ordered = np.ascontiguousarray(miss_embs, dtype=np.float32)
+        else:
+            if miss_embs is not None:
+                dim = miss_embs.shape[1]
             else:
-                # must exist as hit
-                vec = [v for idx, v in cache_hits if idx == i][0]
-                ordered.append(vec)
+                dim = cache_hits[0][1].size if cache_hits else self.dimension
+            ordered = np.empty((len(texts_list), dim), dtype=np.float32)
+            for idx, vec in cache_hits:
+                ordered[idx] = vec
+            if miss_embs is not None:
+                ordered[[orig_index for orig_index, _t in misses]] = miss_embs
 
         total = len(texts_list) or 1
         hit_count = len(cache_hits)
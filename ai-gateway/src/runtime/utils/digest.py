@@ -4,12 +4,16 @@ Policy:
 - Round float values to 6 decimals for stability across minor numeric noise.
 - Serialize as UTF-8 joined strings (faster + human-inspectable) OR raw bytes if needed later.
 - Hash with SHA256; expose short (32 hex chars) and full variants.
+- ``digest_array`` is a faster full-vector variant for ndarrays: values are
+  rounded the same way, then the contiguous float32 bytes are hashed with
+  BLAKE2b (no string formatting). Its digests are NOT comparable with
+  ``digest_vectors`` output.
 """
 
 from __future__ import annotations
 
-from hashlib import sha256
-from typing import Iterable, List, Sequence
+from hashlib import blake2b, sha256
+from typing import Any, Iterable, List, Sequence
 
 Precision = 6  # decimal places
 
@@ -24,10 +28,16 @@ def digest_vectors(
     """Return deterministic hash of sequence of embedding vectors.
 
     Args:
-        vectors: sequence of numeric sequences.
+        vectors: sequence of numeric sequences, or a 2D ``np.ndarray``.
         short: if True, return first 32 hex chars.
         head_dims: if provided, only include first N dims of each vector (used for quick signature).
     """
+    if getattr(vectors, "ndim", None) == 2:
+        # ndarray: slice the head columns first so only those become Python
+        # floats (tolist yields the same values a per-row tolist would)
+        if head_dims is not None:
+            vectors = vectors[:, :head_dims]
+        vectors = vectors.tolist()
     parts: List[str] = []
     for vec in vectors:
         if head_dims is not None:
@@ -41,6 +51,27 @@ def digest_vectors(
     return h[:32] if short else h
 
 
+def digest_array(arr: Any, short: bool = True, head_dims: int | None = None) -> str:
+    """Return a BLAKE2b digest of a 2D ``np.ndarray`` of embeddings.
+
+    Args:
+        arr: (batch, dim) array-like; converted to contiguous float32.
+        short: if True, return 32 hex chars (16-byte digest), else 64.
+        head_dims: if provided, only include first N dims of each vector.
+    """
+    import numpy as np
+
+    values = np.asarray(arr)
+    if head_dims is not None:
+        values = values[:, :head_dims]
+    rounded = np.ascontiguousarray(
+        np.round(values.astype(np.float64), Precision), dtype=np.float32
+    )
+    rounded += 0.0  # normalize -0.0 so sign noise around zero is ignored
+    h = blake2b(memoryview(rounded).cast("B"), digest_size=16 if short else 32)
+    return h.hexdigest()
+
+
 def compare_digest(
     vectors_a: Iterable[Sequence[float]],
     vectors_b: Iterable[Sequence[float]],
@@ -63,4 +94,4 @@ def compare_digest(
     return True
 
 
-__all__ = ["digest_vectors", "compare_digest"]
+__all__ = ["digest_vectors", "digest_array", "compare_digest"]
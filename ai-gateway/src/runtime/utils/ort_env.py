@@ -0,0 +1,97 @@
+"""Process-wide ONNX Runtime threading setup.
+
+ORT creates one environment per process, on the first session or allocator
+registration, and its global thread pools can only be sized before that.
+Once they exist, every session in the process must opt out of per-session
+threads, so the choice is made once here (from ``GATEWAY_ORT_GLOBAL_THREADS``)
+and applied to every session the gateway creates via ``apply_thread_options``.
+
+``GATEWAY_ORT_GLOBAL_THREADS``:
+- unset / ``0``: each session keeps its own intra-op pool (default).
+- ``1`` / ``auto``: one shared intra-op pool with a thread per physical core.
+- ``<intra>[,<inter>]``: explicit global pool sizes.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Optional, Tuple
+
+import onnxruntime as ort
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_THREADS_ENV = "GATEWAY_ORT_GLOBAL_THREADS"
+
+_lock = threading.Lock()
+_initialized = False
+_global_pool_sizes: Optional[Tuple[int, int]] = None
+
+
+def physical_cores() -> int:
+    """Physical core count, falling back to half the logical CPUs."""
+    try:
+        import psutil
+
+        cores = psutil.cpu_count(logical=False)
+    except Exception:
+        cores = None
+    return cores or max(1, (os.cpu_count() or 2) // 2)
+
+
+def _parse_pool_sizes(value: str) -> Optional[Tuple[int, int]]:
+    value = value.strip().lower()
+    if value in ("", "0", "false", "off", "no"):
+        return None
+    if value in ("1", "true", "on", "yes", "auto"):
+        return physical_cores(), 1
+    intra, _, inter = value.partition(",")
+    return max(1, int(intra)), max(1, int(inter or 1))
+
+
+def init_environment() -> None:
+    """Size ORT's global thread pools if configured; call before any session.
+
+    Idempotent. Every code path that creates an ORT session or registers an
+    environment allocator goes through here first, so the pools are set
+    before ORT's environment exists.
+    """
+    global _initialized, _global_pool_sizes
+    with _lock:
+        if _initialized:
+            return
+        _initialized = True
+        raw = os.getenv(GLOBAL_THREADS_ENV, "")
+        try:
+            sizes = _parse_pool_sizes(raw)
+        except ValueError:
+            logger.warning("Ignoring invalid %s=%r", GLOBAL_THREADS_ENV, raw)
+            return
+        if sizes is None:
+            return
+        try:
+            ort.set_global_thread_pool_sizes(*sizes)
+        except Exception as exc:
+            logger.warning("Global ORT thread pools unavailable: %s", exc)
+            return
+        _global_pool_sizes = sizes
+        logger.info("Using global ORT thread pools (intra=%d, inter=%d)", *sizes)
+
+
+def global_thread_pool_sizes() -> Optional[Tuple[int, int]]:
+    """(intra, inter) sizes of the global pools, or None for per-session pools."""
+    init_environment()
+    return _global_pool_sizes
+
+
+def apply_thread_options(
+    opts: ort.SessionOptions, intra_op_threads: int
+) -> ort.SessionOptions:
+    """Point ``opts`` at the global pools, or give it its own intra-op pool."""
+    if global_thread_pool_sizes() is not None:
+        opts.use_per_session_threads = False
+    else:
+        opts.intra_op_num_threads = intra_op_threads
+    return opts
@@ -0,0 +1,117 @@
+"""Opt-in cache of ONNX Runtime's optimized model graphs.
+
+Loading a model makes ORT fuse and fold its graph again on every start. With
+``GATEWAY_ORT_GRAPH_CACHE_DIR`` set, the optimized graph is written to that
+directory on first load and reused afterwards. Nothing is written next to
+the models, and nothing is cached when the variable is unset.
+
+Policy:
+- Graphs are saved at ``ORT_ENABLE_EXTENDED``: fusions only, without the
+  layout transforms that ORT warns are specific to the hardware. Those run
+  on load, as for an uncached model.
+- The file name hashes the source model (path, size, mtime), the ORT version
+  and a host/CPU fingerprint. An ORT upgrade, a changed model or a different
+  machine sharing the directory never picks up a stale graph.
+- Initializers over 1 KiB go to a ``.data`` side file (protobuf caps a model
+  at 2 GB).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import platform
+import socket
+from functools import lru_cache
+from typing import Any, Callable, List, Optional
+
+import onnxruntime as ort
+
+logger = logging.getLogger(__name__)
+
+GRAPH_CACHE_ENV = "GATEWAY_ORT_GRAPH_CACHE_DIR"
+
+_CPUINFO_KEYS = ("vendor_id", "model name", "flags", "CPU implementer", "CPU part")
+
+
+@lru_cache(maxsize=1)
+def host_fingerprint() -> str:
+    """Machine, hostname and CPU model/feature flags, hashed."""
+    parts = [platform.machine(), platform.processor(), socket.gethostname()]
+    try:
+        with open("/proc/cpuinfo") as f:
+            seen = set()
+            for line in f:
+                key = line.split(":", 1)[0].strip()
+                if key in _CPUINFO_KEYS and key not in seen:
+                    seen.add(key)
+                    parts.append(line.strip())
+    except OSError:
+        pass
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:16]
+
+
+def cached_graph_path(model_file: str) -> Optional[str]:
+    """Cache file for ``model_file``'s optimized graph, or None when disabled."""
+    cache_dir = os.getenv(GRAPH_CACHE_ENV)
+    if not cache_dir:
+        return None
+    stat = os.stat(model_file)
+    key = "\n".join(
+        (
+            os.path.abspath(model_file),
+            str(stat.st_size),
+            str(stat.st_mtime_ns),
+            ort.__version__,
+            host_fingerprint(),
+        )
+    )
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(model_file))[0]
+    return os.path.join(cache_dir, f"{stem}.{digest}.optimized.onnx")
+
+
+def create_session(
+    model_file: str,
+    options: Callable[[], ort.SessionOptions],
+    providers: List[Any],
+) -> ort.InferenceSession:
+    """InferenceSession for ``model_file``, through the graph cache when enabled.
+
+    ``options`` builds fresh session options on each call; a cached graph
+    that fails to load, or a cache directory that cannot be written, falls
+    back to a plain session.
+    """
+    cached_file = cached_graph_path(model_file)
+    if cached_file is None:
+        return ort.InferenceSession(
+            model_file, sess_options=options(), providers=providers
+        )
+
+    if os.path.exists(cached_file):
+        try:
+            return ort.InferenceSession(
+                cached_file, sess_options=options(), providers=providers
+            )
+        except Exception as exc:
+            logger.warning("Ignoring unusable optimized graph %s: %s", cached_file, exc)
+
+    opts = options()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    opts.optimized_model_filepath = cached_file
+    opts.add_session_config_entry(
+        "session.optimized_model_external_initializers_file_name",
+        os.path.basename(cached_file) + ".data",
+    )
+    opts.add_session_config_entry(
+        "session.optimized_model_external_initializers_min_size_in_bytes", "1024"
+    )
+    try:
+        os.makedirs(os.path.dirname(cached_file), exist_ok=True)
+        return ort.InferenceSession(model_file, sess_options=opts, providers=providers)
+    except Exception as exc:
+        logger.warning("Could not cache optimized graph for %s: %s", model_file, exc)
+        return ort.InferenceSession(
+            model_file, sess_options=options(), providers=providers
+        )
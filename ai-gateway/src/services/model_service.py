@@ -9,6 +9,8 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
+from core.router_types import type_key
+
 logger = logging.getLogger(__name__)
 
 
@@ -68,6 +70,7 @@ class ModelService:
             model_path: Path to model files
             model_type: Type of model (embeddings, chat, etc.)
         """
+        model_type = type_key(model_type)
         async with self._initialization_lock:
             try:
                 if model_id in self.loaded_models:
@@ -179,10 +182,11 @@ class ModelService:
 
     def get_default_model_id(self, model_type: str) -> Optional[str]:
         """Return the default model id for a given type if available."""
-        return self.default_models.get(model_type)
+        return self.default_models.get(type_key(model_type))
 
     def list_models_by_type(self, model_type: str) -> List[str]:
         """Return all models matching the supplied type."""
+        model_type = type_key(model_type)
         return [
             model_id
             for model_id, info in self.model_info.items()
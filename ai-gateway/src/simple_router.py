@@ -13,6 +13,8 @@ from typing import Any, Dict, List, Optional
 import numpy as np
 import onnxruntime as ort
 
+from runtime.utils.ort_env import apply_thread_options
+
 logger = logging.getLogger(__name__)
 
 
@@ -59,7 +61,11 @@ class ChatModel:
 
             # Try DirectML first, then fallback to CPU
             providers = ["DmlExecutionProvider", "CPUExecutionProvider"]
-            self.session = ort.InferenceSession(model_file, providers=providers)
+            # 0 = ORT's default pool size, unless the global pools are in use
+            opts = apply_thread_options(ort.SessionOptions(), 0)
+            self.session = ort.InferenceSession(
+                model_file, sess_options=opts, providers=providers
+            )
 
             actual_providers = self.session.get_providers()
             logger.info(f"Loaded Phi-3 Mini with providers: {actual_providers}")
@@ -0,0 +1,49 @@
+import pytest
+
+from benchmarks.tokenizer_benchmark import (
+    heuristic_tokenize,
+    percentile,
+    percentiles,
+    time_mode,
+)
+
+
+def test_percentiles_match_linear_interpolation():
+    data = [5.0, 1.0, 4.0, 2.0, 3.0]
+    p50, p95 = percentiles(data, (50, 95))
+    assert p50 == pytest.approx(3.0)
+    # (n - 1) * 0.95 = 3.8 -> 4 + 0.8 * (5 - 4)
+    assert p95 == pytest.approx(4.8)
+    assert percentile(data, 95) == pytest.approx(p95)
+
+
+def test_percentiles_empty_input():
+    assert percentiles([], (50, 95)) == [0.0, 0.0]
+    assert percentile([], 50) == 0.0
+
+
+def test_time_mode_timing_styles_agree_on_token_counts():
+    texts = ("alpha beta", "gamma", "delta epsilon zeta")
+    per_text = time_mode("p", texts, heuristic_tokenize)
+    bulk = time_mode("b", texts, heuristic_tokenize, timing="bulk")
+    batch = time_mode(
+        "x", texts, lambda batch: [s.split() for s in batch], timing="batch"
+    )
+    for result in (per_text, bulk, batch):
+        assert result["total_tokens"] == 6
+        assert result["total_chars"] == sum(len(t) for t in texts)
+    assert per_text["p50_ms_per_text"] is not None
+    assert bulk["p50_ms_per_text"] is None and batch["timing"] == "batch"
+
+
+def test_time_mode_discards_warmup_passes():
+    calls = []
+
+    def tokenize(text):
+        calls.append(text)
+        return text.split()
+
+    result = time_mode("p", ("a b", "c"), tokenize, runs=3, discard=1)
+    assert len(calls) == 6
+    assert result["runs"] == 2
+    assert result["total_tokens"] == 3
@@ -0,0 +1,22 @@
+import numpy as np
+
+from runtime.utils.digest import digest_array, digest_vectors
+
+
+def test_digest_ndarray_matches_list_input():
+    rng = np.random.default_rng(7)
+    arr = rng.standard_normal((3, 32)).astype(np.float32)
+    as_lists = [row.tolist() for row in arr]
+    assert digest_vectors(arr, head_dims=8) == digest_vectors(as_lists, head_dims=8)
+    assert digest_vectors(arr) == digest_vectors(as_lists)
+
+
+def test_digest_array_stable_and_change_sensitive():
+    rng = np.random.default_rng(11)
+    arr = rng.standard_normal((4, 16)).astype(np.float32)
+    assert digest_array(arr) == digest_array(arr.copy())
+    assert len(digest_array(arr)) == 32 and len(digest_array(arr, short=False)) == 64
+    assert digest_array(arr, head_dims=4) == digest_array(arr[:, :4])
+    changed = arr.copy()
+    changed[0, 0] += 0.01
+    assert digest_array(changed) != digest_array(arr)
@@ -0,0 +1,91 @@
+import pytest
+
+docx = pytest.importorskip("docx")
+
+from docx.enum.text import WD_BREAK, WD_UNDERLINE  # noqa: E402
+
+from converters.docx_converter import DOCXConverter, _paragraph_text  # noqa: E402
+
+
+@pytest.fixture
+def sample_docx(tmp_path):
+    doc = docx.Document()
+    doc.core_properties.title = "Sample"
+    doc.add_heading("Quarterly report", level=1)
+    para = doc.add_paragraph("Plain ")
+    para.add_run("bold").bold = True
+    para.add_run(" italic").italic = True
+    para.add_run(" under").underline = True
+    para.add_run(" none").underline = WD_UNDERLINE.NONE
+    para.add_run(" off").bold = False
+    para.add_run(" again").bold = True
+    doc.add_paragraph("")
+    doc.add_paragraph()
+    brk = doc.add_paragraph("line one")
+    brk.add_run().add_break(WD_BREAK.LINE)
+    brk.add_run("line two\tafter tab")
+    doc.add_paragraph("Quoted", style="Quote")
+    doc.add_paragraph().add_run("").bold = True
+
+    table = doc.add_table(rows=3, cols=3)
+    for r, row in enumerate(table.rows):
+        for c, cell in enumerate(row.cells):
+            cell.text = f"r{r}c{c}"
+    table.cell(0, 0).merge(table.cell(0, 1))
+    table.cell(1, 2).merge(table.cell(2, 2))
+    table.cell(2, 0).text = ""
+    table.cell(2, 1).text = ""
+
+    path = tmp_path / "sample.docx"
+    doc.save(path)
+    return path
+
+
+def test_xpath_extraction_matches_python_docx(sample_docx):
+    fast = DOCXConverter().extract_text(sample_docx)
+    reference = DOCXConverter(use_xpath=False).extract_text(sample_docx)
+    assert fast["status"] == reference["status"] == "success"
+    assert fast["paragraphs"] == reference["paragraphs"]
+    assert fast["tables"] == reference["tables"]
+    assert fast["full_text"] == reference["full_text"]
+    assert fast["metadata"]["title"] == "Sample"
+
+
+def test_xpath_extraction_details(sample_docx):
+    result = DOCXConverter().extract_text(sample_docx)
+    paragraphs = result["paragraphs"]
+    assert paragraphs[0]["style"] == "Heading 1"
+    assert paragraphs[1]["formatting"] == ["bold", "italic", "underline"]
+    # Unformatted and empty paragraphs carry no formatting key
+    assert "formatting" not in paragraphs[0]
+    assert "formatting" not in paragraphs[-1]
+    assert "line one\nline two\tafter tab" == paragraphs[4]["text"]
+    table = result["tables"][0]
+    assert table["rows"] == 3 and table["columns"] == 3
+    # Horizontal span repeats the merged cell; vertical merge inherits it
+    assert table["text"].startswith("r0c0\nr0c1 | r0c0\nr0c1 | r0c2\n")
+    assert table["text"].endswith(" |  | r1c2\nr2c2")
+
+
+def test_dataframe_built_only_for_analysis(sample_docx):
+    converter = DOCXConverter()
+    assert converter.extract_text(sample_docx)["elements_dataframe"] is None
+    analysed = converter.analyze_structure(sample_docx)
+    df = analysed["elements_dataframe"]
+    assert df.height == len(analysed["all_elements"])
+    assert analysed["structure_analysis"]["content_distribution"]["tables"] == 1
+
+
+def test_paragraph_text_without_ct_p_text():
+    doc = docx.Document()
+    para = doc.add_paragraph("page")
+    para.add_run().add_break(WD_BREAK.PAGE)
+    para.add_run("next").add_break(WD_BREAK.LINE)
+    run = para.add_run("tab\tend")
+    run._r.append(run._r.makeelement(docx.oxml.ns.qn("w:noBreakHyphen"), {}))
+    link = para._p.makeelement(docx.oxml.ns.qn("w:hyperlink"), {})
+    link.append(para.add_run(" linked")._r)
+    para._p.append(link)
+    assert _paragraph_text(para._p) == "pagenext\ntab\tend- linked"
+    if isinstance(vars(type(para._p)).get("text"), property):  # python-docx >= 1.0
+        assert _paragraph_text(para._p) == para._p.text
@@ -0,0 +1,166 @@
+import asyncio
+
+from tokenizers import Tokenizer, models, pre_tokenizers, processors
+
+from chat.gemma_model import GemmaChatModel
+
+
+def make_model():
+    words = "<|system|> <|user|> <|assistant|> <|end|> you are terse hi there how now"
+    vocab = {"[UNK]": 0, "<bos>": 1}
+    for token in words.split() + ["<", "|", ">", "system", "user", "assistant"]:
+        vocab.setdefault(token, len(vocab))
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="<bos> $A", special_tokens=[("<bos>", 1)]
+    )
+    model = GemmaChatModel("gemma-3n-4b", "unused")
+    model.tokenizer = tokenizer
+    return model
+
+
+def encode(model, messages):
+    return asyncio.run(model._encode_prompt(messages))
+
+
+def full_encoding(model, messages):
+    return model.tokenizer.encode(model._build_prompt_from_messages(messages)).ids
+
+
+def count_encodes(model):
+    calls = []
+    encode_text = model._encode
+
+    async def counting(text, add_special_tokens=True):
+        calls.append(text)
+        return await encode_text(text, add_special_tokens)
+
+    model._encode = counting
+    return calls
+
+
+def test_prefix_cache_matches_full_encoding():
+    model = make_model()
+    history = [{"role": "system", "content": "you are terse"}]
+    first = history + [{"role": "user", "content": "hi there"}]
+    second = history + [{"role": "user", "content": "how now"}]
+    third = second + [
+        {"role": "assistant", "content": "hi"},
+        {"role": "user", "content": "there"},
+    ]
+
+    for messages in (first, second, third):
+        assert encode(model, messages) == full_encoding(model, messages)
+    assert len(model._prefix_cache) == 1
+    cached = next(iter(model._prefix_cache.values()))
+    assert cached is not None and cached[0] == 1  # keeps the BOS token
+
+
+def test_cold_miss_encodes_once():
+    model = make_model()
+    calls = count_encodes(model)
+    history = [{"role": "system", "content": "you are terse"}]
+    turn = [{"role": "user", "content": "hi there"}]
+
+    encode(model, history + turn)
+    assert len(calls) == 1
+    encode(model, history + turn)  # second sight verifies the split
+    calls.clear()
+    # A later turn of the conversation hits: only the non-system part
+    encode(
+        model,
+        history + turn + [{"role": "assistant", "content": "how"}] + turn,
+    )
+    assert len(calls) == 1 and not calls[0].startswith("<|system|>")
+    calls.clear()
+    encode(model, turn)  # no system prompt: nothing to cache
+    assert len(calls) == 1
+
+
+def test_prefix_cache_is_bounded():
+    model = make_model()
+    model.PREFIX_CACHE_SIZE = 2
+    for content in ("hi", "there", "how"):
+        messages = [
+            {"role": "system", "content": content},
+            {"role": "user", "content": "now"},
+        ]
+        assert encode(model, messages) == full_encoding(model, messages)
+    assert len(model._prefix_cache) == 2
+
+
+class CountingTokenizer:
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.batch_sizes = []
+
+    def encode(self, *args, **kwargs):
+        raise AssertionError("expected batched encoding")
+
+    def encode_batch(self, texts, add_special_tokens=True):
+        self.batch_sizes.append(len(texts))
+        return self.tokenizer.encode_batch(texts, add_special_tokens=add_special_tokens)
+
+
+def test_concurrent_prompts_are_encoded_in_one_batch():
+    model = make_model()
+    tokenizer = model.tokenizer
+    model.tokenizer = CountingTokenizer(tokenizer)
+    prompts = [[{"role": "user", "content": text}] for text in ("hi", "how now")]
+
+    async def run():
+        model._start_encode_batcher()
+        try:
+            return await asyncio.gather(*(model._encode_prompt(m) for m in prompts))
+        finally:
+            model._encode_task.cancel()
+
+    results = asyncio.run(run())
+    assert model.tokenizer.batch_sizes == [2]
+    for messages, ids in zip(prompts, results):
+        expected = tokenizer.encode(model._build_prompt_from_messages(messages)).ids
+        assert ids == expected
+
+
+def test_encode_falls_back_when_batcher_is_on_another_loop():
+    model = make_model()
+
+    async def start():
+        model._start_encode_batcher()
+
+    asyncio.run(start())  # the batcher's loop closes with this run
+    messages = [{"role": "user", "content": "hi"}]
+    assert asyncio.run(
+        asyncio.wait_for(model._encode_prompt(messages), 1)
+    ) == full_encoding(model, messages)
+
+
+def test_lone_prompt_skips_the_batch_window():
+    model = make_model()
+    model.ENCODE_BATCH_WINDOW_S = 60
+    messages = [{"role": "user", "content": "hi"}]
+
+    async def run():
+        model._start_encode_batcher()
+        try:
+            return await asyncio.wait_for(model._encode_prompt(messages), 1)
+        finally:
+            model._stop_encode_batcher()
+
+    assert asyncio.run(run()) == full_encoding(model, messages)
+
+
+def test_unload_fails_pending_encodes():
+    model = make_model()
+
+    async def run():
+        model._start_encode_batcher()
+        await asyncio.sleep(0)  # collector is now waiting on the queue
+        future = asyncio.get_running_loop().create_future()
+        model._encode_queue.put_nowait(("hi", True, future))
+        await model.unload()
+        return await asyncio.gather(future, return_exceptions=True)
+
+    (result,) = asyncio.run(run())
+    assert isinstance(result, RuntimeError)
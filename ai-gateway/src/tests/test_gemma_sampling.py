@@ -0,0 +1,43 @@
+import numpy as np
+
+from chat.gemma_model import GemmaChatModel
+
+
+def make_model(seed=0):
+    model = GemmaChatModel("gemma-3n-4b", "unused")
+    model.rng = np.random.default_rng(seed)
+    return model
+
+
+def test_greedy_returns_argmax():
+    logits = np.array([[0.1, 3.0, -1.0, 2.5]], dtype=np.float32)
+    assert make_model()._select_next_token(logits, 0.0, 0.9) == 1
+
+
+def test_top_p_samples_only_from_nucleus():
+    rng = np.random.default_rng(42)
+    logits = (rng.standard_normal((1, 5000)) * 3).astype(np.float32)
+    probs = np.exp(logits[0] - logits[0].max())
+    probs /= probs.sum()
+    order = np.argsort(probs)[::-1]
+    nucleus = set(order[np.cumsum(probs[order]) <= 0.5].tolist())
+
+    model = make_model()
+    picks = {model._select_next_token(logits, 1.0, 0.5) for _ in range(500)}
+    assert picks <= nucleus
+    assert len(picks) > 1
+
+
+def test_top_p_keeps_at_least_one_token():
+    logits = np.array([[10.0, 0.0, 0.0]], dtype=np.float32)
+    assert make_model()._select_next_token(logits, 1.0, 0.01) == 0
+
+
+def test_full_softmax_sampling_follows_distribution():
+    logits = np.log(np.array([[0.1, 0.6, 0.3]], dtype=np.float32))
+    model = make_model(seed=3)
+    picks = np.bincount(
+        [model._select_next_token(logits, 1.0, 1.0) for _ in range(4000)],
+        minlength=3,
+    )
+    np.testing.assert_allclose(picks / picks.sum(), [0.1, 0.6, 0.3], atol=0.03)
@@ -0,0 +1,30 @@
+import pytest
+
+from chat.gemma_model import GemmaChatModel
+
+STOPS = ["</s>", "END", "\n\n", "Observation:"]
+
+
+def test_stop_truncates_at_earliest_match():
+    model = GemmaChatModel("gemma-3n-4b", "unused")
+    text = "answer END more </s>"
+    assert model._apply_stop_sequences(text, STOPS) == ("answer ", True)
+    assert model._apply_stop_sequences(text, STOPS, start=8) == (
+        "answer END more ",
+        True,
+    )
+    assert model._apply_stop_sequences("plain text", STOPS) == ("plain text", False)
+
+
+def test_automaton_matches_find_fallback():
+    pytest.importorskip("ahocorasick")
+    model = GemmaChatModel("gemma-3n-4b", "unused")
+    matcher = model._build_stop_matcher(STOPS)
+    assert matcher is not None
+    assert model._build_stop_matcher(STOPS[:2]) is None
+
+    text = "thought\n\nObservation: x END"
+    for start in range(len(text)):
+        assert model._apply_stop_sequences(
+            text, STOPS, start=start, matcher=matcher
+        ) == model._apply_stop_sequences(text, STOPS, start=start)
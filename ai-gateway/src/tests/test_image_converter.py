@@ -0,0 +1,240 @@
+import pytest
+
+pytest.importorskip("pytesseract")
+
+from converters.image_converter import (  # noqa: E402
+    ImageConverter,
+    _api_page_seg_mode,
+    _LazyOCRRows,
+    _load_for_ocr,
+    _ocr_frame,
+    _preprocess_for_ocr,
+    _read_ocr_tsv,
+)
+
+
+def tesseract_dict(words):
+    """image_to_data(output_type=DICT) shape: a block row plus one row per word"""
+    data = {
+        key: [0 if key != "text" else ""]
+        for key in (
+            "level page_num block_num par_num line_num word_num "
+            "left top width height conf text"
+        ).split()
+    }
+    data["conf"][0] = -1
+    for i, (text, left, top, conf) in enumerate(words):
+        for key, value in (
+            ("level", 5),
+            ("page_num", 1),
+            ("block_num", 1),
+            ("par_num", 1),
+            ("line_num", 1 + top // 40),
+            ("word_num", i + 1),
+            ("left", left),
+            ("top", top),
+            ("width", 8 * len(text)),
+            ("height", 12),
+            ("conf", conf),
+            ("text", text),
+        ):
+            data[key].append(value)
+    return data
+
+
+WORDS = [
+    ("Item", 10, 10, 95),
+    ("Units", 200, 10, 93),
+    ("Apples", 10, 50, 91),
+    ("12", 200, 50, 88),
+    ("Pears", 10, 90, 90),
+    ("7", 200, 90, 40),
+    ("noise", 400, 300, 0),
+]
+
+
+def test_ocr_frame_keeps_confident_words():
+    df = _ocr_frame(tesseract_dict(WORDS))
+    assert df.columns[:3] == ["text", "confidence", "left"]
+    assert df.get_column("text").to_list() == [w[0] for w in WORDS[:-1]]
+    assert df.get_column("confidence").min() == 40
+
+
+def test_tsv_parsing_matches_column_dict():
+    data = tesseract_dict(WORDS + [("", 500, 300, 70), ('"12', 600, 300, 60)])
+    lines = ["\t".join(data)]
+    lines += ["\t".join(str(v) for v in row) for row in zip(*data.values())]
+    frame = _ocr_frame(_read_ocr_tsv("\n".join(lines).encode()))
+    assert frame.equals(_ocr_frame(data))
+    assert frame.get_column("text").to_list()[-2:] == ["", '"12']
+
+
+def test_table_detection_accepts_frame_or_dicts():
+    converter = ImageConverter()
+    df = _ocr_frame(tesseract_dict(WORDS))
+    from_frame = converter.detect_and_format_tables(df)
+    from_dicts = converter.detect_and_format_tables(df.to_dicts())
+    assert from_frame == from_dicts
+    assert from_frame["table_count"] == 1
+    assert from_frame["processing_stats"]["confident_words"] == 5
+    assert converter.detect_and_format_tables([])["table_count"] == 0
+
+
+def test_only_psm_configs_use_the_in_process_api():
+    assert _api_page_seg_mode("") is None
+    assert _api_page_seg_mode("--psm 6") == 6
+    assert _api_page_seg_mode("--oem 1") == -1
+    assert _api_page_seg_mode("--psm 6 -c preserve_interword_spaces=1") == -1
+
+
+def test_batch_yields_one_result_per_image(tmp_path):
+    from PIL import Image
+
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"page{i}.png"
+        Image.new("L", (40, 20), 255).save(path)
+        paths.append(path)
+
+    converter = ImageConverter()
+    converter.ocr_enabled = True  # exercise the pool even without tesseract
+    results = dict(converter.extract_text_batch(paths, max_workers=2))
+    assert set(results) == set(paths)
+    assert all("status" in result for result in results.values())
+
+
+def test_quality_analysis_reuses_a_given_result():
+    converter = ImageConverter()
+    df = _ocr_frame(tesseract_dict(WORDS))
+    result = {"status": "success", "ocr_dataframe": df}
+    analysed = converter.analyze_ocr_quality(result=result)
+    stats = analysed["quality_analysis"]["confidence_statistics"]
+    assert stats["min_confidence"] == 40 and stats["high_confidence_words"] == 5
+    with pytest.raises(ValueError):
+        converter.analyze_ocr_quality()
+
+
+def test_preprocessing_upscales_and_binarizes():
+    from PIL import Image
+
+    image = Image.new("RGB", (150, 100), (210, 200, 190))
+    image.paste((40, 50, 60), (20, 20, 80, 60))
+    image.info["dpi"] = (150, 150)
+    processed = _preprocess_for_ocr(image)
+    assert processed.mode == "L" and processed.size == (300, 200)
+    assert processed.getextrema() == (0, 255)
+    assert processed.getpixel((100, 80)) == 0 and processed.getpixel((5, 5)) == 255
+
+
+def test_detailed_rows_are_built_on_first_read():
+    df = _ocr_frame(tesseract_dict(WORDS))
+    rows = _LazyOCRRows(df)
+    assert len(rows) == 6 and "_rows" not in vars(rows)
+    assert rows[0]["text"] == "Item" and rows == df.to_dicts()
+    converter = ImageConverter()
+    assert converter.detect_and_format_tables(rows)["table_count"] == 1
+
+
+def test_large_jpegs_decode_at_reduced_scale(tmp_path):
+    from PIL import Image
+
+    for size, expected in (((4400, 4400), (2200, 2200)), ((4400, 3000), None)):
+        path = tmp_path / f"{size[1]}.jpg"
+        Image.new("RGB", size, (200, 30, 30)).save(path)
+        with Image.open(path) as image:
+            _load_for_ocr(image)
+            assert image.mode == "L"
+            assert image.size == (expected or size)
+
+
+def test_blank_page_skips_the_detailed_pass(monkeypatch):
+    import pytesseract
+    from PIL import Image
+
+    calls = []
+    monkeypatch.setattr(pytesseract, "image_to_string", lambda *a, **k: " \n")
+    monkeypatch.setattr(
+        pytesseract, "image_to_data", lambda *a, **k: calls.append(a) or b""
+    )
+    converter = ImageConverter()
+    converter._api = None
+    ocr = converter._perform_ocr(Image.new("L", (40, 20), 255), "")
+    assert ocr["text"] == "" and ocr["confidence"] == 0
+    assert ocr["detailed_df"].is_empty() and calls == []
+
+
+def test_table_export_escapes_cells():
+    analysis = {"tables": [{"rows": [{"cells": ['a,"b"', "<x & y>"]}], "columns": []}]}
+    converter = ImageConverter()
+    assert '"a;b","<x & y>"' in converter.export_tables(analysis, "csv")
+    html = converter.export_tables(analysis, "html")
+    assert '    <td>a,"b"</td>' in html
+    assert "    <td>&lt;x &amp; y&gt;</td>" in html
+
+
+def test_json_table_export_round_trips():
+    import json
+
+    rows = [{"cells": ["Item", "Total"], "confidence": 91.5, "y_position": 10}]
+    analysis = {"tables": [{"rows": rows, "columns": [0, 80], "start_y": 10}]}
+    exported = ImageConverter().export_tables(analysis, "json")
+    table = json.loads(exported)
+    assert table["columns"] == 2 and table["position"]["end_y"] is None
+    assert table["data"][0]["cells"] == ["Item", "Total"]
+    assert exported.startswith('{\n  "table_id": 1,')
+
+
+def test_markdown_export_pads_without_touching_rows():
+    rows = [{"cells": ["a", "b", "c"]}, {"cells": ["d"]}]
+    analysis = {"tables": [{"rows": rows, "columns": []}]}
+    markdown = ImageConverter().export_tables(analysis, "markdown")
+    assert "| Col 1 | Col 2 | Col 3 |\n| --- | --- | --- |" in markdown
+    assert "| a | b | c |\n| d |  |  |" in markdown
+    assert rows[1]["cells"] == ["d"]
+
+
+def test_tesseract_probe_runs_once_per_process(monkeypatch):
+    import pytesseract
+
+    calls = []
+    monkeypatch.setattr(ImageConverter, "_tesseract_available", None)
+    monkeypatch.setattr(
+        pytesseract, "get_tesseract_version", lambda: calls.append(1) or "5.3"
+    )
+    assert ImageConverter._check_tesseract() and ImageConverter._check_tesseract()
+    ImageConverter()
+    assert len(calls) == 1
+
+
+def test_exif_metadata_matches_legacy_layout(tmp_path):
+    from PIL import ExifTags, Image
+
+    exif = Image.Exif()
+    exif[ExifTags.Base.Make] = "Acme"
+    exif.get_ifd(ExifTags.IFD.Exif)[ExifTags.Base.DateTimeOriginal] = "2024:01:02"
+    exif.get_ifd(ExifTags.IFD.GPSInfo)[ExifTags.GPS.GPSLatitudeRef] = "N"
+    path = tmp_path / "photo.jpg"
+    Image.new("RGB", (32, 32)).save(path, exif=exif)
+
+    with Image.open(path) as image:
+        metadata = ImageConverter()._extract_metadata(image, path)
+        assert metadata["exif_data"] == image._getexif()
+    assert metadata["exif_data"][ExifTags.Base.DateTimeOriginal] == "2024:01:02"
+    assert metadata["exif_data"][ExifTags.IFD.GPSInfo] == {1: "N"}
+
+
+def test_statistics_count_real_lines(tmp_path):
+    import polars as pl
+    from PIL import Image
+
+    path = tmp_path / "lines.png"
+    Image.new("L", (40, 20), 255).save(path)
+    converter = ImageConverter()
+    converter.ocr_enabled = True
+    converter._perform_ocr = lambda image, config: {
+        "text": "first line\nsecond  line\nthird",
+        "confidence": 90,
+        "detailed_df": pl.DataFrame(),
+    }
+    statistics = converter.extract_text(path)["statistics"]
+    assert statistics["line_count"] == 3 and statistics["word_count"] == 5
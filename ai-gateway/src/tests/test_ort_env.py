@@ -0,0 +1,30 @@
+import onnxruntime as ort
+import pytest
+
+from runtime.utils import ort_env
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("", None), ("0", None), ("off", None), ("3", (3, 1)), ("4,2", (4, 2))],
+)
+def test_parse_pool_sizes(value, expected):
+    assert ort_env._parse_pool_sizes(value) == expected
+
+
+def test_auto_pool_uses_physical_cores():
+    assert ort_env._parse_pool_sizes("auto") == (ort_env.physical_cores(), 1)
+
+
+def test_apply_thread_options_follows_the_process_pools(monkeypatch):
+    monkeypatch.setattr(ort_env, "_initialized", True)
+
+    monkeypatch.setattr(ort_env, "_global_pool_sizes", None)
+    opts = ort_env.apply_thread_options(ort.SessionOptions(), 3)
+    assert opts.intra_op_num_threads == 3
+    assert opts.use_per_session_threads
+
+    monkeypatch.setattr(ort_env, "_global_pool_sizes", (4, 1))
+    opts = ort_env.apply_thread_options(ort.SessionOptions(), 3)
+    assert not opts.use_per_session_threads
+    assert opts.intra_op_num_threads == 0  # left to the global pool
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import onnxruntime as ort
+import pytest
+
+from runtime.utils import ort_graph_cache
+
+onnx = pytest.importorskip("onnx")
+from onnx import TensorProto, helper, numpy_helper  # noqa: E402
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    weights = numpy_helper.from_array(np.ones(512, dtype=np.float32), "w")
+    graph = helper.make_graph(
+        [helper.make_node("Add", ["x", "w"], ["y"])],
+        "add",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, [512])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, [512])],
+        initializer=[weights],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    path = tmp_path / "models" / "model.onnx"
+    path.parent.mkdir()
+    onnx.save(model, path)
+    return str(path)
+
+
+def run(session):
+    return session.run(None, {"x": np.zeros(512, dtype=np.float32)})[0]
+
+
+def test_cache_is_off_by_default(model_file, monkeypatch):
+    monkeypatch.delenv(ort_graph_cache.GRAPH_CACHE_ENV, raising=False)
+    assert ort_graph_cache.cached_graph_path(model_file) is None
+    session = ort_graph_cache.create_session(
+        model_file, ort.SessionOptions, ["CPUExecutionProvider"]
+    )
+    assert run(session).sum() == 512
+    assert os.listdir(os.path.dirname(model_file)) == ["model.onnx"]
+
+
+def test_cached_graph_is_written_once_and_reused(model_file, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv(ort_graph_cache.GRAPH_CACHE_ENV, str(cache_dir))
+    cached = ort_graph_cache.cached_graph_path(model_file)
+    assert os.path.dirname(cached) == str(cache_dir)
+
+    first = ort_graph_cache.create_session(
+        model_file, ort.SessionOptions, ["CPUExecutionProvider"]
+    )
+    assert sorted(os.listdir(cache_dir)) == [
+        os.path.basename(cached),
+        os.path.basename(cached) + ".data",
+    ]
+    written = os.stat(cached).st_mtime_ns
+    again = ort_graph_cache.create_session(
+        model_file, ort.SessionOptions, ["CPUExecutionProvider"]
+    )
+    assert os.stat(cached).st_mtime_ns == written
+    assert np.array_equal(run(first), run(again))
+    assert os.listdir(os.path.dirname(model_file)) == ["model.onnx"]
+
+
+def test_cache_key_tracks_model_and_runtime(model_file, tmp_path, monkeypatch):
+    monkeypatch.setenv(ort_graph_cache.GRAPH_CACHE_ENV, str(tmp_path))
+    cached = ort_graph_cache.cached_graph_path(model_file)
+    monkeypatch.setattr(ort, "__version__", "0.0.0")
+    assert ort_graph_cache.cached_graph_path(model_file) != cached
+    monkeypatch.undo()
+
+    monkeypatch.setenv(ort_graph_cache.GRAPH_CACHE_ENV, str(tmp_path))
+    os.utime(model_file, ns=(0, 0))
+    assert ort_graph_cache.cached_graph_path(model_file) != cached
@@ -0,0 +1,153 @@
+import pytest
+
+pytest.importorskip("pypdf")
+pymupdf = pytest.importorskip("pymupdf")
+
+from converters.pdf_converter import PDFConverter  # noqa: E402
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    doc = pymupdf.open()
+    for i in range(10):
+        page = doc.new_page(width=612, height=792)
+        if i != 3:  # one blank page
+            page.insert_text((72, 72), f"Page {i + 1} body text")
+    path = tmp_path / "sample.pdf"
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_parallel_extraction_matches_serial(sample_pdf):
+    converter = PDFConverter(use_pymupdf=False)
+    serial = converter.extract_text(sample_pdf, parallel=False)
+    parallel = converter.extract_text(sample_pdf, max_workers=2)
+    assert parallel["status"] == serial["status"] == "success"
+    assert parallel["pages"] == serial["pages"]
+    assert parallel["full_text"] == serial["full_text"]
+    assert [p["page_number"] for p in parallel["pages"]] == list(range(1, 11))
+    assert parallel["statistics"]["empty_pages"] == 1
+    assert parallel["pages"][0]["dimensions"] == {"width": 612.0, "height": 792.0}
+
+
+def test_structure_analysis_counts_pages(sample_pdf):
+    result = PDFConverter().analyze_structure(sample_pdf)
+    distribution = result["structure_analysis"]["content_distribution"]
+    assert distribution["pages_with_content"] == 9
+    assert distribution["pages_without_content"] == 1
+    text_stats = result["structure_analysis"]["text_statistics"]
+    assert text_stats["min_chars_per_page"] == 0
+    assert text_stats["total_characters"] == result["statistics"]["total_characters"]
+
+
+def test_pymupdf_and_pypdf_backends_agree(sample_pdf):
+    fast = PDFConverter().extract_text(sample_pdf)
+    reference = PDFConverter(use_pymupdf=False).extract_text(sample_pdf)
+    assert fast["statistics"]["extraction_method"] == "pymupdf_with_polars"
+    assert reference["statistics"]["extraction_method"] == "pypdf_with_polars"
+    assert fast["pages"] == reference["pages"]
+    assert fast["metadata"].keys() == reference["metadata"].keys()
+
+
+def test_dataframe_built_only_for_analysis(sample_pdf):
+    converter = PDFConverter()
+    assert converter.extract_text(sample_pdf)["pages_dataframe"] is None
+    analysed = converter.analyze_structure(sample_pdf)
+    df = analysed["pages_dataframe"]
+    assert df.height == len(analysed["pages"]) == 10
+    assert df.get_column("has_text").sum() == 9
+
+
+@pytest.mark.parametrize("use_pymupdf", [True, False])
+def test_iter_pages_streams_extracted_pages(sample_pdf, use_pymupdf):
+    converter = PDFConverter(use_pymupdf=use_pymupdf)
+    pages = converter.iter_pages(sample_pdf)
+    assert next(pages)["text"] == "Page 1 body text"
+    expected = converter.extract_text(sample_pdf)["pages"]
+    assert [next(pages)] + list(pages) == expected[1:]
+    counts = list(converter.iter_pages(sample_pdf, include_text=False))
+    assert "text" not in counts[0] and counts[3]["has_text"] is False
+    assert sum(page["char_count"] for page in counts) == 9 * 16 + 1
+
+
+def test_structure_analysis_reuses_extraction(sample_pdf, monkeypatch):
+    converter = PDFConverter()
+    calls = []
+    extract_text = converter.extract_text
+    monkeypatch.setattr(
+        converter, "extract_text", lambda path: calls.append(path) or extract_text(path)
+    )
+    first = converter.analyze_structure(sample_pdf)
+    again = converter.analyze_structure(sample_pdf)
+    assert again["structure_analysis"] == first["structure_analysis"]
+    given = converter.analyze_structure(result=extract_text(sample_pdf))
+    assert given["structure_analysis"] == first["structure_analysis"]
+    assert len(calls) == 1
+    with pytest.raises(ValueError):
+        converter.analyze_structure()
+
+
+def test_structure_analysis_results_are_independent(sample_pdf):
+    converter = PDFConverter()
+    first = converter.analyze_structure(sample_pdf)
+    first["pages"][0]["text"] = "edited"
+    first["pages"][0]["dimensions"]["width"] = 0.0
+    first["metadata"]["filename"] = "edited"
+    again = converter.analyze_structure(sample_pdf)
+    assert again["pages"][0]["text"] == "Page 1 body text"
+    assert again["pages"][0]["dimensions"]["width"] == 612.0
+    assert again["metadata"]["filename"] == "sample.pdf"
+
+    given = converter.extract_text(sample_pdf)
+    converter.analyze_structure(result=given)
+    assert given["pages_dataframe"] is None
+
+
+def test_result_cache_is_bounded_by_text_size(sample_pdf, tmp_path):
+    converter = PDFConverter()
+    converter.analyze_structure(sample_pdf)
+    assert len(converter._result_cache) == 1
+    converter.RESULT_CACHE_MAX_BYTES = converter._result_cache_bytes
+    other = tmp_path / "other.pdf"
+    other.write_bytes(sample_pdf.read_bytes())
+    converter.analyze_structure(other)
+    assert list(converter._result_cache) == [
+        (str(other), other.stat().st_mtime_ns, other.stat().st_size)
+    ]
+    converter.RESULT_CACHE_MAX_BYTES = 1
+    converter.analyze_structure(sample_pdf)  # too large to keep at all
+    assert len(converter._result_cache) == 1
+
+
+class FlakyDoc:
+    """PyMuPDF document that fails partway through its page tree"""
+
+    def __init__(self, doc, fail_at):
+        self.doc, self.fail_at = doc, fail_at
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.doc.close()
+
+    def __iter__(self):
+        for i, page in enumerate(self.doc):
+            if i == self.fail_at:
+                raise RuntimeError("damaged page tree")
+            yield page
+
+
+@pytest.mark.parametrize("fail_at", [None, 3])
+def test_iter_pages_falls_back_to_pypdf(sample_pdf, monkeypatch, fail_at):
+    expected = PDFConverter(use_pymupdf=False).extract_text(sample_pdf)["pages"]
+
+    def failing_open(path):
+        if fail_at is None:
+            raise RuntimeError("cannot open broken document")
+        return FlakyDoc(open_pdf(path), fail_at)
+
+    open_pdf = pymupdf.open
+    monkeypatch.setattr(pymupdf, "open", failing_open)
+    assert list(PDFConverter().iter_pages(sample_pdf)) == expected